@@ -2,6 +2,8 @@
 Renumics Spotlight
 """
 
+import shutil
+
 from loguru import logger
 from .__version__ import __version__
 from .dataset import Dataset
@@ -15,17 +17,27 @@ from .dtypes import (
     Video,
     Window,
 )
+from .io.folder import MediaFolder
+from .io.sql import SqlTable
 from .viewer import Viewer, close, viewers, show
 from .plugin_loader import load_plugins
 from .settings import settings
-from . import cache, logging
+from . import appdirs, cache, logging
 
 if not settings.verbose:
     logging.disable()
 
 __plugins__ = load_plugins()
 
-__all__ = ["show", "close", "viewers", "Viewer", "clear_caches"]
+__all__ = [
+    "show",
+    "close",
+    "viewers",
+    "Viewer",
+    "MediaFolder",
+    "SqlTable",
+    "clear_caches",
+]
 
 
 def clear_caches() -> None:
@@ -33,3 +45,8 @@ def clear_caches() -> None:
     Clear all cached data.
     """
     cache.clear("external-data")
+    cache.clear("dtypes")
+    cache.clear("reductions")
+    cache.clear("knn-graphs")
+    cache.clear("umap-reducers")
+    shutil.rmtree(appdirs.cache_dir / "csv", ignore_errors=True)
@@ -6,7 +6,6 @@ import inspect
 from typing import Iterable
 
 import numpy as np
-import pandas as pd
 import cleanlab.outlier
 from renumics.spotlight.dtypes import Embedding
 
@@ -28,9 +27,9 @@ def analyze_with_cleanlab(
 
     embedding_columns = (col for col, dtype in dtypes.items() if dtype == Embedding)
     for column_name in embedding_columns:
-        embeddings = data_source.get_column(column_name, dtypes[column_name]).values
+        embeddings, valid_mask = data_source.get_matrix({column_name: Embedding})
 
-        mask = _detect_outliers(embeddings)
+        mask = _detect_outliers(embeddings, valid_mask)
         rows = np.where(mask)[0].tolist()
 
         if len(rows):
@@ -52,16 +51,13 @@ def analyze_with_cleanlab(
             )
 
 
-def _calculate_outlier_scores(embeddings: np.ndarray) -> np.ndarray:
+def _calculate_outlier_scores(
+    embeddings: np.ndarray, valid_mask: np.ndarray
+) -> np.ndarray:
     """
-    calculate outlier scores for an embedding column
+    calculate outlier scores for an embedding matrix
     """
-    if embeddings.ndim > 1:
-        mask = np.ones(len(embeddings), dtype=bool)
-    else:
-        mask = np.array([value is not None for value in embeddings])
-
-    features = np.stack(embeddings[mask])  # type: ignore
+    features = embeddings[valid_mask]
 
     scores = np.full(shape=(len(embeddings),), fill_value=np.nan)
 
@@ -70,15 +66,15 @@ def _calculate_outlier_scores(embeddings: np.ndarray) -> np.ndarray:
     if len(features) < 10:
         return scores
 
-    scores[mask] = cleanlab.outlier.OutOfDistribution().fit_score(
+    scores[valid_mask] = cleanlab.outlier.OutOfDistribution().fit_score(
         features=features, verbose=False
     )
     return scores
 
 
-def _detect_outliers(embeddings: pd.Series) -> np.ndarray:
+def _detect_outliers(embeddings: np.ndarray, valid_mask: np.ndarray) -> np.ndarray:
     """
-    detect outliers in an embedding column
+    detect outliers in an embedding matrix
     """
-    scores = _calculate_outlier_scores(embeddings)
+    scores = _calculate_outlier_scores(embeddings, valid_mask)
     return scores < 0.50
@@ -8,7 +8,7 @@ import os
 from pathlib import Path
 from concurrent.futures import CancelledError, Future
 import re
-from threading import Thread
+from threading import Event, Thread
 import multiprocessing.connection
 from typing import Any, Dict, List, Literal, Optional, Union, cast
 import uuid
@@ -25,7 +25,12 @@ import pandas as pd
 from httpx import AsyncClient, URL
 
 from renumics.spotlight.backend.data_source import DataSource
-from renumics.spotlight.backend.tasks.task_manager import TaskManager
+from renumics.spotlight.backend.tasks import reduction
+from renumics.spotlight.backend.tasks import (
+    PRIORITY_BACKGROUND,
+    TaskCancelled,
+    TaskManager,
+)
 from renumics.spotlight.backend.websockets import (
     Message,
     RefreshMessage,
@@ -59,8 +64,14 @@ from renumics.spotlight.backend import create_datasource
 
 from renumics.spotlight.layout.default import DEFAULT_LAYOUT
 
+from renumics.spotlight_plugins.core.embeddings_data_source import (
+    EmbeddingsDataSource,
+)
 from renumics.spotlight_plugins.core.hdf5_data_source import Hdf5DataSource
 
+# Interval (in seconds) in which the data source is checked for external changes.
+DATA_SOURCE_POLL_INTERVAL = 1.0
+
 
 @dataclass
 class IssuesUpdatedMessage(Message):
@@ -87,11 +98,16 @@ class SpotlightApp(FastAPI):
     _receiver_thread: Thread
 
     # datasource
-    _dataset: Optional[Union[PathType, pd.DataFrame]]
+    _dataset: Optional[Union[PathType, pd.DataFrame, Any]]
     _user_dtypes: ColumnTypeMapping
     _guessed_dtypes: ColumnTypeMapping
     _dtypes: ColumnTypeMapping
     _data_source: Optional[DataSource]
+    _data_source_generation_id: Optional[int]
+
+    # data source watcher
+    _watcher_thread: Thread
+    _watcher_stopped: Event
 
     task_manager: TaskManager
     websocket_manager: Optional[WebsocketManager]
@@ -113,7 +129,11 @@ class SpotlightApp(FastAPI):
         # pylint: disable=too-many-statements
         super().__init__()
         self._startup_complete = False
-        self.task_manager = TaskManager()
+        self.task_manager = TaskManager(
+            reduction.PRELOAD_MODULES,
+            reduction.warm_up if settings.warm_up else None,
+            settings.task_workers,
+        )
         self.websocket_manager = None
         self.config = Config()
         self._layout = None
@@ -130,6 +150,10 @@ class SpotlightApp(FastAPI):
         self._user_dtypes = {}
         self._dtypes = {}
         self._data_source = None
+        self._data_source_generation_id = None
+
+        self._watcher_stopped = Event()
+        self._watcher_thread = Thread(target=self._watch_data_source, daemon=True)
 
         @self.on_event("startup")
         def _() -> None:
@@ -150,6 +174,7 @@ class SpotlightApp(FastAPI):
 
             self._receiver_thread = Thread(target=self._receive, daemon=True)
             self._receiver_thread.start()
+            self._watcher_thread.start()
             self._connection.send({"kind": "startup"})
 
             def handle_ws_connect(active_connections: int) -> None:
@@ -173,6 +198,8 @@ class SpotlightApp(FastAPI):
         @self.on_event("shutdown")
         def _() -> None:
             self._receiver_thread.join(0.1)
+            self._watcher_stopped.set()
+            self._watcher_thread.join(0.1)
             self.task_manager.shutdown()
             emit_exit_event()
 
@@ -315,26 +342,30 @@ class SpotlightApp(FastAPI):
             self.analyze_issues = config.analyze
         if config.custom_issues is not None:
             self.custom_issues = config.custom_issues
+        data_source: Optional[DataSource] = None
         if config.dataset is not None:
             self._dataset = config.dataset
-            self._data_source = create_datasource(self._dataset)
-            self._guessed_dtypes = self._data_source.guess_dtypes()
+            data_source = create_datasource(self._dataset)
+        elif config.embeddings is not None:
+            # Attach the new embeddings to the current table.
+            data_source = self._data_source
+            if isinstance(data_source, EmbeddingsDataSource):
+                data_source = data_source.data_source
+            if data_source is None:
+                logger.warning("No dataset loaded, ignoring the embedding files.")
+        if data_source is not None:
+            if config.embeddings:
+                data_source = EmbeddingsDataSource(data_source, config.embeddings)
+            self._data_source_generation_id = data_source.get_generation_id()
+            self._data_source = data_source
+            self._guessed_dtypes = data_source.guess_dtypes()
         if config.layout is not None:
             self.layout = config.layout
         if config.filebrowsing_allowed is not None:
             self.filebrowsing_allowed = config.filebrowsing_allowed
 
-        if config.dtypes is not None or config.dataset is not None:
-            dtypes = self._guessed_dtypes.copy()
-            if not isinstance(self._data_source, Hdf5DataSource):
-                dtypes.update(
-                    {
-                        column_name: column_type
-                        for column_name, column_type in self._user_dtypes.items()
-                        if column_name in self._guessed_dtypes
-                    }
-                )
-            self._dtypes = dtypes
+        if config.dtypes is not None or data_source is not None:
+            self._update_dtypes()
             self._broadcast(RefreshMessage())
             self._update_issues()
 
@@ -342,6 +373,69 @@ class SpotlightApp(FastAPI):
             self._startup_complete = True
             self._connection.send({"kind": "startup_complete"})
 
+    def _update_dtypes(self) -> None:
+        """
+        Merge guessed dtypes with dtypes requested by user.
+        """
+        dtypes = self._guessed_dtypes.copy()
+        data_source = self._data_source
+        if isinstance(data_source, EmbeddingsDataSource):
+            data_source = data_source.data_source
+        if not isinstance(data_source, Hdf5DataSource):
+            dtypes.update(
+                {
+                    column_name: column_type
+                    for column_name, column_type in self._user_dtypes.items()
+                    if column_name in self._guessed_dtypes
+                }
+            )
+        self._dtypes = dtypes
+
+    def _watch_data_source(self) -> None:
+        """
+        Periodically check whether the data source has been changed from
+        outside (e.g. another process writing into the dataset file) and
+        refresh all connected frontends then.
+
+        Changes are only applied once the generation ID stayed the same for a
+        poll interval, so that a burst of writes refreshes frontends once.
+        Dtypes are only guessed anew if the column set changed. Issues are
+        analyzed anew on each change, a still running analysis is cancelled.
+        """
+        pending_generation_id: Optional[int] = None
+        while not self._watcher_stopped.wait(DATA_SOURCE_POLL_INTERVAL):
+            data_source = self._data_source
+            if data_source is None:
+                continue
+            try:
+                generation_id = data_source.get_generation_id()
+                if generation_id == self._data_source_generation_id:
+                    pending_generation_id = None
+                    continue
+                if generation_id != pending_generation_id:
+                    # Wait until the data source settles down.
+                    pending_generation_id = generation_id
+                    continue
+                if set(data_source.column_names) == set(self._guessed_dtypes):
+                    guessed_dtypes = self._guessed_dtypes
+                else:
+                    guessed_dtypes = data_source.guess_dtypes()
+            except Exception as e:  # pylint: disable=broad-except
+                # The data source can be temporarily unavailable, e.g. while
+                # another process is writing into it.
+                logger.warning(f"Checking the data source for changes failed: {e}")
+                continue
+            pending_generation_id = None
+            if data_source is not self._data_source:
+                # The data source has been replaced in the meantime.
+                continue
+            logger.info("Data source changed, refreshing frontends.")
+            self._data_source_generation_id = generation_id
+            self._guessed_dtypes = guessed_dtypes
+            self._update_dtypes()
+            self._broadcast(RefreshMessage())
+            self._update_issues()
+
     def _handle_message(self, message: Any) -> None:
         kind = message.get("kind")
         data = message.get("data")
@@ -429,13 +523,16 @@ class SpotlightApp(FastAPI):
         if table is None:
             return
         task = self.task_manager.create_task(
-            find_issues, (table, self._dtypes), name="update_issues"
+            find_issues,
+            (table, self._dtypes),
+            name="update_issues",
+            priority=PRIORITY_BACKGROUND,
         )
 
         def _on_issues_ready(future: Future) -> None:
             try:
                 self.issues = future.result()
-            except CancelledError:
+            except (CancelledError, TaskCancelled):
                 return
             self._broadcast(IssuesUpdatedMessage())
 
@@ -4,7 +4,7 @@ Spotlight Application Config
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 import pandas as pd
 
@@ -21,10 +21,16 @@ class AppConfig:
     Spotlight Application Config
     """
 
+    # pylint: disable=too-many-instance-attributes
+
     # dataset
-    dataset: Optional[Union[PathType, pd.DataFrame]] = None
+    # A path, a `pandas.DataFrame` or any other object with a registered data
+    # source, e.g. `datasets.Dataset`.
+    dataset: Optional[Union[PathType, pd.DataFrame, Any]] = None
     dtypes: Optional[ColumnTypeMapping] = None
     project_root: Optional[Path] = None
+    # Embedding columns to attach to the dataset as `.npy` files by name.
+    embeddings: Optional[Dict[str, Path]] = None
 
     # data analysis
     analyze: Optional[bool] = None
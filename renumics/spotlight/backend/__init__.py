@@ -40,7 +40,7 @@ def datasource(
     return func
 
 
-def create_datasource(source: Union[pd.DataFrame, os.PathLike, str]) -> DataSource:
+def create_datasource(source: Union[pd.DataFrame, os.PathLike, str, Any]) -> DataSource:
     """
     open the specified data source
     """
@@ -3,13 +3,15 @@
 import dataclasses
 import hashlib
 import io
+import uuid
 from datetime import datetime
 from abc import ABC, abstractmethod
-from typing import Optional, List, Dict, Type, Any, cast
+from typing import IO, Optional, List, Dict, Tuple, Type, Any, Union, cast
 
 import filetype
 import pandas as pd
 import numpy as np
+from numpy.typing import DTypeLike
 from pydantic.dataclasses import dataclass
 
 from renumics.spotlight.io import audio
@@ -19,7 +21,7 @@ from renumics.spotlight.dataset.exceptions import (
     ColumnExistsError,
     ColumnNotExistsError,
 )
-from renumics.spotlight.dtypes import Audio, Image
+from renumics.spotlight.dtypes import Audio, Category, Embedding, Image, Video
 from renumics.spotlight.dtypes.typing import (
     ColumnType,
     ColumnTypeMapping,
@@ -33,6 +35,24 @@ from .exceptions import DatasetNotEditable, GenerationIDMismatch, NoRowFound
 
 cache = Cache("external-data")
 
+# Image MIME subtypes which can be displayed by browsers as is.
+BROWSER_IMAGE_SUBTYPES = (
+    "apng",
+    "avif",
+    "gif",
+    "jpeg",
+    "png",
+    "webp",
+    "bmp",
+    "x-icon",
+)
+
+
+class ColumnNotEmbeddable(Exception):
+    """
+    The column is not embeddable
+    """
+
 
 @dataclasses.dataclass
 class Attrs:
@@ -138,6 +158,23 @@ class DataSource(ABC):
         Get the table's human-readable name.
         """
 
+    def get_fingerprint(self) -> str:
+        """
+        Get a fingerprint of the table's content, e.g. to key cached results
+        computed from the table.
+
+        Data sources which can tell whether their content changed across
+        sessions, e.g. by their file's modification time, should override it.
+        By default, a random ID is drawn once per data source instance, so that
+        results are only reused while the data source lives.
+        """
+        try:
+            return self._instance_fingerprint
+        except AttributeError:
+            # pylint: disable=attribute-defined-outside-init
+            self._instance_fingerprint: str = uuid.uuid4().hex
+            return self._instance_fingerprint
+
     def get_internal_columns(self) -> List[Column]:
         """
         Get internal columns if there are any.
@@ -156,6 +193,69 @@ class DataSource(ABC):
         Get column metadata + values
         """
 
+    def get_matrix(
+        self,
+        columns: ColumnTypeMapping,
+        indices: Optional[List[int]] = None,
+        dtype: DTypeLike = np.float32,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get numeric, embedding and category columns as one contiguous matrix,
+        e.g. to reduce or analyze them.
+
+        Numeric columns take one matrix column each, embedding columns one per
+        dimension and category columns are one-hot encoded. Missing values are
+        filled with `NaN`s.
+
+        Args:
+            columns: Names of the columns to fetch and their types.
+            indices: Rows to fetch, all rows by default.
+            dtype: Floating point type of the matrix.
+
+        Returns:
+            The writable matrix of shape `(num_rows, num_features)` and a
+            mask of rows without missing values.
+
+        Raises:
+            ColumnNotEmbeddable: If a column of another type is requested.
+        """
+        num_rows = len(self) if indices is None else len(indices)
+        matrices = [
+            self._get_column_matrix(column_name, column_type, indices, dtype)
+            for column_name, column_type in columns.items()
+        ]
+        if not matrices:
+            return np.empty((num_rows, 0), dtype), np.ones(num_rows, bool)
+        matrix = np.hstack(matrices)
+        mask = ~np.isnan(matrix).any(axis=1)
+        return matrix, mask
+
+    def _get_column_matrix(
+        self,
+        column_name: str,
+        column_type: Type[ColumnType],
+        indices: Optional[List[int]],
+        dtype: DTypeLike,
+    ) -> np.ndarray:
+        """
+        Get a single column as a matrix for `get_matrix`.
+
+        Data sources which can build the matrix without preparing the whole
+        column, e.g. from cached or raw arrays, should override it.
+        """
+        column = self.get_column(column_name, column_type, indices)
+        if column.type is Embedding:
+            return embeddings_to_matrix(
+                column.values, column.embedding_length or 0, dtype
+            )
+        if column.type is Category:
+            return one_hot_encode(
+                column.values, sorted((column.categories or {}).values()), dtype
+            )
+        if column.type in (int, bool, float):
+            return column.values.astype(dtype).reshape(-1, 1)
+        raise ColumnNotEmbeddable
+
     @abstractmethod
     def get_cell_data(
         self, column_name: str, row_index: int, dtype: Type[ColumnType]
@@ -236,6 +336,45 @@ class DataSource(ABC):
             )
 
 
+def embeddings_to_matrix(
+    values: np.ndarray, embedding_length: int, dtype: DTypeLike = np.float32
+) -> np.ndarray:
+    """
+    Stack an embedding column with `None`s or empty arrays for missing values
+    into a matrix, missing rows are filled with `NaN`s.
+    """
+    if values.ndim == 2:
+        return values.astype(dtype)
+    matrix = np.full((len(values), embedding_length), np.nan, dtype)
+    if embedding_length:
+        valid_mask = np.fromiter(
+            (value is not None and len(value) > 0 for value in values),
+            dtype=bool,
+            count=len(values),
+        )
+        if valid_mask.any():
+            matrix[valid_mask] = np.stack(values[valid_mask])
+    return matrix
+
+
+def one_hot_encode(
+    codes: np.ndarray, classes: List[int], dtype: DTypeLike = np.float32
+) -> np.ndarray:
+    """
+    One-hot encode category codes, rows of codes not in `classes` are filled
+    with `NaN`s. Without classes, a single `NaN` column is returned.
+    """
+    if not classes:
+        return np.full((len(codes), 1), np.nan, dtype)
+    positions = np.searchsorted(classes, codes)
+    positions = np.minimum(positions, len(classes) - 1)
+    valid_mask = np.asarray(classes)[positions] == codes
+    matrix = np.zeros((len(codes), len(classes)), dtype)
+    matrix[np.flatnonzero(valid_mask), positions[valid_mask]] = 1
+    matrix[~valid_mask] = np.nan
+    return matrix
+
+
 def _sanitize_value(value: Any) -> Any:
     if pd.isna(value):
         return None
@@ -350,6 +489,89 @@ def read_external_value(
     return value
 
 
+def read_in_memory_value(
+    blob: bytes, column_type: Type[FileBasedColumnType]
+) -> np.void:
+    """
+    Prepare an in-memory file (e.g. a `bytes` cell of a `pandas.DataFrame`) as
+    expected by the rest of the backend.
+
+    Videos, browser-compatible images and audio are passed as is. All other
+    values are converted and cached by their content hash.
+    """
+    if column_type is Video:
+        return np.void(blob)
+    if column_type is Image and is_browser_compatible_image(blob):
+        return np.void(blob)
+    if column_type is Audio:
+        try:
+            input_format_codec = audio.get_format_codec(io.BytesIO(blob))
+        except Exception:  # pylint: disable=broad-except
+            # Let the conversion below fail properly.
+            ...
+        else:
+            if is_browser_compatible_audio(*input_format_codec):
+                return np.void(blob)
+
+    value_hash = hashlib.blake2b(blob).hexdigest()
+    cache_key = f"in-memory:{value_hash},{get_column_type_name(column_type)}"
+    try:
+        return np.void(cache[cache_key])
+    except KeyError:
+        ...
+    value = column_type.from_bytes(blob).encode()  # type: ignore
+    cache[cache_key] = value.tolist()
+    return value
+
+
+def read_media_file(
+    path: PathType, column_type: Type[FileBasedColumnType]
+) -> Optional[np.void]:
+    """
+    Read a local media file as expected by the rest of the backend.
+
+    Videos, browser-compatible images and audio are read as is and not cached.
+    All other files are converted and cached by their path.
+    """
+    if column_type is Video:
+        with open(path, "rb") as file:
+            return np.void(file.read())
+    if column_type is Image:
+        with open(path, "rb") as file:
+            if is_browser_compatible_image(file):
+                return np.void(file.read())
+    if column_type is Audio:
+        try:
+            input_format_codec = audio.get_format_codec(str(path))
+        except Exception:  # pylint: disable=broad-except
+            # Let the conversion below fail properly.
+            ...
+        else:
+            if is_browser_compatible_audio(*input_format_codec):
+                with open(path, "rb") as file:
+                    return np.void(file.read())
+    return read_external_value(str(path), column_type)
+
+
+def is_browser_compatible_image(file: Union[bytes, IO]) -> bool:
+    """
+    Check whether an image file can be displayed by browsers as is.
+    """
+    kind = filetype.guess(file)
+    return kind is not None and kind.mime.split("/")[1] in BROWSER_IMAGE_SUBTYPES
+
+
+def is_browser_compatible_audio(input_format: str, input_codec: str) -> bool:
+    """
+    Check whether an audio format/codec can be played by browsers as is.
+    """
+    return input_format in ("flac", "mp3", "wav") or input_codec in (
+        "aac",
+        "libvorbis",
+        "vorbis",
+    )
+
+
 def _decode_external_value(
     path_or_url: PathOrUrlType,
     column_type: Type[FileBasedColumnType],
@@ -369,11 +591,7 @@ def _decode_external_value(
             file.seek(0)
         if target_format is None:
             # Try to send data as is.
-            if input_format in ("flac", "mp3", "wav") or input_codec in (
-                "aac",
-                "libvorbis",
-                "vorbis",
-            ):
+            if is_browser_compatible_audio(input_format, input_codec):
                 # Format is directly supported by the browser.
                 if isinstance(file, str):
                     with open(file, "rb") as f:
@@ -395,17 +613,7 @@ def _decode_external_value(
 
     if column_type is Image:
         with as_file(path_or_url) as file:
-            kind = filetype.guess(file)
-            if kind is not None and kind.mime.split("/")[1] in (
-                "apng",
-                "avif",
-                "gif",
-                "jpeg",
-                "png",
-                "webp",
-                "bmp",
-                "x-icon",
-            ):
+            if is_browser_compatible_image(file):
                 return np.void(file.read())
             # `image/tiff`s become blank in frontend, so convert them too.
             return Image.from_file(file).encode(target_format)
@@ -65,6 +65,30 @@ class CouldNotOpenTableFile(Problem):
         )
 
 
+class InvalidEmbeddingFile(Problem):
+    """raised when an embedding file does not fit the table"""
+
+    def __init__(self, path: PathType) -> None:
+        super().__init__(
+            "Invalid embedding file",
+            f"File {path} should contain a 2-dimensional numeric array with "
+            f"one row per table row.",
+            status.HTTP_403_FORBIDDEN,
+        )
+
+
+class NoUniqueTable(Problem):
+    """raised when a database file has none or multiple tables to choose from"""
+
+    def __init__(self, path: PathType) -> None:
+        super().__init__(
+            "No unique table",
+            f"Database {path} does not contain exactly one table. Choose a "
+            f"table or query with `spotlight.SqlTable`.",
+            status.HTTP_403_FORBIDDEN,
+        )
+
+
 class NoRowFound(Problem):
     """raised when a row can't be found in the dataset"""
 
@@ -2,5 +2,7 @@
 This module provides long-running tasks.
 """
 
+from .task import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, TaskStats
 from .task_manager import TaskManager
 from .exceptions import TaskCancelled
+from .worker import check_cancelled, report_progress
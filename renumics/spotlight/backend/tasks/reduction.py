@@ -2,23 +2,139 @@
 Taks for dimensionality reduction
 """
 
-from typing import List, Tuple, cast
+import collections
+import contextlib
+import hashlib
+import importlib.metadata
+import inspect
+import io
+import json
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, cast
 
 import numpy as np
-import pandas as pd
+from packaging.specifiers import SpecifierSet
+from packaging.version import Version
 
+from renumics.spotlight.cache import Cache
 from renumics.spotlight.dataset.exceptions import ColumnNotExistsError
-from renumics.spotlight.dtypes import Category, Embedding
-from renumics.spotlight.dtypes.typing import ColumnTypeMapping
-from ..data_source import DataSource
+from renumics.spotlight.dtypes.typing import ColumnTypeMapping, get_column_type_name
+from ..data_source import ColumnNotEmbeddable, DataSource
+from .worker import (
+    check_cancelled,
+    is_progress_reported,
+    is_task_running,
+    report_progress,
+)
+from .shared_array import SharedArray
 
 SEED = 42
+# Epochs between intermediate layouts reported while U-Map is optimized.
+UMAP_PROGRESS_EPOCHS = 25
+# U-Map versions whose private per-epoch optimization step is known to be
+# wrapped safely to report intermediate layouts.
+UMAP_WATCHED_VERSIONS = ">=0.5.4,<0.6"
+# Rows embedded at once into a U-Map fitted on a sample.
+TRANSFORM_BATCH_SIZE = 20_000
+TRANSFORM_THREADS = 4
+# Nearest neighbors computed at least for U-Map, so that later U-Maps with up
+# to as many neighbors reuse the cached kNN graph.
+KNN_NEIGHBORS = 30
+# Smaller data is fitted on exact distances, which are cheap anyway.
+KNN_CACHE_MIN_ROWS = 4096
+# Fitted U-Map reducers of larger tables are only kept in the worker's memory.
+UMAP_REDUCER_CACHE_MAX_ROWS = 100_000
+# Number of fitted U-Map reducers kept in a worker's memory.
+UMAP_REDUCERS_IN_MEMORY = 2
 
+# Modules reductions need, to be imported by task workers in advance.
+PRELOAD_MODULES = (
+    "sklearn.decomposition",
+    "sklearn.preprocessing",
+    "umap",
+    "renumics.spotlight.backend.tasks.reduction",
+)
 
-class ColumnNotEmbeddable(Exception):
+# Reduction modes.
+FULL_MODE = "full"
+SAMPLE_MODE = "sample"
+RANDOMIZED_MODE = "randomized"
+
+reduction_cache = Cache("reductions")
+knn_cache = Cache("knn-graphs")
+umap_reducer_cache = Cache("umap-reducers")
+# Fitted U-Map reducers of this worker, least recently used first.
+_umap_reducers: "collections.OrderedDict[str, Tuple[Any, ...]]" = (
+    collections.OrderedDict()
+)
+
+
+def get_reduction_cache_key(
+    method: str,
+    table: DataSource,
+    dtypes: ColumnTypeMapping,
+    column_names: List[str],
+    indices: List[int],
+    **parameters: Any,
+) -> str:
+    """
+    Key a reduction's result by the table's content and generation, the
+    reduced columns and their types, the reduced rows and the reduction's
+    parameters.
     """
-    The column is not embeddable
+    indices_hash = hashlib.blake2b(np.asarray(indices, dtype=np.int64).tobytes())
+    key = {
+        "method": method,
+        "fingerprint": table.get_fingerprint(),
+        "generation_id": table.get_generation_id(),
+        "columns": [
+            [column_name, get_column_type_name(dtypes[column_name])]
+            if column_name in dtypes
+            else [column_name, None]
+            for column_name in column_names
+        ],
+        "indices": indices_hash.hexdigest(),
+        "parameters": parameters,
+    }
+    key_hash = hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8"))
+    return f"{method}:{key_hash.hexdigest()}"
+
+
+def get_umap_reducer_key(
+    table: DataSource,
+    dtypes: ColumnTypeMapping,
+    column_names: List[str],
+    indices: List[int],
+    **parameters: Any,
+) -> str:
+    """
+    Key the last fitted U-Map reducer by the table's identity, the reduced
+    columns and their types, the selected rows and U-Map's parameters.
+
+    Unlike reduction results, the reducer is not keyed by the table's content,
+    so that rows appended later can be embedded with it. A selection of all
+    rows is keyed as such, so that it still matches with appended rows, other
+    selections by their indices.
     """
+    rows = np.asarray(indices, dtype=np.int64)
+    if len(rows) == len(table) and np.array_equal(rows, np.arange(len(table))):
+        selection = "all"
+    else:
+        selection = hashlib.sha1(rows.tobytes()).hexdigest()
+    key = {
+        "uid": table.get_uid(),
+        "columns": [
+            [column_name, get_column_type_name(dtypes[column_name])]
+            if column_name in dtypes
+            else [column_name, None]
+            for column_name in column_names
+        ],
+        "selection": selection,
+        "parameters": parameters,
+    }
+    key_hash = hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8"))
+    return f"umap-reducer:{key_hash.hexdigest()}"
 
 
 def get_aligned_data(
@@ -34,108 +150,447 @@ def get_aligned_data(
     if not column_names or not indices:
         return np.empty(0, np.float64), []
 
-    from sklearn import preprocessing  # pylint: disable=import-outside-toplevel
-
-    values = []
-    for column_name in column_names:
-        column = table.get_column(column_name, dtypes[column_name], indices)
-        if column.type is Embedding:
-            if column.embedding_length:
-                none_replacement = np.full(column.embedding_length, np.nan)
-                values.append(
-                    np.array(
-                        [
-                            value if value is not None else none_replacement
-                            for value in column.values
-                        ]
-                    )
-                )
-        elif column.type is Category:
-            if column.categories:
-                classes = sorted(column.categories.values())
-                na_mask = ~np.isin(column.values, classes)
-                one_hot_values = preprocessing.label_binarize(
-                    column.values, classes=sorted(column.categories.values())
-                ).astype(float)
-                one_hot_values[na_mask] = np.nan
-                values.append(one_hot_values)
-            else:
-                values.append(np.full(len(column.values), np.nan))
-        elif column.type in (int, bool, float):
-            values.append(column.values)
-        else:
-            raise ColumnNotEmbeddable
-
-    data = np.hstack([col.reshape((len(indices), -1)) for col in values])
-    mask = ~pd.isna(data).any(axis=1)
+    columns = {column_name: dtypes[column_name] for column_name in column_names}
+    data, mask = table.get_matrix(columns, indices)
     return data[mask], (np.array(indices)[mask]).tolist()
 
 
-def compute_umap(
+@contextlib.contextmanager
+def _watch_umap_epochs(
+    reducer: Any, positions: Optional[np.ndarray], mode: str
+) -> Iterator[None]:
+    """
+    While U-Map optimizes its embedding, check for cancellation every epoch and
+    report the initial layout and then every `UMAP_PROGRESS_EPOCHS` epochs the
+    current layout.
+
+    Cancellation is checked through U-Map's public progress bar options. The
+    current layout is only reachable through U-Map's private per-epoch
+    optimization step, so it is reported for `UMAP_WATCHED_VERSIONS` only.
+    """
+    if not is_task_running():
+        yield
+        return
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(_check_cancelled_every_epoch(reducer))
+        if is_progress_reported():
+            stack.enter_context(_report_umap_layouts(positions, mode))
+        yield
+
+
+class _CancellationCheckingFile(io.StringIO):
+    """
+    Progress bar output which checks for cancellation on every update.
+    """
+
+    def write(self, s: str) -> int:
+        check_cancelled()
+        return len(s)
+
+
+@contextlib.contextmanager
+def _check_cancelled_every_epoch(reducer: Any) -> Iterator[None]:
+    """
+    Let U-Map's epoch progress bar check for cancellation, it is updated once
+    per epoch.
+    """
+    if "tqdm_kwds" not in reducer.get_params():
+        yield
+        return
+    tqdm_kwds = reducer.tqdm_kwds
+    reducer.set_params(
+        tqdm_kwds={
+            "disable": False,
+            "file": _CancellationCheckingFile(),
+            "mininterval": 0,
+            "miniters": 1,
+        }
+    )
+    try:
+        yield
+    finally:
+        # The reducer is cached, do not keep the file in it.
+        reducer.set_params(tqdm_kwds=tqdm_kwds)
+
+
+@contextlib.contextmanager
+def _report_umap_layouts(positions: Optional[np.ndarray], mode: str) -> Iterator[None]:
+    """
+    Wrap U-Map's private per-epoch optimization step to report the current
+    layout every `UMAP_PROGRESS_EPOCHS` epochs.
+    """
+    # pylint: disable=import-outside-toplevel, protected-access
+    from umap import layouts
+
+    umap_version = importlib.metadata.version("umap-learn")
+    get_epoch_fn = getattr(
+        layouts, "_get_optimize_layout_euclidean_single_epoch_fn", None
+    )
+    if (
+        get_epoch_fn is None
+        or Version(umap_version) not in SpecifierSet(UMAP_WATCHED_VERSIONS)
+    ):
+        warnings.warn(
+            f"Intermediate U-Map layouts are not reported with umap-learn "
+            f"{umap_version}, only with umap-learn{UMAP_WATCHED_VERSIONS}."
+        )
+        yield
+        return
+
+    def _get_watched_epoch_fn(*args: Any, **kwargs: Any) -> Callable:
+        optimize_epoch = get_epoch_fn(*args, **kwargs)
+        epoch = 0
+
+        def _optimize_epoch(head_embedding: np.ndarray, *epoch_args: Any) -> None:
+            nonlocal epoch
+            if epoch % UMAP_PROGRESS_EPOCHS == 0:
+                report_progress((head_embedding.copy(), positions, mode))
+            optimize_epoch(head_embedding, *epoch_args)
+            epoch += 1
+
+        return _optimize_epoch
+
+    layouts._get_optimize_layout_euclidean_single_epoch_fn = _get_watched_epoch_fn
+    try:
+        yield
+    finally:
+        layouts._get_optimize_layout_euclidean_single_epoch_fn = get_epoch_fn
+
+
+def stratified_sample(n: int, size: int) -> np.ndarray:
+    """
+    Draw `size` of `n` positions, one random position from each of `size`
+    equally large blocks, so that the sample covers the whole table.
+    """
+    rng = np.random.default_rng(SEED)
+    bounds = np.linspace(0, n, size + 1).astype(np.int64)
+    return bounds[:-1] + (rng.random(size) * np.diff(bounds)).astype(np.int64)
+
+
+def _hash_array(data: np.ndarray) -> str:
+    data = np.ascontiguousarray(data)
+    data_hash = hashlib.blake2b(f"{data.shape}:{data.dtype.str}".encode("utf-8"))
+    data_hash.update(data.data)
+    return data_hash.hexdigest()
+
+
+def get_knn_graph(
+    data: np.ndarray, n_neighbors: int, metric: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the `n_neighbors` nearest neighbors' indices and distances of each row.
+
+    The graph is cached by the data's content and the metric. It is computed
+    for at least `KNN_NEIGHBORS` neighbors, so that U-Maps with other
+    parameters but not more neighbors only slice the cached graph. The search
+    index is not cached, since it is only needed to embed new rows.
+    """
+    # pylint: disable=import-outside-toplevel
+    from umap.umap_ import nearest_neighbors
+
+    cache_key = f"knn-v3:{_hash_array(data)}:{metric}"
+    try:
+        knn_indices, knn_dists = knn_cache[cache_key]
+    except KeyError:
+        ...
+    else:
+        if knn_indices.shape[1] >= n_neighbors:
+            return knn_indices[:, :n_neighbors], knn_dists[:, :n_neighbors]
+
+    check_cancelled()
+    knn_indices, knn_dists, _ = nearest_neighbors(
+        data,
+        max(n_neighbors, KNN_NEIGHBORS),
+        metric,
+        {},
+        False,
+        np.random.RandomState(SEED),
+        n_jobs=1,
+    )
+    knn_cache[cache_key] = knn_indices, knn_dists
+    return knn_indices[:, :n_neighbors], knn_dists[:, :n_neighbors]
+
+
+def _build_search_index(reducer: Any) -> None:
+    """
+    Build the search index of a U-Map reducer fitted on a precomputed kNN
+    graph, so that it can embed new rows.
+    """
+    # pylint: disable=import-outside-toplevel, protected-access
+    from umap.umap_ import nearest_neighbors
+
+    if getattr(reducer, "_knn_search_index", True) is not None:
+        return
+    check_cancelled()
+    _, _, reducer._knn_search_index = nearest_neighbors(
+        reducer._raw_data,
+        reducer._n_neighbors,
+        reducer.metric,
+        reducer._metric_kwds,
+        False,
+        np.random.RandomState(SEED),
+        n_jobs=1,
+    )
+
+
+def _transform_in_batches(reducer: Any, data: np.ndarray) -> np.ndarray:
+    """
+    Embed new data with a fitted U-Map reducer, batch by batch in parallel.
+    """
+    batches = np.array_split(data, max(1, len(data) // TRANSFORM_BATCH_SIZE))
+
+    def _transform(batch: np.ndarray) -> np.ndarray:
+        check_cancelled()
+        return reducer.transform(batch)
+
+    # The first batch lazily builds the search index, which is not thread-safe.
+    embeddings = [_transform(batches[0])]
+    with ThreadPoolExecutor(TRANSFORM_THREADS) as executor:
+        embeddings.extend(executor.map(_transform, batches[1:]))
+    return np.vstack(embeddings)
+
+
+def prepare_data(
     table: DataSource,
     dtypes: ColumnTypeMapping,
     column_names: List[str],
     indices: List[int],
+) -> Tuple[np.ndarray, List[int]]:
+    """
+    Align data from table's columns for a reduction, no data if the columns
+    cannot be reduced.
+    """
+    try:
+        return get_aligned_data(table, dtypes, column_names, indices)
+    except (ColumnNotExistsError, ColumnNotEmbeddable, ValueError):
+        return np.empty(0, np.float64), []
+
+
+def warm_up() -> None:
+    """
+    Fit U-Map on tiny random data and embed some of it again, so that the
+    compiled code is ready and the first reduction in a worker is as fast as
+    later ones.
+    """
+    # pylint: disable=import-outside-toplevel
+    import umap
+
+    data = np.random.default_rng(SEED).random((100, 4), dtype=np.float32)
+    # Small data goes through exact, large data through approximate nearest
+    # neighbor search.
+    for force_approximation_algorithm in (False, True):
+        reducer = umap.UMAP(
+            n_neighbors=5,
+            n_epochs=10,
+            random_state=SEED,
+            force_approximation_algorithm=force_approximation_algorithm,
+        )
+        reducer.fit(data)
+    reducer.transform(data[:10])
+
+
+def compute_umap(
+    data: SharedArray,
     n_neighbors: int,
     metric: str,
     min_dist: float,
-) -> Tuple[np.ndarray, List[int]]:
+    sample_size: Optional[int] = None,
+    reducer_key: Optional[str] = None,
+    refit_threshold: float = 0.0,
+) -> Tuple[np.ndarray, str]:
     """
-    Prepare data from table and compute U-Map on them.
+    Compute U-Map on aligned data.
+
+    If there are more rows than `sample_size`, U-Map is fitted on a sample of
+    them and the remaining rows are embedded afterwards ("sample" mode instead
+    of "full" mode).
+
+    If `reducer_key` is given, the fitted reducer is kept. When rows have only
+    been appended since, they are embedded with it instead of fitting U-Map
+    anew, unless more than `refit_threshold` times the fitted rows have been
+    appended.
+
+    Intermediate layouts are reported as progress along with the positions of
+    the embedded rows (`None` for all rows) and the mode.
     """
-    # pylint: disable=import-outside-toplevel, too-many-arguments
+    with data.open() as array:
+        if reducer_key is not None:
+            result = _update_umap(array, reducer_key, refit_threshold)
+            if result is not None:
+                return result
+        return _compute_umap(
+            array, n_neighbors, metric, min_dist, sample_size, reducer_key
+        )
 
-    try:
-        data, indices = get_aligned_data(table, dtypes, column_names, indices)
-    except (ColumnNotExistsError, ColumnNotEmbeddable):
-        return np.empty(0, np.float64), []
-    if data.size == 0:
-        return np.empty(0, np.float64), []
 
+def _compute_umap(
+    data: np.ndarray,
+    n_neighbors: int,
+    metric: str,
+    min_dist: float,
+    sample_size: Optional[int],
+    reducer_key: Optional[str] = None,
+) -> Tuple[np.ndarray, str]:
+    # pylint: disable=import-outside-toplevel, too-many-arguments
     from sklearn import preprocessing
 
+    data_hash = None if reducer_key is None else _hash_array(data)
+    scaler: Optional[Any] = None
     if metric == "standardized euclidean":
-        data = preprocessing.StandardScaler(copy=False).fit_transform(data)
+        scaler = preprocessing.StandardScaler(copy=False)
         metric = "euclidean"
     elif metric == "robust euclidean":
-        data = preprocessing.RobustScaler(copy=False).fit_transform(data)
+        scaler = preprocessing.RobustScaler(copy=False)
         metric = "euclidean"
+    if scaler is not None:
+        data = scaler.fit_transform(data)
     if data.shape[1] == 2:
-        return data, indices
+        return np.array(data), FULL_MODE
 
     import umap
 
-    embeddings = umap.UMAP(
-        n_neighbors=n_neighbors, metric=metric, min_dist=min_dist, random_state=SEED
-    ).fit_transform(data)
-    return cast(np.ndarray, embeddings), indices
+    check_cancelled()
+    if sample_size is None or len(data) <= max(sample_size, n_neighbors + 1):
+        parameters: Dict[str, Any] = {}
+        if len(data) >= KNN_CACHE_MIN_ROWS and _has_precomputed_knn(umap.UMAP):
+            # The search index is only built if new rows are embedded later.
+            knn_indices, knn_dists = get_knn_graph(data, n_neighbors, metric)
+            parameters["precomputed_knn"] = (knn_indices, knn_dists, None)
+        reducer = umap.UMAP(
+            n_neighbors=n_neighbors,
+            metric=metric,
+            min_dist=min_dist,
+            random_state=SEED,
+            **parameters,
+        )
+        with _watch_umap_epochs(reducer, None, FULL_MODE), warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="precomputed_knn\\[2\\]")
+            embeddings = cast(np.ndarray, reducer.fit_transform(data))
+        mode = FULL_MODE
+    else:
+        reducer = umap.UMAP(
+            n_neighbors=n_neighbors,
+            metric=metric,
+            min_dist=min_dist,
+            random_state=SEED,
+        )
+        sample = stratified_sample(len(data), max(sample_size, n_neighbors + 1))
+        rest_mask = np.ones(len(data), dtype=bool)
+        rest_mask[sample] = False
+        embeddings = np.empty((len(data), 2), dtype=np.float32)
+        with _watch_umap_epochs(reducer, sample, SAMPLE_MODE):
+            embeddings[sample] = reducer.fit_transform(data[sample])
+        embeddings[rest_mask] = _transform_in_batches(reducer, data[rest_mask])
+        mode = SAMPLE_MODE
+
+    if reducer_key is not None:
+        _store_umap_reducer(
+            reducer_key, (reducer, scaler, data_hash, embeddings, len(data), mode)
+        )
+    return embeddings, mode
+
+
+def _store_umap_reducer(reducer_key: str, entry: Tuple[Any, ...]) -> None:
+    """
+    Keep a fitted U-Map reducer along with the scaler, the hash of the data,
+    the embeddings, the number of fitted rows and the mode as a single entry
+    in the worker's memory and, for small enough tables, in the cache.
+    """
+    _umap_reducers[reducer_key] = entry
+    _umap_reducers.move_to_end(reducer_key)
+    while len(_umap_reducers) > UMAP_REDUCERS_IN_MEMORY:
+        _umap_reducers.popitem(last=False)
+    embeddings = entry[3]
+    if len(embeddings) <= UMAP_REDUCER_CACHE_MAX_ROWS:
+        umap_reducer_cache[reducer_key] = entry
+
+
+def _load_umap_reducer(reducer_key: str) -> Optional[Tuple[Any, ...]]:
+    """
+    Get a fitted U-Map reducer's entry from the worker's memory or the cache.
+    """
+    try:
+        entry = _umap_reducers[reducer_key]
+    except KeyError:
+        ...
+    else:
+        _umap_reducers.move_to_end(reducer_key)
+        return entry
+    try:
+        return umap_reducer_cache[reducer_key]
+    except KeyError:
+        return None
+
+
+def _update_umap(
+    data: np.ndarray, reducer_key: str, refit_threshold: float
+) -> Optional[Tuple[np.ndarray, str]]:
+    """
+    Embed rows appended since the last U-Map with the given key with its
+    fitted reducer, so that the former rows keep their positions.
+
+    Returns `None` if U-Map has to be fitted anew: there is no fitted reducer,
+    the former rows changed or too many rows have been appended.
+    """
+    entry = _load_umap_reducer(reducer_key)
+    if entry is None:
+        return None
+    reducer, scaler, data_hash, embeddings, fitted_rows, mode = entry
+    rows = len(embeddings)
+    if len(data) < rows or len(data) - fitted_rows > refit_threshold * fitted_rows:
+        return None
+    if _hash_array(data[:rows]) != data_hash:
+        return None
+    if len(data) == rows:
+        return embeddings, mode
+
+    new_data = data[rows:]
+    if scaler is not None:
+        new_data = scaler.transform(new_data)
+    _build_search_index(reducer)
+    embeddings = np.vstack((embeddings, _transform_in_batches(reducer, new_data)))
+    _store_umap_reducer(
+        reducer_key,
+        (reducer, scaler, _hash_array(data), embeddings, fitted_rows, mode),
+    )
+    return embeddings, mode
+
+
+def _has_precomputed_knn(umap_class: type) -> bool:
+    """
+    Check whether U-Map accepts a precomputed kNN graph (U-Map 0.5.1+).
+    """
+    return "precomputed_knn" in inspect.signature(umap_class).parameters
 
 
 def compute_pca(
-    table: DataSource,
-    dtypes: ColumnTypeMapping,
-    column_names: List[str],
-    indices: List[int],
-    normalization: str,
-) -> Tuple[np.ndarray, List[int]]:
+    data: SharedArray, normalization: str, sample_size: Optional[int] = None
+) -> Tuple[np.ndarray, str]:
     """
-    Prepare data from table and compute PCA on them.
+    Compute PCA on aligned data.
+
+    If there are more rows than `sample_size`, randomized instead of full
+    singular value decomposition is used ("randomized" mode instead of "full"
+    mode).
     """
     # pylint: disable=import-outside-toplevel
     from sklearn import preprocessing, decomposition
 
-    try:
-        data, indices = get_aligned_data(table, dtypes, column_names, indices)
-    except (ColumnNotExistsError, ValueError):
-        return np.empty(0, np.float64), []
-    if data.size == 0:
-        return np.empty(0, np.float64), []
-    if data.shape[1] == 1:
-        return np.hstack((data, np.zeros_like(data))), indices
-    if normalization == "standardize":
-        data = preprocessing.StandardScaler(copy=False).fit_transform(data)
-    elif normalization == "robust standardize":
-        data = preprocessing.RobustScaler(copy=False).fit_transform(data)
-    reducer = decomposition.PCA(n_components=2, copy=False, random_state=SEED)
-    embeddings = reducer.fit_transform(data)
-    return embeddings, indices
+    with data.open() as array:
+        if array.shape[1] == 1:
+            return np.hstack((array, np.zeros_like(array))), FULL_MODE
+        if normalization == "standardize":
+            array = preprocessing.StandardScaler(copy=False).fit_transform(array)
+        elif normalization == "robust standardize":
+            array = preprocessing.RobustScaler(copy=False).fit_transform(array)
+        if sample_size is not None and len(array) > sample_size:
+            mode = RANDOMIZED_MODE
+            svd_solver = "randomized"
+        else:
+            mode = FULL_MODE
+            svd_solver = "auto"
+        check_cancelled()
+        reducer = decomposition.PCA(
+            n_components=2, copy=False, svd_solver=svd_solver, random_state=SEED
+        )
+        return reducer.fit_transform(array), mode
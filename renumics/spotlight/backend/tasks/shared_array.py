@@ -0,0 +1,66 @@
+"""
+This module provides arrays shared with tasks running in worker processes
+"""
+
+import contextlib
+import dataclasses
+from multiprocessing import shared_memory
+from typing import Iterator, Tuple
+
+import numpy as np
+
+
+@dataclasses.dataclass(frozen=True)
+class SharedArray:
+    """
+    Handle of a `numpy` array in shared memory.
+
+    Only the handle is pickled when it is passed to a task, the task maps the
+    array's memory without copying it. The creator should `unlink` the array
+    once no task needs it anymore.
+    """
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+    @classmethod
+    def create(cls, array: np.ndarray) -> "SharedArray":
+        """
+        Copy an array into new shared memory.
+        """
+        memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        try:
+            shared: np.ndarray = np.ndarray(array.shape, array.dtype, buffer=memory.buf)
+            shared[...] = array
+            del shared
+            return cls(memory.name, array.shape, array.dtype.str)
+        finally:
+            memory.close()
+
+    @contextlib.contextmanager
+    def open(self) -> Iterator[np.ndarray]:
+        """
+        Map the array. The array must not be used after the context exits.
+        """
+        memory = shared_memory.SharedMemory(self.name)
+        try:
+            yield np.ndarray(self.shape, np.dtype(self.dtype), buffer=memory.buf)
+        finally:
+            try:
+                memory.close()
+            except BufferError:
+                # Views of the array are still referenced, e.g. by a traceback.
+                # The memory is unmapped once they are garbage collected.
+                ...
+
+    def unlink(self) -> None:
+        """
+        Free the shared memory once all processes unmapped it.
+        """
+        try:
+            memory = shared_memory.SharedMemory(self.name)
+        except FileNotFoundError:
+            return
+        memory.close()
+        memory.unlink()
@@ -4,7 +4,13 @@ This module provides a simple dataclass for storing task information
 
 import dataclasses
 from concurrent.futures import Future
-from typing import Optional, Union
+from typing import Dict, Optional, Union
+
+from .shared_array import SharedArray
+
+# Task priorities, tasks with lower values run first.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
 
 
 @dataclasses.dataclass
@@ -16,3 +22,26 @@ class Task:
     name: Optional[str]
     tag: Optional[Union[str, int]]
     future: Future
+    progress_id: Optional[str] = None
+    # Set to ask the running task to stop.
+    cancel_flag: Optional[SharedArray] = None
+    priority: int = PRIORITY_INTERACTIVE
+    # Monotonic times of the task's creation and start.
+    created_at: float = 0.0
+    started_at: Optional[float] = None
+
+
+@dataclasses.dataclass
+class TaskStats:
+    """
+    Load of a task manager.
+    """
+
+    workers: int
+    running: int
+    # Queued tasks per priority.
+    queued: Dict[int, int]
+    # Finished tasks, mean waiting and running times in seconds per function.
+    finished: Dict[str, int]
+    wait_times: Dict[str, float]
+    run_times: Dict[str, float]
@@ -3,28 +3,155 @@ This module provides a simple managment class for long running tasks
 """
 
 import asyncio
+import collections
+import functools
 import multiprocessing
+import os
+import threading
+import time
+import uuid
 from concurrent.futures import Future, ProcessPoolExecutor
 from concurrent.futures.process import BrokenProcessPool
-from typing import Any, Callable, List, Optional, Sequence, TypeVar, Union
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    OrderedDict,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import numpy as np
+from loguru import logger
 
 from .exceptions import TaskCancelled
-from .task import Task
+from .shared_array import SharedArray
+from .task import PRIORITY_INTERACTIVE, Task, TaskStats
+from .worker import init_worker, run_task, warm_up_worker
 
 T = TypeVar("T")
 
+# Memory to reserve for each worker process when sizing the pool.
+WORKER_MEMORY = 1 << 30
+
+_QueuedTask = Tuple[Task, Callable, Sequence[Any]]
+
+
+def _get_available_memory() -> Optional[int]:
+    """
+    Get the memory in bytes available for new processes, if known.
+    """
+    try:
+        with open("/proc/meminfo", encoding="ascii") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        ...
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def get_worker_count() -> int:
+    """
+    Size a worker pool from the available CPUs and memory.
+
+    One CPU is left for the server itself.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    workers = cpus - 1
+    memory = _get_available_memory()
+    if memory is not None:
+        workers = min(workers, memory // WORKER_MEMORY)
+    return max(1, workers)
+
+
+def _get_func_name(func: Callable) -> str:
+    while isinstance(func, functools.partial):
+        func = func.func
+    return getattr(func, "__qualname__", type(func).__qualname__)
+
 
 class TaskManager:
     """
     Handles task creation, deletion and cleanup
+
+    Tasks are queued by the task manager itself and handed to the worker pool
+    only when a worker is free. Queued tasks with a higher priority run first,
+    tasks of the same priority take turns between tags (e.g. connections).
     """
 
     tasks: List[Task]
     pool: ProcessPoolExecutor
+    workers: int
+    _lock: threading.Lock
+    _queues: Dict[int, OrderedDict[Optional[Union[str, int]], Deque[_QueuedTask]]]
+    _running: int
+    _times: Dict[str, Tuple[int, float, float]]
+    # Futures submitted to the pool which are not done yet.
+    _pool_futures: Set[Future]
+    _progress_queue: "multiprocessing.Queue[Any]"
+    _progress_callbacks: Dict[str, Callable[[Any], None]]
+    _progress_thread: threading.Thread
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        preload: Sequence[str] = (),
+        warm_up: Optional[Callable[[], None]] = None,
+        workers: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            preload: Modules imported by workers before they run tasks.
+            warm_up: A function run once by the first worker, which is
+                started in the background right away, e.g. to compile code.
+                Other workers prepare themselves on their first task. If only
+                `preload` is given, the first worker is started as well.
+            workers: Number of worker processes. By default, sized from the
+                available CPUs and memory.
+        """
         self.tasks = []
-        self.pool = ProcessPoolExecutor(8, multiprocessing.get_context("spawn"))
+        self.workers = get_worker_count() if workers is None else max(1, workers)
+        self._lock = threading.Lock()
+        self._queues = {}
+        self._running = 0
+        self._times = {}
+        self._pool_futures = set()
+        context: multiprocessing.context.BaseContext
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            # Workers are forked from a server process which imported the
+            # modules once.
+            context = multiprocessing.get_context("forkserver")
+            multiprocessing.set_forkserver_preload([__name__, *preload])
+        else:
+            context = multiprocessing.get_context("spawn")
+        self._progress_queue = context.Queue()
+        self._progress_callbacks = {}
+        self.pool = ProcessPoolExecutor(
+            self.workers,
+            context,
+            initializer=init_worker,
+            initargs=(self._progress_queue, tuple(preload)),
+        )
+        self._progress_thread = threading.Thread(
+            target=self._forward_progress, daemon=True
+        )
+        self._progress_thread.start()
+        if warm_up is not None:
+            self._track_pool_future(self.pool.submit(warm_up_worker, warm_up))
+        elif preload:
+            self._track_pool_future(self.pool.submit(int))
 
     def create_task(
         self,
@@ -32,19 +159,39 @@ class TaskManager:
         args: Sequence[Any],
         name: Optional[str] = None,
         tag: Optional[Union[str, int]] = None,
+        on_progress: Optional[Callable[[Any], None]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
     ) -> Task:
         """
         create and launch a new task
+
+        If `on_progress` is given, it is called from a background thread with
+        each intermediate result the task reports.
         """
         # cancel running task with same name
         self.cancel(name=name)
 
-        future = self.pool.submit(func, *args)
+        progress_id = None
+        if on_progress is not None:
+            progress_id = uuid.uuid4().hex
+            self._progress_callbacks[progress_id] = on_progress
+        cancel_flag = SharedArray.create(np.zeros(1, dtype=bool))
+        future: Future = Future()
 
-        task = Task(name, tag, future)
+        task = Task(
+            name,
+            tag,
+            future,
+            progress_id,
+            cancel_flag,
+            priority,
+            created_at=time.monotonic(),
+        )
         self.tasks.append(task)
 
         def _cleanup(_: Future) -> None:
+            self._remove_progress_callback(task)
+            cancel_flag.unlink()
             try:
                 self.tasks.remove(task)
             except ValueError:
@@ -53,6 +200,11 @@ class TaskManager:
 
         future.add_done_callback(_cleanup)
 
+        with self._lock:
+            queues = self._queues.setdefault(priority, collections.OrderedDict())
+            queues.setdefault(tag, collections.deque()).append((task, func, args))
+        self._dispatch()
+
         return task
 
     async def run_async(
@@ -61,12 +213,26 @@ class TaskManager:
         args: Sequence[Any],
         name: Optional[str] = None,
         tag: Optional[Union[str, int]] = None,
+        on_progress: Optional[Callable[[Any], None]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
     ) -> T:
         """
         Launch a new task. Await and return result.
+
+        If `on_progress` is given, it is called in the event loop with each
+        intermediate result the task reports.
         """
 
-        task = self.create_task(func, args, name, tag)
+        if on_progress is None:
+            task = self.create_task(func, args, name, tag, priority=priority)
+        else:
+            loop = asyncio.get_running_loop()
+            callback = on_progress
+
+            def _on_progress(value: Any) -> None:
+                loop.call_soon_threadsafe(callback, value)
+
+            task = self.create_task(func, args, name, tag, _on_progress, priority)
         try:
             return await asyncio.wrap_future(task.future)
         except BrokenProcessPool as e:
@@ -77,6 +243,9 @@ class TaskManager:
     ) -> None:
         """
         Cancel running and queued tasks.
+
+        Queued tasks are dropped, running tasks stop at their next
+        `check_cancelled` call.
         """
 
         tasks_to_remove = []
@@ -95,7 +264,7 @@ class TaskManager:
                     tasks_to_remove.append(task)
 
         for task in tasks_to_remove:
-            task.future.cancel()
+            self._cancel_task(task)
             try:
                 self.tasks.remove(task)
             except ValueError:
@@ -106,14 +275,178 @@ class TaskManager:
         """
         Cancel all running and queued tasks.
         """
-        for task in self.tasks:
-            task.future.cancel()
+        for task in list(self.tasks):
+            self._cancel_task(task)
         self.tasks.clear()
+        self._progress_callbacks.clear()
+
+    def stats(self) -> TaskStats:
+        """
+        Get the current queue depths and the times of finished tasks.
+        """
+        with self._lock:
+            queued = {
+                priority: sum(len(queue) for queue in queues.values())
+                for priority, queues in self._queues.items()
+            }
+            return TaskStats(
+                workers=self.workers,
+                running=self._running,
+                queued={priority: n for priority, n in queued.items() if n},
+                finished={name: n for name, (n, _, _) in self._times.items()},
+                wait_times={
+                    name: wait / n for name, (n, wait, _) in self._times.items()
+                },
+                run_times={
+                    name: run / n for name, (n, _, run) in self._times.items()
+                },
+            )
 
     def shutdown(self) -> None:
         """
         Shutdown and cleanup tasks and internal process pool.
         This task manager instance won't work after this operation!
+
+        Running tasks and worker warm-ups are terminated, not waited for.
         """
         self.cancel_all()
+        # `ProcessPoolExecutor.shutdown(cancel_futures=True)` needs Python 3.9.
+        with self._lock:
+            pool_futures = list(self._pool_futures)
+        for pool_future in pool_futures:
+            pool_future.cancel()
+        # pylint: disable=protected-access
+        processes = list((self.pool._processes or {}).values())
+        for process in processes:
+            process.terminate()
         self.pool.shutdown(wait=True)
+        self._progress_queue.put(None)
+        self._progress_thread.join()
+
+    def _cancel_task(self, task: Task) -> None:
+        with self._lock:
+            queue = self._queues.get(task.priority, {}).get(task.tag)
+            if queue is not None:
+                for queued_task in queue:
+                    if queued_task[0] is task:
+                        queue.remove(queued_task)
+                        break
+        if not task.future.cancel() and task.cancel_flag is not None:
+            # The task is already running, ask it to stop.
+            try:
+                with task.cancel_flag.open() as flag:
+                    flag[0] = True
+            except FileNotFoundError:
+                # The task is already done.
+                ...
+        self._remove_progress_callback(task)
+
+    def _pop_next_task(self) -> Optional[_QueuedTask]:
+        """
+        Take the next task of the highest priority, take turns between tags.
+        """
+        for priority in sorted(self._queues):
+            queues = self._queues[priority]
+            while queues:
+                tag, queue = next(iter(queues.items()))
+                if not queue:
+                    del queues[tag]
+                    continue
+                queued_task = queue.popleft()
+                if queue:
+                    queues.move_to_end(tag)
+                else:
+                    del queues[tag]
+                return queued_task
+        return None
+
+    def _dispatch(self) -> None:
+        """
+        Hand queued tasks to the pool while workers are free.
+        """
+        while True:
+            with self._lock:
+                if self._running >= self.workers:
+                    return
+                queued_task = self._pop_next_task()
+                if queued_task is None:
+                    return
+                task, func, args = queued_task
+                if not task.future.set_running_or_notify_cancel():
+                    continue
+                self._running += 1
+                task.started_at = time.monotonic()
+            try:
+                pool_future = self.pool.submit(
+                    run_task, task.progress_id, task.cancel_flag, func, *args
+                )
+            except (RuntimeError, BrokenProcessPool) as e:
+                # The pool is shut down or broken.
+                with self._lock:
+                    self._running -= 1
+                task.future.set_exception(TaskCancelled(str(e)))
+                continue
+            self._track_pool_future(pool_future)
+            pool_future.add_done_callback(
+                functools.partial(self._on_task_done, task, _get_func_name(func))
+            )
+
+    def _track_pool_future(self, pool_future: Future) -> None:
+        """
+        Remember a future of the process pool until it is done, so that it can
+        be cancelled on shutdown.
+        """
+        with self._lock:
+            self._pool_futures.add(pool_future)
+        pool_future.add_done_callback(self._untrack_pool_future)
+
+    def _untrack_pool_future(self, pool_future: Future) -> None:
+        with self._lock:
+            self._pool_futures.discard(pool_future)
+
+    def _on_task_done(self, task: Task, func_name: str, pool_future: Future) -> None:
+        finished_at = time.monotonic()
+        started_at = finished_at if task.started_at is None else task.started_at
+        wait_time = started_at - task.created_at
+        run_time = finished_at - started_at
+        with self._lock:
+            self._running -= 1
+            n, total_wait, total_run = self._times.get(func_name, (0, 0.0, 0.0))
+            self._times[func_name] = (
+                n + 1,
+                total_wait + wait_time,
+                total_run + run_time,
+            )
+        logger.debug(
+            f"Task {func_name} ran {run_time:.2f}s after waiting {wait_time:.2f}s."
+        )
+        if pool_future.cancelled():
+            task.future.set_exception(TaskCancelled())
+        elif pool_future.exception() is not None:
+            task.future.set_exception(pool_future.exception())
+        else:
+            task.future.set_result(pool_future.result())
+        self._dispatch()
+
+    def _remove_progress_callback(self, task: Task) -> None:
+        if task.progress_id is not None:
+            self._progress_callbacks.pop(task.progress_id, None)
+
+    def _forward_progress(self) -> None:
+        """
+        Pass progress reports of running tasks on to their callbacks, drop
+        reports of finished or cancelled tasks.
+        """
+        while True:
+            report = self._progress_queue.get()
+            if report is None:
+                break
+            progress_id, value = report
+            callback = self._progress_callbacks.get(progress_id)
+            if callback is None:
+                continue
+            try:
+                callback(value)
+            except RuntimeError:
+                # The callback's event loop is already closed.
+                ...
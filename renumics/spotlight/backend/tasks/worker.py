@@ -0,0 +1,105 @@
+"""
+This module provides the context of tasks running in worker processes
+"""
+
+import importlib
+import multiprocessing
+from typing import Any, Callable, Optional, Sequence, TypeVar
+
+import numpy as np
+from loguru import logger
+
+from .exceptions import TaskCancelled
+from .shared_array import SharedArray
+
+T = TypeVar("T")
+
+# Set in worker processes only.
+# pylint: disable=invalid-name
+_progress_queue: Optional["multiprocessing.Queue[Any]"] = None
+_progress_id: Optional[str] = None
+_cancel_flag: Optional[np.ndarray] = None
+
+
+def init_worker(
+    progress_queue: "multiprocessing.Queue[Any]", preload: Sequence[str]
+) -> None:
+    """
+    Initialize a worker process to send progress reports to the given queue
+    and import everything tasks need.
+    """
+    global _progress_queue  # pylint: disable=global-statement
+    _progress_queue = progress_queue
+    try:
+        for module_name in preload:
+            importlib.import_module(module_name)
+    except Exception as e:  # pylint: disable=broad-except
+        # A failing initializer would break the whole pool.
+        logger.warning(f"Preparing task worker failed: {e}")
+
+
+def warm_up_worker(warm_up: Callable[[], None]) -> None:
+    """
+    Warm up the worker process this runs in, e.g. compile code tasks need.
+    """
+    try:
+        warm_up()
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning(f"Warming up task worker failed: {e}")
+
+
+def run_task(
+    progress_id: Optional[str],
+    cancel_flag: SharedArray,
+    func: Callable[..., T],
+    *args: Any,
+) -> T:
+    """
+    Run a task in a worker process, tag its progress reports with the given
+    ID and let it watch the given cancellation flag.
+    """
+    global _progress_id, _cancel_flag  # pylint: disable=global-statement
+    with cancel_flag.open() as flag:
+        _progress_id = progress_id
+        _cancel_flag = flag
+        try:
+            return func(*args)
+        finally:
+            _progress_id = None
+            _cancel_flag = None
+
+
+def report_progress(value: Any) -> None:
+    """
+    Report an intermediate result of the running task.
+
+    Does nothing if nobody listens to the task's progress.
+    """
+    if _progress_queue is None or _progress_id is None:
+        return
+    _progress_queue.put((_progress_id, value))
+
+
+def is_progress_reported() -> bool:
+    """
+    Check whether somebody listens to the running task's progress.
+    """
+    return _progress_queue is not None and _progress_id is not None
+
+
+def is_task_running() -> bool:
+    """
+    Check whether the code runs as a task in a worker process.
+    """
+    return _cancel_flag is not None
+
+
+def check_cancelled() -> None:
+    """
+    Raise `TaskCancelled` if the running task has been cancelled.
+
+    Long-running tasks should call it regularly, a running task cannot be
+    stopped otherwise.
+    """
+    if _cancel_flag is not None and _cancel_flag[0]:
+        raise TaskCancelled()
@@ -6,17 +6,28 @@ import asyncio
 import dataclasses
 import functools
 import json
-from typing import Any, List, Optional, Set, Callable
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
+import numpy as np
 from fastapi import WebSocket, WebSocketDisconnect
 from loguru import logger
 from pydantic.dataclasses import dataclass
 from typing_extensions import Literal
 
 from renumics.spotlight.dtypes.typing import ColumnTypeMapping
+from renumics.spotlight.settings import settings
 from .data_source import DataSource, sanitize_values
-from .tasks import TaskManager, TaskCancelled
-from .tasks.reduction import compute_umap, compute_pca
+from .tasks import PRIORITY_INTERACTIVE, TaskManager, TaskCancelled
+from .tasks.reduction import (
+    FULL_MODE,
+    compute_umap,
+    compute_pca,
+    get_reduction_cache_key,
+    get_umap_reducer_key,
+    prepare_data,
+    reduction_cache,
+)
+from .tasks.shared_array import SharedArray
 from .exceptions import GenerationIDMismatch
 
 
@@ -80,6 +91,7 @@ class UMapRequestData(ReductionRequestData):
     n_neighbors: int
     metric: str
     min_dist: float
+    sample_size: Optional[int] = None
 
 
 @dataclass
@@ -89,6 +101,7 @@ class PCARequestData(ReductionRequestData):
     """
 
     normalization: str
+    sample_size: Optional[int] = None
 
 
 @dataclass
@@ -117,6 +130,7 @@ class ReductionResponseData:
 
     indices: List[int]
     points: List[List[float]]
+    mode: str = "full"
 
 
 @dataclass
@@ -131,6 +145,7 @@ class ReductionResponse(ReductionMessage):
 MESSAGE_BY_TYPE = {
     "umap": UMapRequest,
     "umap_result": ReductionResponse,
+    "umap_progress": ReductionResponse,
     "pca": PCARequest,
     "pca_result": ReductionResponse,
     "refresh": RefreshMessage,
@@ -173,10 +188,15 @@ class WebsocketConnection:
 
     websocket: WebSocket
     manager: "WebsocketManager"
+    _pending_messages: Dict[str, Message]
+    # UID of the latest request per widget.
+    _latest_requests: Dict[str, str]
 
     def __init__(self, websocket: WebSocket, manager: "WebsocketManager") -> None:
         self.websocket = websocket
         self.manager = manager
+        self._pending_messages = {}
+        self._latest_requests = {}
 
     async def send_async(self, message: Message) -> None:
         """
@@ -196,6 +216,42 @@ class WebsocketConnection:
         """
         self.manager.loop.create_task(self.send_async(message))
 
+    def send_latest(self, key: str, message: Message) -> None:
+        """
+        Send a message without async, superseding messages with the same key
+        which are not sent yet.
+        """
+        if key in self._pending_messages:
+            self._pending_messages[key] = message
+            return
+        self._pending_messages[key] = message
+        self.manager.loop.create_task(self._send_pending(key))
+
+    def discard_pending(self, key: str) -> None:
+        """
+        Drop a message with the given key which is not sent yet.
+        """
+        self._pending_messages.pop(key, None)
+
+    def start_request(self, widget_id: str, uid: str) -> None:
+        """
+        Make a request the latest one of its widget and cancel the widget's
+        running task.
+        """
+        self._latest_requests[widget_id] = uid
+        self.task_manager.cancel(name=widget_id)
+
+    def is_latest_request(self, widget_id: str, uid: str) -> bool:
+        """
+        Check whether no newer request of the widget has been started.
+        """
+        return self._latest_requests.get(widget_id) == uid
+
+    async def _send_pending(self, key: str) -> None:
+        message = self._pending_messages.pop(key, None)
+        if message is not None:
+            await self.send_async(message)
+
     def _on_disconnect(self) -> None:
         self.manager.on_disconnect(self)
         self.task_manager.cancel(tag=id(self))
@@ -305,10 +361,84 @@ class WebsocketManager:
             callback(len(self.connections))
 
 
+async def _run_reduction(
+    connection: "WebsocketConnection",
+    request: ReductionMessage,
+    table: DataSource,
+    func: Callable[..., Tuple[np.ndarray, str]],
+    parameters: Dict[str, Any],
+    on_progress: Optional[Callable[[np.ndarray, List[int], str], None]] = None,
+) -> Tuple[np.ndarray, List[int], str]:
+    """
+    Get a reduction's result from the cache or compute it in the task pool.
+
+    The reduced data is aligned here and handed to the task in shared memory,
+    so that the data source is never sent to the task. Data is aligned on an
+    executor thread, data sources guard their caches against concurrent use. A request superseded
+    by a newer one of the same widget while its data is prepared is dropped.
+    """
+    # pylint: disable=too-many-arguments, too-many-locals
+    connection.start_request(request.widget_id, request.uid)
+    dtypes: ColumnTypeMapping = connection.websocket.app.dtypes
+    cache_key = get_reduction_cache_key(
+        request.type,
+        table,
+        dtypes,
+        request.data.columns,
+        request.data.indices,
+        **parameters,
+    )
+    try:
+        cached_result = reduction_cache[cache_key]
+    except KeyError:
+        ...
+    else:
+        return cached_result
+
+    data, valid_indices = await asyncio.get_running_loop().run_in_executor(
+        None,
+        prepare_data,
+        table,
+        dtypes,
+        request.data.columns,
+        request.data.indices,
+    )
+    if not connection.is_latest_request(request.widget_id, request.uid):
+        raise TaskCancelled()
+    if data.size == 0:
+        return np.empty(0, np.float64), [], FULL_MODE
+
+    def _on_progress(progress: Tuple[np.ndarray, Optional[np.ndarray], str]) -> None:
+        points, positions, mode = progress
+        if on_progress is not None:
+            indices = (
+                valid_indices
+                if positions is None
+                else np.asarray(valid_indices)[positions].tolist()
+            )
+            on_progress(points, indices, mode)
+
+    shared_data = SharedArray.create(data)
+    del data
+    try:
+        points, mode = await connection.task_manager.run_async(
+            functools.partial(func, **parameters),
+            (shared_data,),
+            name=request.widget_id,
+            tag=id(connection),
+            on_progress=None if on_progress is None else _on_progress,
+            priority=PRIORITY_INTERACTIVE,
+        )
+    finally:
+        shared_data.unlink()
+    result = (points, valid_indices, mode)
+    reduction_cache[cache_key] = result
+    return result
+
+
 @handle_message.register
 async def _(request: UMapRequest, connection: "WebsocketConnection") -> None:
     table: Optional[DataSource] = connection.websocket.app.data_source
-    dtypes: ColumnTypeMapping = connection.websocket.app.dtypes
     if table is None:
         return None
     try:
@@ -316,31 +446,57 @@ async def _(request: UMapRequest, connection: "WebsocketConnection") -> None:
     except GenerationIDMismatch:
         return
 
-    try:
-        points, valid_indices = await connection.task_manager.run_async(
-            compute_umap,
-            (
-                table,
-                dtypes,
-                request.data.columns,
-                request.data.indices,
-                request.data.n_neighbors,
-                request.data.metric,
-                request.data.min_dist,
+    finished = False
+
+    def _send_progress(points: np.ndarray, valid_indices: List[int], mode: str) -> None:
+        if finished:
+            # Reports can arrive late, the result supersedes them.
+            return
+        message = ReductionResponse(
+            type="umap_progress",
+            widget_id=request.widget_id,
+            uid=request.uid,
+            generation_id=request.generation_id,
+            data=ReductionResponseData(
+                indices=valid_indices, points=sanitize_values(points), mode=mode
             ),
-            name=request.widget_id,
-            tag=id(connection),
+        )
+        connection.send_latest(request.widget_id, message)
+
+    parameters = {
+        "n_neighbors": request.data.n_neighbors,
+        "metric": request.data.metric,
+        "min_dist": request.data.min_dist,
+        "sample_size": request.data.sample_size,
+    }
+    reducer_key = get_umap_reducer_key(
+        table,
+        connection.websocket.app.dtypes,
+        request.data.columns,
+        request.data.indices,
+        **parameters,
+    )
+    func = functools.partial(
+        compute_umap,
+        reducer_key=reducer_key,
+        refit_threshold=settings.umap_refit_threshold,
+    )
+    try:
+        points, valid_indices, mode = await _run_reduction(
+            connection, request, table, func, parameters, _send_progress
         )
     except TaskCancelled:
         ...
     else:
+        finished = True
+        connection.discard_pending(request.widget_id)
         response = ReductionResponse(
             type="umap_result",
             widget_id=request.widget_id,
             uid=request.uid,
             generation_id=request.generation_id,
             data=ReductionResponseData(
-                indices=valid_indices, points=sanitize_values(points)
+                indices=valid_indices, points=sanitize_values(points), mode=mode
             ),
         )
         await connection.send_async(response)
@@ -349,7 +505,6 @@ async def _(request: UMapRequest, connection: "WebsocketConnection") -> None:
 @handle_message.register
 async def _(request: PCARequest, connection: "WebsocketConnection") -> None:
     table: Optional[DataSource] = connection.websocket.app.data_source
-    dtypes: ColumnTypeMapping = connection.websocket.app.dtypes
     if table is None:
         return None
     try:
@@ -357,18 +512,13 @@ async def _(request: PCARequest, connection: "WebsocketConnection") -> None:
     except GenerationIDMismatch:
         return
 
+    parameters = {
+        "normalization": request.data.normalization,
+        "sample_size": request.data.sample_size,
+    }
     try:
-        points, valid_indices = await connection.task_manager.run_async(
-            compute_pca,
-            (
-                table,
-                dtypes,
-                request.data.columns,
-                request.data.indices,
-                request.data.normalization,
-            ),
-            name=request.widget_id,
-            tag=id(connection),
+        points, valid_indices, mode = await _run_reduction(
+            connection, request, table, compute_pca, parameters
         )
     except TaskCancelled:
         ...
@@ -379,7 +529,7 @@ async def _(request: PCARequest, connection: "WebsocketConnection") -> None:
             uid=request.uid,
             generation_id=request.generation_id,
             data=ReductionResponseData(
-                indices=valid_indices, points=sanitize_values(points)
+                indices=valid_indices, points=sanitize_values(points), mode=mode
             ),
         )
         await connection.send_async(response)
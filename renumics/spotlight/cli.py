@@ -6,7 +6,7 @@ import os
 import platform
 import signal
 import sys
-from typing import Optional, Tuple, Union
+from typing import Dict, Optional, Tuple, Union
 from pathlib import Path
 
 import click
@@ -46,6 +46,24 @@ def cli_dtype_callback(
     return dtype
 
 
+def cli_embedding_callback(
+    _ctx: click.Context, _param: click.Option, value: Tuple[str, ...]
+) -> Optional[Dict[str, str]]:
+    """
+    Parse embedding files from multiple strings in format
+    `COLUMN_NAME=PATH` to a dict.
+    """
+    if not value:
+        return None
+    embeddings = {}
+    for mapping in value:
+        column_name, separator, path = mapping.partition("=")
+        if not separator:
+            raise click.BadParameter("Embedding file separator '=' not specified.")
+        embeddings[column_name] = path
+    return embeddings
+
+
 @click.command()  # type: ignore
 @click.argument(
     "table-or-folder",
@@ -82,6 +100,15 @@ def cli_dtype_callback(
     + "|".join(sorted(COLUMN_TYPES_BY_NAME.keys()))
     + "} notation). Multiple settings allowed.",
 )
+@click.option(
+    "--embedding",
+    "embeddings",
+    type=click.UNPROCESSED,
+    callback=cli_embedding_callback,
+    multiple=True,
+    help="Embedding column from a `.npy` file of shape (n, d) (use "
+    "COLUMN_NAME=PATH notation). Multiple settings allowed.",
+)
 @click.option(
     "--no-browser",
     is_flag=True,
@@ -108,6 +135,7 @@ def main(
     port: Union[int, str],
     layout: Optional[str],
     dtype: Optional[ColumnTypeMapping],
+    embeddings: Optional[Dict[str, str]],
     no_browser: bool,
     filebrowsing: bool,
     analyze: bool,
@@ -129,6 +157,7 @@ def main(
     spotlight.show(
         table_or_folder,
         dtype=dtype,
+        embeddings=embeddings,
         host=host,
         port="auto" if port == "auto" else int(port),
         layout=layout,
@@ -0,0 +1,136 @@
+"""
+Scanning of media folders.
+"""
+
+import dataclasses
+import fnmatch
+import mimetypes
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import List, Optional, Set, Tuple, Type
+
+import av
+import PIL.Image
+
+from renumics.spotlight.dtypes import Audio, Image, Video
+from renumics.spotlight.dtypes.typing import FileBasedColumnType
+from renumics.spotlight.typing import PathType
+
+
+@dataclasses.dataclass(frozen=True)
+class MediaFolder:
+    """
+    A folder of media files to show in Spotlight.
+
+    Attributes:
+        path: The folder to scan recursively.
+        pattern: Optional glob-style pattern the files' paths relative to
+            `path` should match, e.g. "*.jpg" or "train/*.wav". `*` also
+            matches path separators. If not given, all image, audio and video
+            files are taken.
+    """
+
+    path: PathType
+    pattern: Optional[str] = None
+
+
+# (relative path, size in bytes, modification time in nanoseconds)
+FileEntry = Tuple[str, int, int]
+
+
+def get_media_type(path: PathType) -> Optional[Type[FileBasedColumnType]]:
+    """
+    Guess the media type of a file by its extension.
+    """
+    mimetype, _ = mimetypes.guess_type(str(path), strict=False)
+    if mimetype is None:
+        return None
+    media_type = mimetype.split("/", 1)[0]
+    if media_type == "image":
+        return Image
+    if media_type == "audio":
+        return Audio
+    if media_type == "video":
+        return Video
+    return None
+
+
+def _scan_directory(
+    folder: str, directory: str, pattern: Optional[str]
+) -> Tuple[List[FileEntry], List[str]]:
+    files: List[FileEntry] = []
+    subdirectories: List[str] = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.path)
+                continue
+            if not entry.is_file():
+                continue
+            relative_path = os.path.relpath(entry.path, folder).replace(os.sep, "/")
+            if pattern is None:
+                if get_media_type(entry.name) is None:
+                    continue
+            elif not fnmatch.fnmatch(relative_path, pattern):
+                continue
+            stat = entry.stat()
+            files.append((relative_path, stat.st_size, stat.st_mtime_ns))
+    return files, subdirectories
+
+
+def scan_folder(
+    folder: PathType, pattern: Optional[str] = None, max_workers: Optional[int] = None
+) -> List[FileEntry]:
+    """
+    Recursively find files in a folder, scanning directories in parallel.
+
+    Args:
+        folder: The folder to scan.
+        pattern: See `MediaFolder.pattern`.
+        max_workers: Number of threads to scan with.
+
+    Returns:
+        Paths relative to `folder` along with the files' sizes and modification
+        times, sorted by path.
+    """
+    folder = os.path.abspath(folder)
+    files: List[FileEntry] = []
+    with ThreadPoolExecutor(max_workers) as executor:
+        pending: Set[Future] = {
+            executor.submit(_scan_directory, folder, folder, pattern)
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                directory_files, subdirectories = future.result()
+                files.extend(directory_files)
+                pending.update(
+                    executor.submit(_scan_directory, folder, subdirectory, pattern)
+                    for subdirectory in subdirectories
+                )
+    files.sort()
+    return files
+
+
+def read_image_size(path: PathType) -> Tuple[int, int]:
+    """
+    Read the width and height of an image from its header.
+    """
+    with PIL.Image.open(path) as image:
+        size = image.size
+    return size
+
+
+def read_duration(path: PathType) -> float:
+    """
+    Read the duration of an audio or video file in seconds from its header.
+    """
+    duration = float("nan")
+    with av.open(str(path), "r") as container:
+        if container.duration is not None:
+            duration = container.duration / av.time_base
+        else:
+            stream = (container.streams.audio or container.streams.video)[0]
+            if stream.duration is not None and stream.time_base is not None:
+                duration = float(stream.duration * stream.time_base)
+    return duration
@@ -5,6 +5,7 @@ This module contains helpers for importing `pandas.DataFrame`s.
 import ast
 import os.path
 import statistics
+import warnings
 from contextlib import suppress
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Type
@@ -37,6 +38,11 @@ from renumics.spotlight.dtypes.typing import (
 from renumics.spotlight.typing import is_iterable, is_pathtype
 from renumics.spotlight.dtypes.base import DType
 
+SEED = 42
+
+# Flat list literal of numbers as written by `pandas` for lists and arrays.
+_NUMBER_LIST_PATTERN = r"^\[[^\[\]]+\]$"
+
 
 def is_empty(value: Any) -> bool:
     """
@@ -58,6 +64,70 @@ def try_literal_eval(x: str) -> Any:
     return x
 
 
+def _parse_numbers(text: str) -> np.ndarray:
+    """
+    Parse comma-separated numbers, raise `ValueError` on malformed input.
+    """
+    with warnings.catch_warnings():
+        # `numpy` only warns about unparsable input.
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            return np.fromstring(text, dtype=np.float64, sep=",")
+        except DeprecationWarning as e:
+            raise ValueError(f"Malformed number list: {text}") from e
+
+
+def parse_number_list(x: str, dtype: Type[np.floating] = np.float64) -> Any:
+    """
+    Parse a flat list literal of numbers (e.g. `"[0.1, 0.2]"`) into an array,
+    otherwise try to evaluate it as literal expression.
+    """
+    stripped = x.strip()
+    if stripped.startswith("[") and stripped.endswith("]"):
+        with suppress(ValueError):
+            values = _parse_numbers(stripped[1:-1])
+            if len(values) == stripped.count(",") + 1:
+                return values.astype(dtype, copy=False)
+    return try_literal_eval(x)
+
+
+def parse_number_lists(
+    column: pd.Series, dtype: Type[np.floating] = np.float64
+) -> pd.Series:
+    """
+    Parse string values of a `pandas` column which are flat list literals of
+    numbers (e.g. `"[0.1, 0.2]"`) into arrays.
+
+    Lists of the same length are parsed at once into a contiguous 2D array whose
+    rows are placed into the column. Other strings are parsed one by one (see
+    `parse_number_list`), non-string values are left as is.
+    """
+    values = column.to_numpy(dtype=object, copy=True)
+    str_positions = np.flatnonzero(is_string_mask(column).to_numpy())
+    strings = pd.Series(values[str_positions], dtype=object).str.strip()
+    list_mask = strings.str.match(_NUMBER_LIST_PATTERN).to_numpy(dtype=bool)
+    lengths = strings.str.count(",").to_numpy() + 1
+
+    parsed_mask = np.zeros(len(str_positions), dtype=bool)
+    for length in np.unique(lengths[list_mask]):
+        group_mask = list_mask & (lengths == length)
+        group = strings[group_mask].str.slice(1, -1)
+        try:
+            flat_values = _parse_numbers(",".join(group))
+        except ValueError:
+            continue
+        if len(flat_values) != len(group) * length:
+            continue
+        matrix = flat_values.reshape(len(group), length).astype(dtype, copy=False)
+        for position, row in zip(str_positions[group_mask], matrix):
+            values[position] = row
+        parsed_mask |= group_mask
+
+    for position in str_positions[~parsed_mask]:
+        values[position] = parse_number_list(values[position], dtype)
+    return pd.Series(values, index=column.index, name=column.name, dtype=object)
+
+
 def stringify_columns(df: pd.DataFrame) -> List[str]:
     """
     Convert `pandas.DataFrame`'s column names to strings, no matter which index
@@ -66,7 +136,9 @@ def stringify_columns(df: pd.DataFrame) -> List[str]:
     return [str(column_name) for column_name in df.columns]
 
 
-def infer_dtype(column: pd.Series) -> Type[ColumnType]:
+def infer_dtype(
+    column: pd.Series, sample_size: Optional[int] = None
+) -> Type[ColumnType]:
     """
     Get an equivalent Spotlight data type for a `pandas` column, if possible.
 
@@ -79,6 +151,9 @@ def infer_dtype(column: pd.Series) -> Type[ColumnType]:
 
     Args:
         column: A `pandas` column to infer dtype from.
+        sample_size: If given, infer non-scalar data types from a random sample
+            of at most this many values instead of the whole column. The whole
+            column is only scanned if the sample contains no non-empty values.
 
     Returns:
         Inferred dtype.
@@ -99,14 +174,34 @@ def infer_dtype(column: pd.Series) -> Type[ColumnType]:
     if pd.api.types.is_datetime64_any_dtype(column):
         return datetime
 
-    column = column.copy()
-    str_mask = is_string_mask(column)
-    column[str_mask] = column[str_mask].replace("", None)
-
-    column = column[~column.isna()]
+    if sample_size is not None and len(column) > sample_size:
+        rng = np.random.default_rng(SEED)
+        positions = np.sort(rng.choice(len(column), sample_size, replace=False))
+        sample = drop_empty(column.iloc[positions])
+        if len(sample) > 0:
+            dtype = _infer_non_empty_dtype(sample)
+            if dtype not in (Window, Embedding):
+                return dtype
+            # Sequences outside of the sample can be unaligned. Compare their
+            # lengths and only check the whole column if they are unknown.
+            column = drop_empty(column)
+            lengths = _sequence_lengths(column)
+            if lengths is None:
+                aligned = _are_aligned_sequences(column)
+            else:
+                aligned = len(np.unique(lengths)) <= 1
+            return dtype if aligned else Sequence1D
+
+    column = drop_empty(column)
     if len(column) == 0:
         return str
+    return _infer_non_empty_dtype(column)
 
+
+def _infer_non_empty_dtype(column: pd.Series) -> Type[ColumnType]:
+    """
+    Infer dtype of a `pandas` column without `NA`s and empty strings.
+    """
     column_head = column.iloc[:10]
     head_dtypes = column_head.apply(infer_value_dtype).to_list()
     dtype_mode = statistics.mode(head_dtypes)
@@ -114,18 +209,54 @@ def infer_dtype(column: pd.Series) -> Type[ColumnType]:
     if dtype_mode is None:
         return str
     if issubclass(dtype_mode, (Window, Embedding)):
-        str_mask = is_string_mask(column)
-        column[str_mask] = column[str_mask].apply(try_literal_eval)
-        dict_mask = column.map(type) == dict
-        column[dict_mask] = column[dict_mask].apply(prepare_hugging_face_dict)
-        try:
-            np.asarray(column.to_list(), dtype=float)
-        except (TypeError, ValueError):
+        if not _are_aligned_sequences(column):
             return Sequence1D
         return dtype_mode
     return dtype_mode
 
 
+def _are_aligned_sequences(column: pd.Series) -> bool:
+    """
+    Check whether all values of a `pandas` column are number sequences of the
+    same length.
+    """
+    try:
+        np.asarray(
+            [_prepare_sequence(value) for value in parse_number_lists(column)],
+            dtype=float,
+        )
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _sequence_lengths(column: pd.Series) -> Optional[np.ndarray]:
+    """
+    Get the lengths of a `pandas` column's sequences without parsing them,
+    `None` if they cannot be read that way (e.g. for dicts).
+
+    Number lists in strings are measured by their number of commas.
+    """
+    str_mask = is_string_mask(column).to_numpy()
+    lengths = np.empty(len(column), dtype=np.int64)
+    lengths[str_mask] = column[str_mask].str.count(",").to_numpy() + 1
+    try:
+        lengths[~str_mask] = column[~str_mask].map(
+            lambda value: -1 if isinstance(value, dict) else len(value)
+        )
+    except TypeError:
+        return None
+    if (lengths < 0).any():
+        return None
+    return lengths
+
+
+def _prepare_sequence(value: Any) -> Any:
+    if isinstance(value, dict):
+        value = prepare_hugging_face_dict(value)
+    return value
+
+
 def infer_array_dtype(value: np.ndarray) -> Type[ColumnType]:
     """
     Infer dtype of a numpy array
@@ -208,6 +339,16 @@ def infer_dtypes(
     return inferred_dtype
 
 
+def drop_empty(column: pd.Series) -> pd.Series:
+    """
+    Drop `NA`s and empty strings from a `pandas` column.
+    """
+    str_mask = is_string_mask(column)
+    empty_mask = str_mask.copy()
+    empty_mask[str_mask] = column[str_mask] == ""
+    return column[~(column.isna() | empty_mask)]
+
+
 def is_string_mask(column: pd.Series) -> pd.Series:
     """
     Return mask of column's elements of type string.
@@ -295,7 +436,10 @@ def prepare_column(column: pd.Series, dtype: Type[ColumnType]) -> pd.Series:
         # When `pandas` reads a csv, arrays and lists are read as literal strings,
         # try to interpret them.
         str_mask = is_string_mask(column)
-        column[str_mask] = column[str_mask].apply(try_literal_eval)
+        if dtype in (Embedding, Window):
+            column[str_mask] = parse_number_lists(column[str_mask])
+        else:
+            column[str_mask] = column[str_mask].apply(try_literal_eval)
 
         if is_file_based_column_type(dtype):
             dict_mask = column.map(type) == dict
@@ -0,0 +1,141 @@
+"""
+Access to SQLite and DuckDB databases.
+"""
+
+import dataclasses
+import sqlite3
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple
+
+from renumics.spotlight.typing import PathType
+
+DUCKDB_SUFFIXES = (".duckdb",)
+
+
+@dataclasses.dataclass(frozen=True)
+class SqlTable:
+    """
+    A table, view or query result of a SQLite or DuckDB database to show in
+    Spotlight.
+
+    Attributes:
+        path: The database file. It is opened with DuckDB if its suffix is
+            ".duckdb", otherwise with SQLite.
+        table: Name of the table or view to show. If neither `table` nor
+            `query` is given, the database should contain exactly one table.
+        query: A `SELECT` query to show the result of. It should have an
+            `ORDER BY` clause, since rows are read by their position.
+    """
+
+    path: PathType
+    table: Optional[str] = None
+    query: Optional[str] = None
+
+
+class DatabaseError(Exception):
+    """
+    A query on a database failed.
+    """
+
+
+def is_duckdb_file(path: PathType) -> bool:
+    """
+    Check whether a database file should be opened with DuckDB.
+    """
+    return Path(path).suffix in DUCKDB_SUFFIXES
+
+
+def quote_identifier(name: str) -> str:
+    """
+    Quote a table or column name for use in SQL.
+    """
+    escaped_name = name.replace('"', '""')
+    return f'"{escaped_name}"'
+
+
+def execute(path: PathType, sql: str) -> Tuple[List[str], Any]:
+    """
+    Run a query on a database file opened read-only.
+
+    The database is not kept open, so that other processes can write to it in
+    between.
+
+    Returns:
+        The result's column names and, for DuckDB, the result as an Arrow
+        table, for SQLite, the result's rows.
+    """
+    try:
+        if is_duckdb_file(path):
+            # pylint: disable=import-outside-toplevel
+            import duckdb
+
+            with duckdb.connect(str(path), read_only=True) as connection:
+                result = connection.execute(sql)
+                column_names = [column[0] for column in result.description]
+                return column_names, result.fetch_arrow_table()
+        uri = f"{Path(path).absolute().as_uri()}?mode=ro"
+        connection = sqlite3.connect(uri, uri=True)
+        try:
+            cursor = connection.execute(sql)
+            column_names = [column[0] for column in cursor.description]
+            return column_names, cursor.fetchall()
+        finally:
+            connection.close()
+    except ImportError:
+        raise
+    except Exception as e:
+        raise DatabaseError(f"Query failed on {path}: {e}") from e
+
+
+def iter_results(
+    path: PathType, sql: str, batch_size: int
+) -> Iterator[Tuple[List[str], Any]]:
+    """
+    Run a query on a database file opened read-only and read its result in
+    batches, so that only one batch of SQLite rows is held at a time.
+
+    Yields:
+        The result's column names and, for DuckDB, the whole result as an
+        Arrow table, for SQLite, a batch of at most `batch_size` rows. At least
+        one (possibly empty) batch is yielded.
+    """
+    try:
+        if is_duckdb_file(path):
+            yield execute(path, sql)
+            return
+        uri = f"{Path(path).absolute().as_uri()}?mode=ro"
+        connection = sqlite3.connect(uri, uri=True)
+        try:
+            cursor = connection.execute(sql)
+            column_names = [column[0] for column in cursor.description]
+            rows = cursor.fetchmany(batch_size)
+            yield column_names, rows
+            while rows:
+                rows = cursor.fetchmany(batch_size)
+                if rows:
+                    yield column_names, rows
+        finally:
+            connection.close()
+    except (ImportError, DatabaseError):
+        raise
+    except Exception as e:
+        raise DatabaseError(f"Query failed on {path}: {e}") from e
+
+
+def list_tables(path: PathType) -> List[str]:
+    """
+    List the names of a database's tables.
+    """
+    if is_duckdb_file(path):
+        sql = (
+            "SELECT table_name FROM information_schema.tables "
+            "WHERE table_type = 'BASE TABLE' ORDER BY table_name"
+        )
+        _, table = execute(path, sql)
+        return table.column(0).to_pylist()
+    sql = (
+        "SELECT name FROM sqlite_master "
+        "WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )
+    _, rows = execute(path, sql)
+    return [row[0] for row in rows]
@@ -0,0 +1,123 @@
+"""
+Random access to WebDataset tar shards.
+"""
+
+import json
+import os
+import re
+import tarfile
+from pathlib import Path
+from typing import IO, Dict, List, Tuple
+
+from loguru import logger
+
+from renumics.spotlight.typing import PathType
+
+INDEX_SUFFIX = ".index.json"
+
+# (member name, data offset, data size)
+MemberEntry = Tuple[str, int, int]
+
+_RANGE_PATTERN = re.compile(r"\{(\d+)\.\.(\d+)\}")
+_LIST_PATTERN = re.compile(r"\{([^{}]*,[^{}]*)\}")
+
+
+def expand_shards(pattern: str) -> List[str]:
+    """
+    Expand brace notation for shard paths, e.g. "train-{000..009}.tar" or
+    "{train,test}.tar", as used by WebDataset.
+    """
+    match = _RANGE_PATTERN.search(pattern)
+    if match is not None:
+        start, end = match.group(1), match.group(2)
+        width = len(start)
+        return [
+            path
+            for i in range(int(start), int(end) + 1)
+            for path in expand_shards(
+                pattern[: match.start()] + str(i).zfill(width) + pattern[match.end() :]
+            )
+        ]
+    match = _LIST_PATTERN.search(pattern)
+    if match is not None:
+        return [
+            path
+            for option in match.group(1).split(",")
+            for path in expand_shards(
+                pattern[: match.start()] + option + pattern[match.end() :]
+            )
+        ]
+    return [pattern]
+
+
+def split_member_name(name: str) -> Tuple[str, str]:
+    """
+    Split a tar member name into its WebDataset sample key and extension, e.g.
+    "images/0001.seg.png" into "images/0001" and "seg.png".
+    """
+    directory, _, basename = name.rpartition("/")
+    stem, _, extension = basename.partition(".")
+    key = f"{directory}/{stem}" if directory else stem
+    return key, extension
+
+
+def build_shard_index(shard: PathType) -> List[MemberEntry]:
+    """
+    List the regular files of a tar shard with the positions of their data.
+    """
+    with tarfile.open(shard, "r:") as tar:
+        return [
+            (member.name, member.offset_data, member.size)
+            for member in tar
+            if member.isfile()
+        ]
+
+
+def load_shard_index(shard: PathType) -> List[MemberEntry]:
+    """
+    Get the index of a tar shard.
+
+    The index is stored next to the shard and rebuilt only if the shard's size
+    or modification time changed. If it cannot be stored, it is built each
+    time.
+    """
+    shard = Path(shard)
+    stat = shard.stat()
+    signature = [stat.st_size, stat.st_mtime_ns]
+    index_path = shard.with_name(shard.name + INDEX_SUFFIX)
+    try:
+        with index_path.open("r", encoding="utf-8") as file:
+            index = json.load(file)
+        if index["signature"] == signature:
+            return [tuple(member) for member in index["members"]]  # type: ignore
+    except (OSError, ValueError, KeyError, TypeError):
+        ...
+
+    members = build_shard_index(shard)
+    try:
+        with index_path.open("w", encoding="utf-8") as file:
+            json.dump({"signature": signature, "members": members}, file)
+    except OSError:
+        logger.info(f"Could not store the index of the shard {shard}.")
+    return members
+
+
+def read_member(file: IO[bytes], offset: int, size: int) -> bytes:
+    """
+    Read a tar member's data from an opened shard.
+    """
+    if hasattr(os, "pread"):
+        return os.pread(file.fileno(), size, offset)
+    file.seek(offset)
+    return file.read(size)
+
+
+def read_members(shard: PathType, positions: List[Tuple[int, int]]) -> List[bytes]:
+    """
+    Read multiple tar members' data from a shard at once, in file order.
+    """
+    data: Dict[int, bytes] = {}
+    with open(shard, "rb") as file:
+        for i in sorted(range(len(positions)), key=lambda i: positions[i][0]):
+            data[i] = read_member(file, *positions[i])
+    return [data[i] for i in range(len(positions))]
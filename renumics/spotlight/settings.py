@@ -17,6 +17,15 @@ class Settings(BaseSettings):
     opt_out: bool = False
     opt_in: bool = False
     layout: Optional[str] = None
+    # Prepare a task worker for reductions at startup.
+    warm_up: bool = True
+    # Number of task worker processes, sized from CPUs and memory if not set.
+    task_workers: Optional[int] = None
+    # Rows appended to a table, relative to the rows U-Map was fitted on, up to
+    # which U-Map embeds them with the fitted reducer instead of fitting anew.
+    umap_refit_threshold: float = 0.2
+    # Read CSV files through an on-disk Arrow cache instead of `pandas`.
+    csv_cache: bool = False
 
     class Config:
         """
@@ -51,7 +51,7 @@ Example:
 import os
 from pathlib import Path
 import time
-from typing import Collection, List, Union, Optional
+from typing import TYPE_CHECKING, Collection, List, Mapping, Union, Optional
 
 import pandas as pd
 from typing_extensions import Literal
@@ -67,6 +67,12 @@ from renumics.spotlight.webbrowser import launch_browser_in_thread
 from renumics.spotlight.server import Server
 from renumics.spotlight.analysis.typing import DataIssue
 from renumics.spotlight.app_config import AppConfig
+from renumics.spotlight.io.folder import MediaFolder
+from renumics.spotlight.io.sql import SqlTable
+
+if TYPE_CHECKING:
+    import datasets
+    import polars
 
 
 class ViewerNotFoundError(Exception):
@@ -103,7 +109,17 @@ class Viewer:
 
     def show(
         self,
-        dataset_or_folder: Optional[Union[PathType, pd.DataFrame]] = None,
+        dataset_or_folder: Optional[
+            Union[
+                PathType,
+                pd.DataFrame,
+                "datasets.Dataset",
+                "polars.DataFrame",
+                "polars.LazyFrame",
+                MediaFolder,
+                SqlTable,
+            ]
+        ] = None,
         layout: Optional[_LayoutLike] = None,
         no_browser: bool = False,
         allow_filebrowsing: Union[bool, Literal["auto"]] = "auto",
@@ -111,12 +127,15 @@ class Viewer:
         dtype: Optional[ColumnTypeMapping] = None,
         analyze: Optional[bool] = None,
         issues: Optional[Collection[DataIssue]] = None,
+        embeddings: Optional[Mapping[str, PathType]] = None,
     ) -> None:
         """
         Show a dataset or folder in this spotlight viewer.
 
         Args:
-            dataset_or_folder: root folder, dataset file or pandas.DataFrame (df) to open.
+            dataset_or_folder: root folder, dataset file, pandas.DataFrame (df),
+                polars.DataFrame (or LazyFrame), datasets.Dataset, MediaFolder or
+                SqlTable to open.
             layout: optional Spotlight :mod:`layout <renumics.spotlight.layout>`.
             no_browser: do not show Spotlight in browser.
             allow_filebrowsing: Whether to allow users to browse and open datasets.
@@ -131,9 +150,23 @@ class Viewer:
                 column types allowed by Spotlight (for dataframes only).
             analyze: Automatically analyze common dataset issues (disabled by default).
             issues: Custom dataset issues displayed in the viewer.
+            embeddings: Optional dict with mapping `column name -> .npy file`
+                of `(n, d)` embedding matrices to attach to the dataset as
+                embedding columns. The files are memory-mapped, not copied.
         """
         # pylint: disable=too-many-branches,too-many-arguments, too-many-locals
 
+        dataset: Optional[
+            Union[
+                PathType,
+                pd.DataFrame,
+                "datasets.Dataset",
+                "polars.DataFrame",
+                "polars.LazyFrame",
+                MediaFolder,
+                SqlTable,
+            ]
+        ]
         if is_pathtype(dataset_or_folder):
             path = Path(dataset_or_folder).absolute()
             if path.is_dir():
@@ -142,7 +175,7 @@ class Viewer:
             else:
                 project_root = path.parent
                 dataset = path
-        elif isinstance(dataset_or_folder, pd.DataFrame):
+        elif dataset_or_folder is not None:
             dataset = dataset_or_folder
             project_root = None
         else:
@@ -159,9 +192,16 @@ class Viewer:
         layout = layout or settings.layout
         parsed_layout = parse(layout) if layout else None
 
+        embedding_files = None
+        if embeddings:
+            embedding_files = {
+                name: Path(path).absolute() for name, path in embeddings.items()
+            }
+
         config = AppConfig(
             dataset=dataset,
             dtypes=dtype,
+            embeddings=embedding_files,
             project_root=project_root,
             analyze=analyze,
             custom_issues=list(issues) if issues else None,
@@ -319,7 +359,18 @@ def viewers() -> List[Viewer]:
 
 # pylint: disable=too-many-arguments
 def show(
-    dataset_or_folder: Optional[Union[str, os.PathLike, pd.DataFrame]] = None,
+    dataset_or_folder: Optional[
+        Union[
+            str,
+            os.PathLike,
+            pd.DataFrame,
+            "datasets.Dataset",
+            "polars.DataFrame",
+            "polars.LazyFrame",
+            MediaFolder,
+            SqlTable,
+        ]
+    ] = None,
     host: str = "127.0.0.1",
     port: Union[int, Literal["auto"]] = "auto",
     layout: Optional[_LayoutLike] = None,
@@ -329,12 +380,15 @@ def show(
     dtype: Optional[ColumnTypeMapping] = None,
     analyze: Optional[bool] = None,
     issues: Optional[Collection[DataIssue]] = None,
+    embeddings: Optional[Mapping[str, PathType]] = None,
 ) -> Viewer:
     """
     Start a new Spotlight viewer.
 
     Args:
-        dataset_or_folder: root folder, dataset file or pandas.DataFrame (df) to open.
+        dataset_or_folder: root folder, dataset file, pandas.DataFrame (df),
+            polars.DataFrame (or LazyFrame), datasets.Dataset, MediaFolder or
+            SqlTable to open.
         host: optional host to run Spotlight at.
         port: optional port to run Spotlight at.
             If "auto" (default), automatically choose a random free port.
@@ -352,6 +406,9 @@ def show(
             column types allowed by Spotlight (for dataframes only).
         analyze: Automatically analyze common dataset issues (disabled by default).
         issues: Custom dataset issues displayed in the viewer.
+        embeddings: Optional dict with mapping `column name -> .npy file` of
+            `(n, d)` embedding matrices to attach to the dataset as embedding
+            columns. The files are memory-mapped, not copied.
     """
 
     viewer = None
@@ -373,6 +430,7 @@ def show(
         dtype=dtype,
         analyze=analyze,
         issues=issues,
+        embeddings=embeddings,
     )
     return viewer
 
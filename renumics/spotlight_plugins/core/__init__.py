@@ -22,7 +22,30 @@ def __register__() -> None:
     register data sources
     """
     # pylint: disable=import-outside-toplevel, unused-import
-    from . import pandas_data_source, hdf5_data_source
+    from . import (
+        pandas_data_source,
+        hdf5_data_source,
+        media_folder_data_source,
+        webdataset_data_source,
+    )
+
+    try:
+        from . import arrow_data_source, csv_data_source, sql_data_source
+    except ImportError:
+        # `pyarrow` is an optional dependency.
+        ...
+
+    try:
+        from . import huggingface_data_source
+    except ImportError:
+        # `datasets` is an optional dependency.
+        ...
+
+    try:
+        from . import polars_data_source
+    except ImportError:
+        # `polars` is an optional dependency.
+        ...
 
 
 def __activate__(app: SpotlightApp) -> None:
@@ -0,0 +1,600 @@
+"""
+access Parquet and Feather table data
+"""
+import dataclasses
+import struct
+import threading
+from abc import abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from hashlib import sha1
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import feather
+import pyarrow.parquet as pq
+
+from renumics.spotlight.dtypes import Category, Embedding, Sequence1D, Window
+from renumics.spotlight.dtypes.typing import ColumnType, ColumnTypeMapping
+from renumics.spotlight.io.pandas import infer_dtype, to_categorical
+from renumics.spotlight.typing import PathType
+from renumics.spotlight.dataset.exceptions import ColumnNotExistsError
+from renumics.spotlight.backend import datasource
+from renumics.spotlight.backend.data_source import Column, DataSource
+from renumics.spotlight.backend.exceptions import (
+    CouldNotOpenTableFile,
+    NoTableFileFound,
+)
+from .pandas_data_source import (
+    INFERENCE_SAMPLE_SIZE,
+    PREPARED_COLUMNS_CACHE_SIZE,
+    _lru_get,
+    _lru_put,
+    column_from_series,
+    decode_cell_value,
+)
+
+
+def guess_arrow_dtype(data_type: pa.DataType) -> Optional[Type[ColumnType]]:
+    """
+    Get an equivalent Spotlight data type for an Arrow data type, if it can be
+    told from the Arrow data type alone.
+    """
+    # pylint: disable=too-many-return-statements
+    if pa.types.is_boolean(data_type):
+        return bool
+    if pa.types.is_integer(data_type):
+        return int
+    if pa.types.is_floating(data_type):
+        return float
+    if pa.types.is_dictionary(data_type):
+        return Category
+    if pa.types.is_timestamp(data_type) or pa.types.is_date(data_type):
+        return datetime
+    if pa.types.is_fixed_size_list(data_type) and (
+        pa.types.is_integer(data_type.value_type)
+        or pa.types.is_floating(data_type.value_type)
+    ):
+        return Window if data_type.list_size == 2 else Embedding
+    return None
+
+
+def is_list_type(data_type: pa.DataType) -> bool:
+    """
+    Check whether an Arrow data type is a list type of any size.
+    """
+    return (
+        pa.types.is_list(data_type)
+        or pa.types.is_large_list(data_type)
+        or pa.types.is_fixed_size_list(data_type)
+    )
+
+
+def guess_list_dtype(
+    values: Union[pa.Array, pa.ChunkedArray]
+) -> Optional[Type[ColumnType]]:
+    """
+    Get an equivalent Spotlight data type for a variable size numeric list
+    Arrow column by its list lengths.
+    """
+    if not is_list_type(values.type) or not (
+        pa.types.is_integer(values.type.value_type)
+        or pa.types.is_floating(values.type.value_type)
+    ):
+        return None
+    # pylint: disable=no-member
+    lengths = pc.unique(pc.list_value_length(values).drop_null()).to_pylist()
+    if not lengths or 0 in lengths:
+        return None
+    if len(lengths) > 1:
+        return Sequence1D
+    return Window if lengths[0] == 2 else Embedding
+
+
+def to_series(values: Union[pa.Array, pa.ChunkedArray]) -> pd.Series:
+    """
+    Convert an Arrow column to a `pandas` column.
+    """
+    data_type = values.type
+    if pa.types.is_dictionary(data_type) and pa.types.is_unsigned_integer(
+        data_type.index_type
+    ):
+        # `pandas` has no unsigned categorical codes.
+        values = values.cast(pa.dictionary(pa.int64(), data_type.value_type))
+    return values.to_pandas(date_as_object=False)
+
+
+def embeddings_from_arrow(
+    values: Union[pa.Array, pa.ChunkedArray], column_name: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert a list Arrow column into a contiguous `float32` matrix, `NA` rows
+    are filled with `NaN`s.
+
+    Returns:
+        The embedding matrix and the column's `NA` mask.
+    """
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    array = values
+    if not pa.types.is_fixed_size_list(array.type):
+        # pylint: disable=no-member
+        lengths = pc.unique(pc.list_value_length(array).drop_null()).to_pylist()
+        if not lengths:
+            # All rows are `NA`s.
+            return (
+                np.empty((len(array), 0), dtype=np.float32),
+                np.ones(len(array), dtype=bool),
+            )
+        if len(lengths) != 1 or lengths[0] == 0:
+            raise ValueError(
+                f"For the embedding column '{column_name}', column cells "
+                f"should be sequences of the same shape (n,) or `NA`s, but "
+                f"unaligned sequences received."
+            )
+        array = array.cast(pa.list_(array.type.value_type, lengths[0]))
+    na_mask = array.is_null().to_numpy(zero_copy_only=False)
+    embeddings = np.full((len(array), array.type.list_size), np.nan, dtype=np.float32)
+    # `flatten` skips values of `NA` rows.
+    embeddings[~na_mask] = (
+        array.flatten().to_numpy(zero_copy_only=False).reshape(-1, embeddings.shape[1])
+    )
+    return embeddings, na_mask
+
+
+def locate_rows(
+    offsets: np.ndarray, indices: Sequence[int], length: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Locate rows in a table stored in consecutive chunks (e.g. row groups).
+
+    Args:
+        offsets: Offsets of the chunks, followed by the table's length.
+        indices: Rows to locate, may be negative.
+        length: The table's length.
+
+    Returns:
+        The sorted unique chunks containing the rows and the rows' indices
+        within these chunks read one after another.
+    """
+    rows = np.asarray(indices, dtype=np.int64) % max(length, 1)
+    chunks = np.searchsorted(offsets, rows, side="right") - 1
+    read_chunks, positions = np.unique(chunks, return_inverse=True)
+    # Offsets of the read chunks within the read ones.
+    read_sizes = np.diff(offsets)[read_chunks]
+    read_offsets = np.cumsum(read_sizes) - read_sizes
+    local_indices = rows - offsets[chunks] + read_offsets[positions]
+    return read_chunks, local_indices
+
+
+def _flatbuffer_field(buffer: memoryview, table: int, index: int) -> Optional[int]:
+    """
+    Get the position of a flatbuffer table's field, `None` if it is not set.
+    """
+    vtable = table - struct.unpack_from("<i", buffer, table)[0]
+    vtable_size = struct.unpack_from("<H", buffer, vtable)[0]
+    if 4 + 2 * index >= vtable_size:
+        return None
+    offset = struct.unpack_from("<H", buffer, vtable + 4 + 2 * index)[0]
+    return table + offset if offset else None
+
+
+def _flatbuffer_table(buffer: memoryview, table: int, index: int) -> int:
+    """
+    Get the position of a table referenced by a flatbuffer table's field.
+    """
+    field = _flatbuffer_field(buffer, table, index)
+    if field is None:
+        raise ValueError("Missing table in Arrow IPC metadata.")
+    return field + struct.unpack_from("<I", buffer, field)[0]
+
+
+def read_ipc_batch_lengths(path: PathType) -> List[int]:
+    """
+    Read the lengths of an Arrow IPC file's record batches from the file's
+    footer and the batches' metadata, without reading (and decompressing) the
+    batches themselves.
+    """
+    with pa.memory_map(str(path)) as source:
+        buffer = memoryview(source.read_buffer())
+        footer_length = struct.unpack_from("<i", buffer, len(buffer) - 10)[0]
+        footer_start = len(buffer) - 10 - footer_length
+        footer = buffer[footer_start : len(buffer) - 10]
+        root = struct.unpack_from("<I", footer, 0)[0]
+        # `Footer.recordBatches` is a vector of `Block` structs.
+        blocks_field = _flatbuffer_field(footer, root, 3)
+        if blocks_field is None:
+            return []
+        blocks = blocks_field + struct.unpack_from("<I", footer, blocks_field)[0]
+        lengths = []
+        for i in range(struct.unpack_from("<I", footer, blocks)[0]):
+            offset, metadata_length = struct.unpack_from(
+                "<qi", footer, blocks + 4 + 24 * i
+            )
+            message = buffer[offset : offset + metadata_length]
+            # Messages start with a continuation marker (since Arrow 0.15) and
+            # their metadata's length.
+            start = 8 if struct.unpack_from("<I", message, 0)[0] == 0xFFFFFFFF else 4
+            message = message[start:]
+            # `Message.header` is a `RecordBatch` whose first field is its
+            # length.
+            record_batch = _flatbuffer_table(
+                message, struct.unpack_from("<I", message, 0)[0], 2
+            )
+            length_field = _flatbuffer_field(message, record_batch, 0)
+            lengths.append(
+                0
+                if length_field is None
+                else struct.unpack_from("<q", message, length_field)[0]
+            )
+        return lengths
+
+
+class ArrowDataSource(DataSource):
+    """
+    Base class for data sources of Arrow-based tables.
+
+    Subclasses read single columns as Arrow arrays on demand, set the table's
+    schema, column names and length and initialize the caches and their lock.
+    """
+
+    _schema: pa.Schema
+    _column_names: List[str]
+    _length: int
+    _generation_id: int
+    _prepared_columns: "OrderedDict[Tuple[str, Type[ColumnType], bool, int], Column]"
+    _categories: Dict[Tuple[str, int], Dict[str, int]]
+    # Guards the caches, which are used by concurrent requests.
+    _lock: threading.RLock
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._column_names)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def guess_dtypes(self) -> ColumnTypeMapping:
+        dtypes: ColumnTypeMapping = {}
+        head = list(range(min(INFERENCE_SAMPLE_SIZE, self._length)))
+        for column_name in self._column_names:
+            data_type = self._schema.field(column_name).type
+            dtype = guess_arrow_dtype(data_type)
+            if dtype is int and self._count_nulls(column_name) > 0:
+                dtype = float
+            if dtype is None and is_list_type(data_type):
+                dtype = guess_list_dtype(self._read_column(column_name, head))
+            if dtype is None:
+                # Strings, binaries and structs can hold anything, so look at
+                # some values.
+                dtype = infer_dtype(to_series(self._read_column(column_name, head)))
+            dtypes[column_name] = dtype
+        return dtypes
+
+    def get_generation_id(self) -> int:
+        return self._generation_id
+
+    def get_column(
+        self,
+        column_name: str,
+        dtype: Type[ColumnType],
+        indices: Optional[List[int]] = None,
+        simple: bool = False,
+    ) -> Column:
+        """
+        Get column metadata + values.
+
+        Only the requested column is read. Categorical columns and full columns
+        are prepared once and cached, for other columns only the requested
+        rows are read.
+        """
+        self._assert_column_exists(column_name)
+        if indices is not None and dtype is not Category:
+            self._assert_indices_exist(indices)
+            values = self._read_column(column_name, indices)
+            return self._column_from_arrow(values, column_name, dtype, simple)
+
+        with self._lock:
+            cache_key = (column_name, dtype, simple, self._generation_id)
+            try:
+                column = _lru_get(self._prepared_columns, cache_key)
+            except KeyError:
+                values = self._read_column(column_name)
+                column = self._column_from_arrow(values, column_name, dtype, simple)
+                column.values.setflags(write=False)
+                _lru_put(
+                    self._prepared_columns,
+                    cache_key,
+                    column,
+                    PREPARED_COLUMNS_CACHE_SIZE,
+                    self._generation_id,
+                )
+        if indices is None:
+            return column
+        return dataclasses.replace(column, values=column.values[indices])
+
+    def get_cell_data(
+        self, column_name: str, row_index: int, dtype: Type[ColumnType]
+    ) -> Any:
+        """
+        Return the value of a single cell, warn if not possible.
+        """
+        self._assert_column_exists(column_name)
+        self._assert_index_exists(row_index)
+        if row_index < 0:
+            row_index += self._length
+        raw_value = to_series(self._read_column(column_name, [row_index])).iloc[0]
+        if dtype is Category:
+            if pd.isna(raw_value):
+                return -1
+            return self._get_column_categories(column_name).get(str(raw_value), -1)
+        return decode_cell_value(raw_value, column_name, dtype, self._get_workdir())
+
+    def _column_from_arrow(
+        self,
+        values: pa.ChunkedArray,
+        column_name: str,
+        dtype: Type[ColumnType],
+        simple: bool,
+    ) -> Column:
+        if dtype is Embedding and is_list_type(values.type):
+            embeddings = embeddings_from_arrow(values, column_name)
+            # Given embeddings, only the column's length is used, so do not
+            # convert the lists to Python objects.
+            series = to_series(values.is_null())
+            return column_from_series(series, column_name, dtype, simple, embeddings)
+        return column_from_series(to_series(values), column_name, dtype, simple)
+
+    def _get_column_categories(self, column_name: str) -> Dict[str, int]:
+        with self._lock:
+            cache_key = (column_name, self._generation_id)
+            try:
+                return self._categories[cache_key]
+            except KeyError:
+                ...
+            column = to_categorical(
+                to_series(self._read_column(column_name)), str_categories=True
+            )
+            categories = {
+                category: i for i, category in enumerate(column.cat.categories)
+            }
+            self._categories[cache_key] = categories
+            return categories
+
+    def _assert_column_exists(self, column_name: str) -> None:
+        if column_name not in self._column_names:
+            raise ColumnNotExistsError(
+                f"Column '{column_name}' doesn't exist in the dataset."
+            )
+
+    def _get_workdir(self) -> PathType:
+        """
+        Get the folder relative file paths in the table are resolved against.
+        """
+        return "."
+
+    def _count_nulls(self, column_name: str) -> int:
+        """
+        Count the `NA` values of a column.
+
+        Subclasses should override it, if the count can be read without
+        reading the whole column.
+        """
+        return self._read_column(column_name).null_count
+
+    @abstractmethod
+    def _read_column(
+        self, column_name: str, indices: Optional[Sequence[int]] = None
+    ) -> pa.ChunkedArray:
+        """
+        Read a single column, optionally only at the given row indices.
+        """
+
+
+class ArrowFileDataSource(ArrowDataSource):
+    """
+    Base class for data sources of Arrow-based table files.
+
+    Only the requested columns (and rows where the format allows) are read from
+    the file on demand. The file is not kept open, so that the data source
+    stays picklable.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    _table_file: Path
+    _file_signature: Tuple[int, ...]
+
+    def __init__(self, source: PathType):
+        self._table_file = Path(source)
+        self._generation_id = 0
+        self._file_signature = self._get_file_signature()
+        self._prepared_columns = OrderedDict()
+        self._categories = {}
+        self._lock = threading.RLock()
+        self._read_metadata()
+
+    def get_generation_id(self) -> int:
+        """
+        Get the table's generation ID.
+
+        The generation ID changes and the table's metadata is read again if the
+        file's modification time, size or inode changed since the last read.
+        """
+        with self._lock:
+            file_signature = self._get_file_signature()
+            if file_signature != self._file_signature:
+                self._read_metadata()
+                self._file_signature = file_signature
+                self._generation_id += 1
+                self._prepared_columns.clear()
+                self._categories.clear()
+            return self._generation_id
+
+    def get_uid(self) -> str:
+        return sha1(str(self._table_file.absolute()).encode("utf-8")).hexdigest()
+
+    def get_name(self) -> str:
+        return str(self._table_file.name)
+
+    def get_fingerprint(self) -> str:
+        fingerprint = f"{self.get_uid()}:{self._get_file_signature()}"
+        return sha1(fingerprint.encode("utf-8")).hexdigest()
+
+    def _get_workdir(self) -> PathType:
+        return self._table_file.parent
+
+    def _get_file_signature(self) -> Tuple[int, ...]:
+        try:
+            stat = self._table_file.stat()
+        except FileNotFoundError as e:
+            raise NoTableFileFound(self._table_file) from e
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _read_metadata(self) -> None:
+        try:
+            schema, self._length = self._read_schema()
+        except FileNotFoundError as e:
+            raise NoTableFileFound(self._table_file) from e
+        except (OSError, pa.ArrowException) as e:
+            raise CouldNotOpenTableFile(self._table_file) from e
+        # Skip index columns written by `pandas`.
+        index_columns = (schema.pandas_metadata or {}).get("index_columns", [])
+        self._schema = schema
+        self._column_names = [
+            name for name in schema.names if name not in index_columns
+        ]
+
+    @abstractmethod
+    def _read_schema(self) -> Tuple[pa.Schema, int]:
+        """
+        Read the table's schema and length.
+        """
+
+
+@datasource(".parquet")
+class ParquetDataSource(ArrowFileDataSource):
+    """
+    access Parquet table data
+
+    Columns are read by projection and only from the row groups containing the
+    requested rows.
+    """
+
+    _row_group_offsets: np.ndarray
+
+    def _read_schema(self) -> Tuple[pa.Schema, int]:
+        parquet_file = self._open_file()
+        metadata = parquet_file.metadata
+        row_group_sizes = [
+            metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)
+        ]
+        self._row_group_offsets = np.cumsum([0] + row_group_sizes)
+        return parquet_file.schema_arrow, metadata.num_rows
+
+    def _read_column(
+        self, column_name: str, indices: Optional[Sequence[int]] = None
+    ) -> pa.ChunkedArray:
+        parquet_file = self._open_file()
+        if indices is None:
+            return parquet_file.read(columns=[column_name]).column(0)
+        read_row_groups, local_indices = locate_rows(
+            self._row_group_offsets, indices, self._length
+        )
+        table = parquet_file.read_row_groups(
+            read_row_groups.tolist(), columns=[column_name]
+        )
+        return table.column(0).take(pa.array(local_indices))
+
+    def _count_nulls(self, column_name: str) -> int:
+        """
+        Count the `NA` values of a column from the row groups' statistics, if
+        all row groups have them.
+        """
+        metadata = self._open_file().metadata
+        try:
+            column_index = metadata.schema.names.index(column_name)
+        except ValueError:
+            return super()._count_nulls(column_name)
+        null_count = 0
+        for i in range(metadata.num_row_groups):
+            statistics = metadata.row_group(i).column(column_index).statistics
+            if statistics is None or not statistics.has_null_count:
+                return super()._count_nulls(column_name)
+            null_count += statistics.null_count
+        return null_count
+
+    def _open_file(self) -> pq.ParquetFile:
+        return pq.ParquetFile(self._table_file, memory_map=True)
+
+
+@datasource(".feather")
+@datasource(".arrow")
+class FeatherDataSource(ArrowFileDataSource):
+    """
+    access Feather (Arrow IPC) table data
+
+    Columns are read by projection from the memory-mapped file and only from
+    the record batches containing the requested rows.
+    """
+
+    _batch_offsets: np.ndarray
+
+    def _read_schema(self) -> Tuple[pa.Schema, int]:
+        with pa.memory_map(str(self._table_file)) as source:
+            schema = pa.ipc.open_file(source).schema
+        try:
+            batch_sizes = read_ipc_batch_lengths(self._table_file)
+        except (ValueError, IndexError, struct.error) as e:
+            raise pa.ArrowInvalid(f"Invalid Arrow IPC metadata: {e}") from e
+        self._batch_offsets = np.cumsum([0] + batch_sizes, dtype=np.int64)
+        return schema, int(self._batch_offsets[-1])
+
+    def _read_column(
+        self, column_name: str, indices: Optional[Sequence[int]] = None
+    ) -> pa.ChunkedArray:
+        if indices is None:
+            return feather.read_table(
+                self._table_file, columns=[column_name], memory_map=True
+            ).column(0)
+        read_batches, local_indices = locate_rows(
+            self._batch_offsets, indices, self._length
+        )
+        with pa.memory_map(str(self._table_file)) as source:
+            reader = self._open_reader(source, column_name)
+            values = pa.chunked_array(
+                [reader.get_batch(i).column(0) for i in read_batches.tolist()],
+                type=self._schema.field(column_name).type,
+            )
+            return values.take(pa.array(local_indices))
+
+    def _count_nulls(self, column_name: str) -> int:
+        with pa.memory_map(str(self._table_file)) as source:
+            reader = self._open_reader(source, column_name)
+            return sum(
+                reader.get_batch(i).column(0).null_count
+                for i in range(reader.num_record_batches)
+            )
+
+    def _open_reader(
+        self, source: pa.MemoryMappedFile, column_name: str
+    ) -> pa.ipc.RecordBatchFileReader:
+        """
+        Open the file to read only the given column.
+        """
+        column_index = self._schema.get_field_index(column_name)
+        options = pa.ipc.IpcReadOptions(included_fields=[column_index])
+        return pa.ipc.open_file(source, options=options)
@@ -0,0 +1,194 @@
+"""
+access CSV table data through an on-disk Arrow cache
+"""
+import os
+import tempfile
+from hashlib import sha1
+from pathlib import Path
+from typing import Dict, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+from pyarrow import feather
+from loguru import logger
+
+from renumics.spotlight import appdirs
+from renumics.spotlight.settings import settings
+from renumics.spotlight.typing import PathType
+from renumics.spotlight.backend import add_datasource
+from renumics.spotlight.backend.exceptions import (
+    CouldNotOpenTableFile,
+    NoTableFileFound,
+)
+from .arrow_data_source import FeatherDataSource
+from .pandas_data_source import file_fingerprint
+
+CACHE_DIR = appdirs.cache_dir / "csv"
+# Bytes of CSV parsed at once, column types are inferred from the first block.
+CSV_BLOCK_SIZE = 16 * 2**20
+
+def _widen_type(data_type: pa.DataType) -> pa.DataType:
+    if pa.types.is_integer(data_type):
+        return pa.float64()
+    return pa.string()
+
+
+def _fits_type(values: pa.Array, data_type: pa.DataType) -> bool:
+    if pa.types.is_string(data_type):
+        return True
+    try:
+        pc.cast(values, data_type)  # pylint: disable=no-member
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return False
+    return True
+
+
+def infer_column_types(csv_file: PathType) -> Dict[str, pa.DataType]:
+    """
+    Infer the column types of a CSV file in a single pass over it.
+
+    Column types are inferred from the first block. If values further down do
+    not fit, the column's type is widened (integers to floats, anything else to
+    strings).
+    """
+    read_options = pcsv.ReadOptions(block_size=CSV_BLOCK_SIZE)
+    reader = pcsv.open_csv(csv_file, read_options=read_options)
+    column_types = {field.name: field.type for field in reader.schema}
+    reader.close()
+
+    # Read all values as strings and check whether they fit the types.
+    convert_options = pcsv.ConvertOptions(
+        column_types={name: pa.string() for name in column_types},
+        strings_can_be_null=True,
+    )
+    reader = pcsv.open_csv(
+        csv_file, read_options=read_options, convert_options=convert_options
+    )
+    try:
+        for batch in reader:
+            for name, values in zip(batch.schema.names, batch.columns):
+                data_type = column_types[name]
+                while not _fits_type(values, data_type):
+                    data_type = _widen_type(data_type)
+                if data_type != column_types[name]:
+                    logger.info(
+                        f"Values of column '{name}' in {csv_file} do not fit its "
+                        f"inferred type {column_types[name]}, reading them as "
+                        f"{data_type}."
+                    )
+                    column_types[name] = data_type
+    finally:
+        reader.close()
+    return column_types
+
+
+def convert_csv(csv_file: PathType, target: PathType) -> None:
+    """
+    Stream a CSV file block by block into an Arrow IPC (Feather) file.
+
+    Column types are inferred in a first pass (see `infer_column_types`), the
+    file is converted in a second one.
+    """
+    reader = pcsv.open_csv(
+        csv_file,
+        read_options=pcsv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        convert_options=pcsv.ConvertOptions(
+            column_types=infer_column_types(csv_file)
+        ),
+    )
+    try:
+        with pa.ipc.new_file(str(target), reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+    finally:
+        reader.close()
+
+
+class CsvDataSource(FeatherDataSource):
+    """
+    access CSV table data through an on-disk Arrow cache
+
+    It only replaces the `pandas` data source for CSV files if enabled by the
+    `csv_cache` setting (`SPOTLIGHT_CSV_CACHE=1`), since Arrow infers dtypes
+    and `NA`s slightly differently than `pandas`.
+
+    The CSV file is converted once into an Arrow file under Spotlight's cache
+    folder, keyed by the CSV file's path, size and modification time. Columns
+    are then read from the memory-mapped cache file, so that reopening the
+    same CSV file is instant and the table does not have to fit into memory.
+    """
+
+    _csv_file: Path
+
+    def __init__(self, source: PathType):
+        self._csv_file = Path(source)
+        if not self._csv_file.is_file():
+            raise NoTableFileFound(self._csv_file)
+        super().__init__(self._get_cache_file())
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """
+        Read the whole table as a `pandas` `DataFrame`.
+        """
+        return feather.read_feather(self._table_file, memory_map=True)
+
+    def get_uid(self) -> str:
+        return sha1(str(self._csv_file.absolute()).encode("utf-8")).hexdigest()
+
+    def get_name(self) -> str:
+        return str(self._csv_file.name)
+
+    def _get_workdir(self) -> PathType:
+        # Relative file paths in CSV files are resolved as `pandas` would.
+        return "."
+
+    def _get_file_signature(self) -> Tuple[int, ...]:
+        try:
+            stat = self._csv_file.stat()
+        except FileNotFoundError as e:
+            raise NoTableFileFound(self._csv_file) from e
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _read_schema(self) -> Tuple[pa.Schema, int]:
+        self._table_file = self._get_cache_file()
+        return super()._read_schema()
+
+    def _get_cache_file(self) -> Path:
+        """
+        Get the cache file for the current version of the CSV file, convert
+        the CSV file if it is not cached yet.
+        """
+        path_key = self.get_uid()
+        cache_file = CACHE_DIR / f"{path_key}-{file_fingerprint(self._csv_file)}.arrow"
+        if cache_file.is_file():
+            return cache_file
+
+        logger.info(f"Converting {self._csv_file} into {cache_file}.")
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Convert into a temporary file first, so that concurrent readers never
+        # see a partial cache file.
+        fd, temp_file = tempfile.mkstemp(suffix=".tmp", dir=CACHE_DIR)
+        os.close(fd)
+        try:
+            convert_csv(self._csv_file, temp_file)
+            os.replace(temp_file, cache_file)
+        except (OSError, pa.ArrowException) as e:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise CouldNotOpenTableFile(self._csv_file) from e
+        # Drop cache files of previous versions of the CSV file.
+        for outdated_file in CACHE_DIR.glob(f"{path_key}-*.arrow"):
+            if outdated_file != cache_file:
+                try:
+                    outdated_file.unlink()
+                except OSError:
+                    # Still opened elsewhere.
+                    ...
+        return cache_file
+
+
+if settings.csv_cache:
+    add_datasource(".csv", CsvDataSource)
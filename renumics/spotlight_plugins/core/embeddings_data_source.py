@@ -0,0 +1,259 @@
+"""
+attach memory-mapped embedding files to table data
+"""
+from hashlib import sha1
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Type
+
+import numpy as np
+from numpy.typing import DTypeLike
+import pandas as pd
+
+from renumics.spotlight.dtypes import Embedding
+from renumics.spotlight.dtypes.typing import ColumnType, ColumnTypeMapping
+from renumics.spotlight.typing import PathType
+from renumics.spotlight.backend.data_source import CellsUpdate, Column, DataSource
+from renumics.spotlight.backend.exceptions import (
+    DatasetColumnsNotUnique,
+    DatasetNotEditable,
+    InvalidEmbeddingFile,
+    NoTableFileFound,
+)
+from .pandas_data_source import column_from_series, decode_cell_value
+
+# Rows read at once when looking for `NA`s in an embedding file.
+NA_MASK_CHUNK_SIZE = 65536
+
+
+def load_embedding_file(path: PathType) -> np.ndarray:
+    """
+    Memory-map an embedding matrix stored in a `.npy` file.
+    """
+    try:
+        embeddings = np.load(path, mmap_mode="r", allow_pickle=False)
+    except FileNotFoundError as e:
+        raise NoTableFileFound(path) from e
+    except (OSError, ValueError) as e:
+        raise InvalidEmbeddingFile(path) from e
+    if embeddings.ndim != 2 or embeddings.dtype.kind not in "biuf":
+        raise InvalidEmbeddingFile(path)
+    return embeddings
+
+
+class EmbeddingsDataSource(DataSource):
+    """
+    attach memory-mapped embedding files to table data
+
+    Each `.npy` file holds a `(n, d)` matrix, one row per table row, and is
+    shown as an embedding column. Rows of `NaN`s are `NA`s. The files are
+    memory-mapped, so only requested rows are read and the embeddings are
+    never copied into the table. All other columns are served by the wrapped
+    data source.
+    """
+
+    _data_source: DataSource
+    _files: Dict[str, Path]
+    _signatures: Dict[str, Tuple[int, int]]
+    _generation_offset: int
+    _embeddings: Dict[str, np.ndarray]
+    _na_masks: Dict[str, np.ndarray]
+
+    def __init__(self, source: DataSource, embeddings: Mapping[str, PathType]):
+        # pylint: disable=super-init-not-called
+        self._data_source = source
+        self._files = {name: Path(path) for name, path in embeddings.items()}
+        if set(self._files).intersection(source.column_names):
+            raise DatasetColumnsNotUnique()
+        self._signatures = {}
+        self._generation_offset = 0
+        self._embeddings = {}
+        self._na_masks = {}
+        for name in self._files:
+            self._load(name)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Memory maps would be pickled with all their data, map them anew.
+        state = self.__dict__.copy()
+        state["_embeddings"] = {}
+        state["_na_masks"] = {}
+        return state
+
+    @property
+    def data_source(self) -> DataSource:
+        """
+        The data source the embeddings are attached to.
+        """
+        return self._data_source
+
+    @property
+    def column_names(self) -> List[str]:
+        return self._data_source.column_names + list(self._files)
+
+    @property
+    def df(self) -> Optional[pd.DataFrame]:
+        return self._data_source.df
+
+    def __len__(self) -> int:
+        return len(self._data_source)
+
+    def get_generation_id(self) -> int:
+        """
+        Get the table's generation ID.
+
+        The generation ID also changes if an embedding file changed.
+        """
+        for name, path in self._files.items():
+            if self._get_signature(path) != self._signatures[name]:
+                self._generation_offset += 1
+                self._load(name)
+        return self._data_source.get_generation_id() + self._generation_offset
+
+    def guess_dtypes(self) -> ColumnTypeMapping:
+        dtypes = self._data_source.guess_dtypes()
+        dtypes.update({name: Embedding for name in self._files})
+        return dtypes
+
+    def get_uid(self) -> str:
+        files = ":".join(
+            f"{name}={path.absolute()}" for name, path in sorted(self._files.items())
+        )
+        uid = f"{self._data_source.get_uid()}:{files}"
+        return sha1(uid.encode("utf-8")).hexdigest()
+
+    def get_name(self) -> str:
+        return self._data_source.get_name()
+
+    def get_fingerprint(self) -> str:
+        fingerprint = f"{self.get_uid()}:{self._data_source.get_fingerprint()}"
+        for name, path in sorted(self._files.items()):
+            fingerprint += f":{name}={self._get_signature(path)}"
+        return sha1(fingerprint.encode("utf-8")).hexdigest()
+
+    def get_internal_columns(self) -> List[Column]:
+        return self._data_source.get_internal_columns()
+
+    def get_column(
+        self,
+        column_name: str,
+        dtype: Type[ColumnType],
+        indices: Optional[List[int]] = None,
+        simple: bool = False,
+    ) -> Column:
+        if column_name not in self._files:
+            return self._data_source.get_column(column_name, dtype, indices, simple)
+        embeddings = self._get_embeddings(column_name)
+        rows = np.arange(len(embeddings))
+        if simple:
+            # Only the column's length is used, do not read the embeddings.
+            na_mask = np.zeros(len(embeddings), dtype=bool)
+        else:
+            na_mask = self._get_na_mask(column_name)
+        if indices is not None:
+            self._assert_indices_exist(indices)
+            rows = rows[indices]
+            na_mask = na_mask[indices]
+        column = column_from_series(
+            pd.Series(na_mask), column_name, Embedding, True, (embeddings, na_mask)
+        )
+        if not simple:
+            # Rows are views into the memory-mapped matrix.
+            for i in np.flatnonzero(~na_mask):
+                column.values[i] = embeddings[rows[i]]
+        return column
+
+    def _get_column_matrix(
+        self,
+        column_name: str,
+        column_type: Type[ColumnType],
+        indices: Optional[List[int]],
+        dtype: DTypeLike,
+    ) -> np.ndarray:
+        if column_name not in self._files:
+            # pylint: disable=protected-access
+            return self._data_source._get_column_matrix(
+                column_name, column_type, indices, dtype
+            )
+        embeddings = self._get_embeddings(column_name)
+        if indices is not None:
+            self._assert_indices_exist(indices)
+            embeddings = embeddings[indices]
+        return np.asarray(embeddings, dtype=dtype)
+
+    def get_cell_data(
+        self, column_name: str, row_index: int, dtype: Type[ColumnType]
+    ) -> Any:
+        """
+        Return the value of a single cell, warn if not possible.
+        """
+        if column_name not in self._files:
+            return self._data_source.get_cell_data(column_name, row_index, dtype)
+        self._assert_index_exists(row_index)
+        if self._get_na_mask(column_name)[row_index]:
+            return None
+        embedding = np.asarray(self._get_embeddings(column_name)[row_index])
+        return decode_cell_value(embedding, column_name, Embedding)
+
+    def get_waveform(self, column_name: str, row_index: int) -> Optional[np.ndarray]:
+        return self._data_source.get_waveform(column_name, row_index)
+
+    def replace_cells(
+        self, column_name: str, indices: List[int], value: Any, dtype: Type[ColumnType]
+    ) -> CellsUpdate:
+        if column_name in self._files:
+            raise DatasetNotEditable()
+        return self._data_source.replace_cells(column_name, indices, value, dtype)
+
+    def delete_column(self, name: str) -> None:
+        if name in self._files:
+            raise DatasetNotEditable()
+        self._data_source.delete_column(name)
+
+    def append_column(self, name: str, dtype_name: str) -> Column:
+        self._assert_column_not_exists(name)
+        return self._data_source.append_column(name, dtype_name)
+
+    # Rows cannot be deleted or duplicated, since the embedding files would not
+    # fit the table anymore.
+
+    def _get_embeddings(self, column_name: str) -> np.ndarray:
+        try:
+            return self._embeddings[column_name]
+        except KeyError:
+            return self._load(column_name)
+
+    def _get_na_mask(self, column_name: str) -> np.ndarray:
+        """
+        Find rows of `NaN`s once per embedding file, reading it in chunks.
+        """
+        embeddings = self._get_embeddings(column_name)
+        try:
+            return self._na_masks[column_name]
+        except KeyError:
+            pass
+        na_mask = np.zeros(len(embeddings), dtype=bool)
+        if embeddings.dtype.kind == "f":
+            for start in range(0, len(embeddings), NA_MASK_CHUNK_SIZE):
+                chunk = embeddings[start : start + NA_MASK_CHUNK_SIZE]
+                na_mask[start : start + NA_MASK_CHUNK_SIZE] = np.isnan(chunk).all(
+                    axis=1
+                )
+        self._na_masks[column_name] = na_mask
+        return na_mask
+
+    def _load(self, column_name: str) -> np.ndarray:
+        path = self._files[column_name]
+        self._signatures[column_name] = self._get_signature(path)
+        embeddings = load_embedding_file(path)
+        if len(embeddings) != len(self._data_source):
+            raise InvalidEmbeddingFile(path)
+        self._embeddings[column_name] = embeddings
+        self._na_masks.pop(column_name, None)
+        return embeddings
+
+    @staticmethod
+    def _get_signature(path: Path) -> Tuple[int, int]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError as e:
+            raise NoTableFileFound(path) from e
+        return stat.st_mtime_ns, stat.st_size
@@ -9,6 +9,7 @@ from dataclasses import asdict
 
 import h5py
 import numpy as np
+from numpy.typing import DTypeLike
 
 from renumics.spotlight.dtypes import Category, Embedding
 from renumics.spotlight.dtypes.typing import (
@@ -28,6 +29,9 @@ from renumics.spotlight.backend.data_source import (
     DataSource,
     Attrs,
     Column,
+    ColumnNotEmbeddable,
+    embeddings_to_matrix,
+    one_hot_encode,
     read_external_value,
 )
 from renumics.spotlight.backend.exceptions import (
@@ -206,6 +210,38 @@ class H5Dataset(Dataset):
 
         return Column(name=column_name, values=raw_values, **asdict(attrs))
 
+    def read_matrix(
+        self,
+        column_name: str,
+        indices: Optional[List[int]] = None,
+        dtype: DTypeLike = np.float32,
+    ) -> Optional[np.ndarray]:
+        """
+        Read a numeric, embedding or category column as a matrix (see
+        `DataSource.get_matrix`) directly from the stored values.
+
+        Returns `None` for columns which have to be read as usual, e.g.
+        embeddings stored as references by old versions.
+        """
+        self._assert_column_exists(column_name, internal=True)
+
+        column = self._h5_file[column_name]
+        attrs, _, is_external = _decode_attrs(column.attrs)
+        if is_external or self._is_ref_column(column):
+            return None
+        raw_values = column[:] if indices is None else column[indices]
+        if attrs.type is Embedding:
+            return embeddings_to_matrix(
+                raw_values, attrs.embedding_length or 0, dtype
+            )
+        if attrs.type is Category:
+            return one_hot_encode(
+                raw_values, sorted((attrs.categories or {}).values()), dtype
+            )
+        if attrs.type in (int, bool, float):
+            return raw_values.astype(dtype).reshape(-1, 1)
+        raise ColumnNotEmbeddable
+
     def duplicate_row(self, from_index: IndexType, to_index: IndexType) -> None:
         """
         Duplicate a dataset's row. Increases the dataset's length by 1.
@@ -261,9 +297,15 @@ class Hdf5DataSource(DataSource):
     access h5 table data
     """
 
+    _table_file: Path
+    _generation_id: int
+    _file_signature: Optional[Tuple[int, int, int]]
+
     def __init__(self, source: PathType):
         # pylint: disable=unused-argument
         self._table_file = Path(source)
+        self._generation_id = 0
+        self._file_signature = None
 
     @property
     def column_names(self) -> List[str]:
@@ -282,8 +324,18 @@ class Hdf5DataSource(DataSource):
             }
 
     def get_generation_id(self) -> int:
-        with self._open_table() as dataset:
-            return dataset.get_generation_id()
+        """
+        Get the table's generation ID.
+
+        The generation ID is cached and only read from the file again if the
+        file's modification time, size or inode changed since the last read.
+        """
+        file_signature = self._get_file_signature()
+        if file_signature != self._file_signature:
+            with self._open_table() as dataset:
+                self._generation_id = dataset.get_generation_id()
+            self._file_signature = file_signature
+        return self._generation_id
 
     def get_uid(self) -> str:
         return sha1(str(self._table_file.absolute()).encode("utf-8")).hexdigest()
@@ -291,6 +343,10 @@ class Hdf5DataSource(DataSource):
     def get_name(self) -> str:
         return str(self._table_file.name)
 
+    def get_fingerprint(self) -> str:
+        fingerprint = f"{self.get_uid()}:{self._get_file_signature()}"
+        return sha1(fingerprint.encode("utf-8")).hexdigest()
+
     def get_internal_columns(self) -> List[Column]:
         with self._open_table() as dataset:
             return [
@@ -308,6 +364,19 @@ class Hdf5DataSource(DataSource):
         with self._open_table() as dataset:
             return dataset.read_column(column_name, indices=indices, simple=simple)
 
+    def _get_column_matrix(
+        self,
+        column_name: str,
+        column_type: Type[ColumnType],
+        indices: Optional[List[int]],
+        dtype: DTypeLike,
+    ) -> np.ndarray:
+        with self._open_table() as dataset:
+            matrix = dataset.read_matrix(column_name, indices, dtype)
+        if matrix is None:
+            return super()._get_column_matrix(column_name, column_type, indices, dtype)
+        return matrix
+
     def get_cell_data(
         self, column_name: str, row_index: int, dtype: Type[ColumnType]
     ) -> Any:
@@ -320,6 +389,13 @@ class Hdf5DataSource(DataSource):
             except IndexError as e:
                 raise NoRowFound(row_index) from e
 
+    def _get_file_signature(self) -> Tuple[int, int, int]:
+        try:
+            stat = self._table_file.stat()
+        except FileNotFoundError as e:
+            raise NoTableFileFound(self._table_file) from e
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
     def _open_table(self, mode: str = "r") -> H5Dataset:
         try:
             return H5Dataset(self._table_file, mode)
@@ -0,0 +1,209 @@
+"""
+access Hugging Face `datasets.Dataset` table data
+"""
+import dataclasses
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+import datasets
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from renumics.spotlight.dtypes import Audio, Category, Embedding, Image
+from renumics.spotlight.dtypes.typing import (
+    ColumnType,
+    ColumnTypeMapping,
+    is_file_based_column_type,
+)
+from renumics.spotlight.io.pandas import infer_dtype
+from renumics.spotlight.dataset.exceptions import ColumnNotExistsError
+from renumics.spotlight.backend import datasource
+from renumics.spotlight.backend.data_source import Column, DataSource
+from .arrow_data_source import embeddings_from_arrow, guess_arrow_dtype, to_series
+from .pandas_data_source import (
+    INFERENCE_SAMPLE_SIZE,
+    column_from_series,
+    decode_cell_value,
+)
+
+
+def guess_feature_dtype(
+    feature: Any, data_type: pa.DataType
+) -> Optional[Type[ColumnType]]:
+    """
+    Get an equivalent Spotlight data type for a Hugging Face feature, if it can
+    be told from the feature and its Arrow data type alone.
+    """
+    if isinstance(feature, datasets.ClassLabel):
+        return Category
+    if isinstance(feature, datasets.Image):
+        return Image
+    if isinstance(feature, datasets.Audio):
+        return Audio
+    return guess_arrow_dtype(data_type)
+
+
+def file_references(values: pa.ChunkedArray) -> pa.ChunkedArray:
+    """
+    Replace encoded Hugging Face image and audio values (structs of bytes and
+    path) with their paths or "<in-memory>" without touching the bytes.
+    """
+    # pylint: disable=no-member
+    paths = pc.struct_field(values, "path")
+    in_memory = pc.is_valid(pc.struct_field(values, "bytes"))
+    return pc.if_else(in_memory, "<in-memory>", paths)
+
+
+@datasource(datasets.Dataset)
+class HuggingFaceDataSource(DataSource):
+    """
+    access Hugging Face `datasets.Dataset` table data
+
+    Columns are read directly from the dataset's (usually memory-mapped) Arrow
+    table. Images and audio are only decoded per cell.
+    """
+
+    _dataset: datasets.Dataset
+    _uid: str
+    _prepared_columns: Dict[Tuple[str, Type[ColumnType], bool], Column]
+    # Guards the cache, which is used by concurrent requests.
+    _lock: threading.RLock
+
+    def __init__(self, source: datasets.Dataset):
+        self._dataset = source
+        self._uid = str(id(source))
+        self._prepared_columns = {}
+        self._lock = threading.RLock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._dataset.column_names)
+
+    def __len__(self) -> int:
+        return len(self._dataset)
+
+    def guess_dtypes(self) -> ColumnTypeMapping:
+        dtypes: ColumnTypeMapping = {}
+        schema = self._dataset.features.arrow_schema
+        head = list(range(min(INFERENCE_SAMPLE_SIZE, len(self))))
+        for column_name, feature in self._dataset.features.items():
+            dtype = guess_feature_dtype(feature, schema.field(column_name).type)
+            if dtype is int and self._read_column(column_name).null_count > 0:
+                dtype = float
+            if dtype is None:
+                dtype = infer_dtype(to_series(self._read_column(column_name, head)))
+            dtypes[column_name] = dtype
+        return dtypes
+
+    def get_generation_id(self) -> int:
+        return 0
+
+    def get_uid(self) -> str:
+        return self._uid
+
+    def get_name(self) -> str:
+        info = self._dataset.info
+        return info.dataset_name or info.builder_name or "datasets.Dataset"
+
+    def get_fingerprint(self) -> str:
+        # `datasets` fingerprints each dataset by its origin and transforms.
+        fingerprint = getattr(self._dataset, "_fingerprint", None)
+        if fingerprint is not None:
+            return str(fingerprint)
+        return super().get_fingerprint()
+
+    def get_column(
+        self,
+        column_name: str,
+        dtype: Type[ColumnType],
+        indices: Optional[List[int]] = None,
+        simple: bool = False,
+    ) -> Column:
+        """
+        Get column metadata + values.
+
+        The whole column is prepared once per dtype and cached. Image and audio
+        columns only hold paths or "<in-memory>" placeholders.
+        """
+        self._assert_column_exists(column_name)
+        with self._lock:
+            cache_key = (column_name, dtype, simple)
+            try:
+                column = self._prepared_columns[cache_key]
+            except KeyError:
+                column = self._prepare_column(column_name, dtype, simple)
+                column.values.setflags(write=False)
+                self._prepared_columns[cache_key] = column
+        if indices is None:
+            return column
+        return dataclasses.replace(column, values=column.values[indices])
+
+    def get_cell_data(
+        self, column_name: str, row_index: int, dtype: Type[ColumnType]
+    ) -> Any:
+        """
+        Return the value of a single cell, warn if not possible.
+        """
+        self._assert_column_exists(column_name)
+        self._assert_index_exists(row_index)
+        if row_index < 0:
+            row_index += len(self)
+        values = self._read_column(column_name, [row_index])
+        if dtype is Category:
+            if isinstance(self._dataset.features[column_name], datasets.ClassLabel):
+                code = values[0].as_py()
+                return -1 if code is None else code
+            raw_value = to_series(values).iloc[0]
+            if pd.isna(raw_value):
+                return -1
+            categories = self.get_column(column_name, dtype).categories or {}
+            return categories.get(str(raw_value), -1)
+        if is_file_based_column_type(dtype):
+            # Keep Hugging Face image and audio dicts, they are decoded later.
+            raw_value = values.to_pylist()[0]
+        else:
+            raw_value = to_series(values).iloc[0]
+        return decode_cell_value(raw_value, column_name, dtype)
+
+    def _prepare_column(
+        self, column_name: str, dtype: Type[ColumnType], simple: bool
+    ) -> Column:
+        values = self._read_column(column_name)
+        feature = self._dataset.features[column_name]
+        embeddings = None
+        if isinstance(feature, datasets.ClassLabel):
+            codes = values.fill_null(-1).to_numpy()
+            series = pd.Series(pd.Categorical.from_codes(codes, feature.names))
+        elif isinstance(feature, (datasets.Image, datasets.Audio)):
+            series = to_series(file_references(values))
+        else:
+            if dtype is Embedding and pa.types.is_fixed_size_list(values.type):
+                embeddings = embeddings_from_arrow(values, column_name)
+            series = to_series(values)
+        return column_from_series(series, column_name, dtype, simple, embeddings)
+
+    def _read_column(
+        self, column_name: str, indices: Optional[Sequence[int]] = None
+    ) -> pa.ChunkedArray:
+        """
+        Read a single column, optionally only at the given row indices.
+        """
+        dataset = self._dataset.select_columns([column_name]).with_format("arrow")
+        table = dataset[:] if indices is None else dataset[list(indices)]
+        return table.column(0)
+
+    def _assert_column_exists(self, column_name: str) -> None:
+        if column_name not in self._dataset.column_names:
+            raise ColumnNotExistsError(
+                f"Column '{column_name}' doesn't exist in the dataset."
+            )
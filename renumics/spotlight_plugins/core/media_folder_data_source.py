@@ -0,0 +1,224 @@
+"""
+access a folder of media files as table data
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from hashlib import sha1
+from pathlib import Path
+from threading import Thread
+from typing import Any, Dict, List, Optional, Tuple, Type, cast
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from renumics.spotlight.dtypes import Audio, Image, Video
+from renumics.spotlight.dtypes.typing import (
+    ColumnType,
+    ColumnTypeMapping,
+    FileBasedColumnType,
+    is_file_based_column_type,
+)
+from renumics.spotlight.io.folder import (
+    MediaFolder,
+    get_media_type,
+    read_duration,
+    read_image_size,
+    scan_folder,
+)
+from renumics.spotlight.dataset.exceptions import ColumnNotExistsError
+from renumics.spotlight.backend import datasource
+from renumics.spotlight.backend.data_source import (
+    Column,
+    DataSource,
+    read_media_file,
+)
+from renumics.spotlight.backend.exceptions import NoTableFileFound
+from .pandas_data_source import column_from_series, decode_cell_value
+
+# Number of files whose metadata is read before it is published.
+METADATA_CHUNK_SIZE = 1000
+# Minimum time in seconds between two metadata publications.
+METADATA_REFRESH_INTERVAL = 2.0
+
+
+def read_file_metadata(path: Path) -> Tuple[float, float, float]:
+    """
+    Read width and height of an image or duration of an audio or video file,
+    `NaN` for not applicable or unreadable values.
+    """
+    width = height = duration = float("nan")
+    media_type = get_media_type(path)
+    try:
+        if media_type is Image:
+            width, height = read_image_size(path)
+        elif media_type in (Audio, Video):
+            duration = read_duration(path)
+    except Exception:  # pylint: disable=broad-except
+        ...
+    return width, height, duration
+
+
+@datasource(MediaFolder)
+class MediaFolderDataSource(DataSource):
+    """
+    access a folder of media files as table data
+
+    The folder is scanned once on creation. Image sizes and durations of audio
+    and video files are read in the background, the generation ID changes each
+    time a new part of them is available.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    _folder: Path
+    _pattern: Optional[str]
+    _paths: np.ndarray
+    _sizes: np.ndarray
+    _mtimes: np.ndarray
+    _media_types: List[Type[FileBasedColumnType]]
+    _metadata: Dict[str, np.ndarray]
+    _generation_id: int
+    _metadata_thread: Optional[Thread]
+
+    def __init__(self, source: MediaFolder):
+        self._folder = Path(source.path).absolute()
+        if not self._folder.is_dir():
+            raise NoTableFileFound(self._folder)
+        self._pattern = source.pattern
+        files = scan_folder(self._folder, source.pattern)
+        self._paths = np.array([path for path, _, _ in files], dtype=object)
+        self._sizes = np.array([size for _, size, _ in files], dtype=np.int64)
+        self._mtimes = np.array([mtime for _, _, mtime in files], dtype=np.int64)
+        media_types = {get_media_type(path) for path in self._paths}
+        self._media_types = [
+            media_type
+            for media_type in (Image, Audio, Video)
+            if media_type in media_types
+        ]
+
+        self._metadata = {}
+        if Image in self._media_types:
+            self._metadata["width"] = np.full(len(files), np.nan)
+            self._metadata["height"] = np.full(len(files), np.nan)
+        if Audio in self._media_types or Video in self._media_types:
+            self._metadata["duration"] = np.full(len(files), np.nan)
+        self._generation_id = 0
+        self._metadata_thread = None
+        if self._metadata and len(files) > 0:
+            self._metadata_thread = Thread(target=self._read_metadata, daemon=True)
+            self._metadata_thread.start()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_metadata"] = {
+            name: values.copy() for name, values in self._metadata.items()
+        }
+        state["_metadata_thread"] = None
+        return state
+
+    @property
+    def column_names(self) -> List[str]:
+        return ["path", "size", "mtime"] + list(self._metadata)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def guess_dtypes(self) -> ColumnTypeMapping:
+        path_dtype: Type[ColumnType] = str
+        if len(self._media_types) == 1:
+            path_dtype = self._media_types[0]
+        dtypes: ColumnTypeMapping = {
+            "path": path_dtype,
+            "size": int,
+            "mtime": datetime,
+        }
+        dtypes.update({name: float for name in self._metadata})
+        return dtypes
+
+    def get_generation_id(self) -> int:
+        return self._generation_id
+
+    def get_uid(self) -> str:
+        return sha1(f"{self._folder}:{self._pattern}".encode("utf-8")).hexdigest()
+
+    def get_name(self) -> str:
+        return str(self._folder.name)
+
+    def get_fingerprint(self) -> str:
+        fingerprint = sha1(self.get_uid().encode("utf-8"))
+        fingerprint.update("\0".join(self._paths).encode("utf-8"))
+        fingerprint.update(self._sizes.tobytes())
+        fingerprint.update(self._mtimes.tobytes())
+        return fingerprint.hexdigest()
+
+    def get_column(
+        self,
+        column_name: str,
+        dtype: Type[ColumnType],
+        indices: Optional[List[int]] = None,
+        simple: bool = False,
+    ) -> Column:
+        values = self._get_raw_values(column_name)
+        # Copy, since metadata columns are filled in the background.
+        values = values.copy() if indices is None else values[indices]
+        if column_name == "mtime":
+            series = pd.Series(pd.to_datetime(values, unit="ns", utc=True))
+        else:
+            series = pd.Series(values)
+        return column_from_series(series, column_name, dtype, simple)
+
+    def get_cell_data(
+        self, column_name: str, row_index: int, dtype: Type[ColumnType]
+    ) -> Any:
+        """
+        Return the value of a single cell, warn if not possible.
+        """
+        self._assert_index_exists(row_index)
+        raw_value = self._get_raw_values(column_name)[row_index]
+        if column_name == "path" and is_file_based_column_type(dtype):
+            return read_media_file(
+                self._folder / raw_value, cast(Type[FileBasedColumnType], dtype)
+            )
+        if column_name == "mtime":
+            raw_value = pd.to_datetime(raw_value, unit="ns", utc=True)
+        return decode_cell_value(raw_value, column_name, dtype)
+
+    def _get_raw_values(self, column_name: str) -> np.ndarray:
+        if column_name == "path":
+            return self._paths
+        if column_name == "size":
+            return self._sizes
+        if column_name == "mtime":
+            return self._mtimes
+        try:
+            return self._metadata[column_name]
+        except KeyError as e:
+            raise ColumnNotExistsError(
+                f"Column '{column_name}' doesn't exist in the dataset."
+            ) from e
+
+    def _read_metadata(self) -> None:
+        """
+        Read file metadata in chunks and publish it by changing the generation
+        ID at most every `METADATA_REFRESH_INTERVAL` seconds.
+        """
+        published_at = time.monotonic()
+        with ThreadPoolExecutor() as executor:
+            for start in range(0, len(self._paths), METADATA_CHUNK_SIZE):
+                end = start + METADATA_CHUNK_SIZE
+                paths = [self._folder / path for path in self._paths[start:end]]
+                metadata = np.array(
+                    list(executor.map(read_file_metadata, paths)), dtype=float
+                )
+                if "width" in self._metadata:
+                    self._metadata["width"][start:end] = metadata[:, 0]
+                    self._metadata["height"][start:end] = metadata[:, 1]
+                if "duration" in self._metadata:
+                    self._metadata["duration"][start:end] = metadata[:, 2]
+                if time.monotonic() - published_at >= METADATA_REFRESH_INTERVAL:
+                    self._generation_id += 1
+                    published_at = time.monotonic()
+        self._generation_id += 1
+        logger.info(f"Read metadata of {len(self._paths)} files in {self._folder}.")
@@ -1,11 +1,17 @@
 """
 access pandas DataFrame table data
 """
+import dataclasses
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from functools import lru_cache
-from typing import Any, Dict, List, Optional, Union, Type, cast
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, TypeVar, Union, Type, cast
 
 import numpy as np
+from numpy.typing import DTypeLike
 import pandas as pd
 import trimesh
 
@@ -23,6 +29,8 @@ from renumics.spotlight.dtypes.exceptions import InvalidFile, NotADType
 from renumics.spotlight.dtypes.typing import (
     ColumnType,
     ColumnTypeMapping,
+    get_column_type,
+    get_column_type_name,
     is_array_based_column_type,
     is_file_based_column_type,
     is_scalar_column_type,
@@ -30,6 +38,7 @@ from renumics.spotlight.dtypes.typing import (
 from renumics.spotlight.io.pandas import (
     infer_dtype,
     is_empty,
+    parse_number_list,
     prepare_column,
     prepare_hugging_face_dict,
     stringify_columns,
@@ -41,6 +50,7 @@ from renumics.spotlight.backend.data_source import (
     Column,
     DataSource,
     read_external_value,
+    read_in_memory_value,
 )
 from renumics.spotlight.backend.exceptions import (
     ConversionFailed,
@@ -48,6 +58,55 @@ from renumics.spotlight.backend.exceptions import (
 )
 from renumics.spotlight.typing import PathType, is_pathtype
 from renumics.spotlight.dataset.exceptions import ColumnNotExistsError
+from renumics.spotlight.cache import Cache
+
+# Number of values per column used to infer non-scalar dtypes.
+INFERENCE_SAMPLE_SIZE = 1000
+
+# Prepared columns and embedding matrices kept in memory per data source.
+PREPARED_COLUMNS_CACHE_SIZE = 64
+EMBEDDINGS_CACHE_SIZE = 16
+
+dtypes_cache = Cache("dtypes")
+
+K = TypeVar("K", bound=Tuple)
+V = TypeVar("V")
+
+
+def _lru_get(cache: "OrderedDict[K, V]", key: K) -> V:
+    """
+    Get a cached value and mark it as recently used. Callers hold the lock of
+    the cache's owner.
+    """
+    value = cache[key]
+    cache.move_to_end(key)
+    return value
+
+
+def _lru_put(
+    cache: "OrderedDict[K, V]", key: K, value: V, max_size: int, generation_id: int
+) -> None:
+    """
+    Cache a value keyed by a tuple ending with a generation ID, drop values of
+    other generations and the least recently used values beyond `max_size`.
+    Callers hold the lock of the cache's owner.
+    """
+    for stale_key in [k for k in cache if k[-1] != generation_id]:
+        del cache[stale_key]
+    cache[key] = value
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+
+def file_fingerprint(path: PathType) -> str:
+    """
+    Fingerprint a file by its absolute path, size and modification time.
+    """
+    path = Path(path).absolute()
+    stat = path.stat()
+    return hashlib.sha1(
+        f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8")
+    ).hexdigest()
 
 
 @datasource(pd.DataFrame)
@@ -60,42 +119,86 @@ class PandasDataSource(DataSource):
     _generation_id: int
     _uid: str
     _df: pd.DataFrame
+    _column_names: List[str]
+    _fingerprint: Optional[str]
+    _prepared_columns: "OrderedDict[Tuple[str, Type[ColumnType], bool, int], Column]"
+    _embeddings: "OrderedDict[Tuple[str, int], Tuple[np.ndarray, np.ndarray]]"
+    # Guards the caches, which are used by concurrent requests.
+    _lock: threading.RLock
 
     def __init__(self, source: Union[PathType, pd.DataFrame]):
         if is_pathtype(source):
+            self._fingerprint = file_fingerprint(source)
             df = pd.read_csv(source)
         else:
+            self._fingerprint = None
             df = source
 
         if not df.columns.is_unique:
             raise DatasetColumnsNotUnique()
         self._generation_id = 0
         self._uid = str(id(df))
-        self._df = df.copy()
+        # A shallow copy decouples the served columns from the given
+        # `DataFrame` without duplicating its data: adding, removing or
+        # reassigning its columns later does not change the served table. With
+        # `pandas` copy-on-write disabled, in-place edits of its values (e.g.
+        # `df.loc[0, "a"] = 1`) can leak into columns not yet cached. In the
+        # server process, the `DataFrame` is received pickled and thus owned by
+        # the data source.
+        self._df = df.copy(deep=False)
+        self._column_names = stringify_columns(self._df)
+        self._prepared_columns = OrderedDict()
+        self._embeddings = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
 
     @property
     def column_names(self) -> List[str]:
-        return stringify_columns(self._df)
+        return list(self._column_names)
 
     @property
     def df(self) -> pd.DataFrame:
         """
-        Get **a copy** of the served `DataFrame`.
+        Get a shallow copy of the served `DataFrame`.
+
+        The returned `DataFrame` shares its data with the served one, so it
+        should not be modified in-place. `Viewer.df` receives it pickled, thus
+        fully isolated from the served `DataFrame`.
         """
-        return self._df.copy()
+        return self._df.copy(deep=False)
 
     def __len__(self) -> int:
         return len(self._df)
 
     def guess_dtypes(self) -> ColumnTypeMapping:
+        cache_key = f"dtypes:{self.get_fingerprint()}"
+        try:
+            return {
+                column_name: get_column_type(dtype_name)
+                for column_name, dtype_name in dtypes_cache[cache_key].items()
+            }
+        except KeyError:
+            ...
+
         dtype_map = {
-            str(column_name): infer_dtype(self.df[column_name])
-            for column_name in self.df
+            column_name: infer_dtype(column, INFERENCE_SAMPLE_SIZE)
+            for column_name, (_, column) in zip(self._column_names, self._df.items())
+        }
+        dtypes_cache[cache_key] = {
+            column_name: get_column_type_name(dtype)
+            for column_name, dtype in dtype_map.items()
         }
         return dtype_map
 
     def _parse_column_index(self, column_name: str) -> Any:
-        column_names = self.column_names
         try:
             loc = self._df.columns.get_loc(column_name)
         except KeyError:
@@ -105,7 +208,7 @@ class PandasDataSource(DataSource):
                 return self._df.columns[loc][0]
             return self._df.columns[loc]
         try:
-            index = column_names.index(column_name)
+            index = self._column_names.index(column_name)
         except ValueError as e:
             raise ColumnNotExistsError(
                 f"Column '{column_name}' doesn't exist in the dataset."
@@ -121,6 +224,12 @@ class PandasDataSource(DataSource):
     def get_name(self) -> str:
         return "pd.DataFrame"
 
+    def get_fingerprint(self) -> str:
+        if self._fingerprint is not None and self._generation_id == 0:
+            return self._fingerprint
+        # Edits only live in memory.
+        return super().get_fingerprint()
+
     def get_column(
         self,
         column_name: str,
@@ -128,123 +237,84 @@ class PandasDataSource(DataSource):
         indices: Optional[List[int]] = None,
         simple: bool = False,
     ) -> Column:
-        # pylint: disable=too-many-branches, too-many-statements
-        column_index = self._parse_column_index(column_name)
-
-        column = self._df[column_index]
-        if indices is not None:
-            column = column.iloc[indices]
-        column = prepare_column(column, dtype)
-
-        categories = None
-        embedding_length = None
+        """
+        Get column metadata + values.
 
-        if dtype is Category:
-            # `NaN` category is listed neither in `pandas`, not in our format.
-            categories = {
-                category: i for i, category in enumerate(column.cat.categories)
-            }
-            column = column.cat.codes
-            values = column.to_numpy()
-        elif dtype is datetime:
-            # We expect datetimes as ISO strings; empty strings instead of `NaT`s.
-            column = column.dt.strftime("%Y-%m-%dT%H:%M:%S.%f%z")
-            column = column.mask(column.isna(), "")
-            values = column.to_numpy()
-        elif dtype is str:
-            # Replace `NA`s with empty strings.
-            column = column.mask(column.isna(), "")
-            values = column.to_numpy()
-            if simple:
-                values = np.array(
-                    [
-                        value[:47] + "..." if len(value) > 50 else value
-                        for value in values
-                    ]
-                )
-        elif is_scalar_column_type(dtype):
-            values = column.to_numpy()
-        elif dtype is Window:
-            # Replace all `NA` values with `[NaN, NaN]`.
-            na_mask = column.isna()
-            column.iloc[na_mask] = pd.Series(
-                [[float("nan"), float("nan")]] * na_mask.sum()
-            )
-            # This will fail, if arrays in column cells aren't aligned.
-            try:
-                values = np.asarray(column.to_list(), dtype=float)
-            except ValueError as e:
-                raise ValueError(
-                    f"For the window column '{column_name}', column cells "
-                    f"should be sequences of shape (2,) or `NA`s, but "
-                    f"unaligned sequences received."
-                ) from e
-            if values.ndim != 2 or values.shape[1] != 2:
-                raise ValueError(
-                    f"For the window column '{column_name}', column cells "
-                    f"should be sequences of shape (2,) or `NA`s, but "
-                    f"sequences of shape {values.shape[1:]} received."
-                )
-        elif dtype is Embedding:
-            na_mask = column.isna()
-            # This will fail, if arrays in column cells aren't aligned.
+        The whole column is prepared once per dtype and cached, so that
+        subsequent calls only slice the prepared values. Cached values are
+        read-only.
+        """
+        with self._lock:
+            cache_key = (column_name, dtype, simple, self._generation_id)
             try:
-                embeddings = np.asarray(column[~na_mask].to_list(), dtype=float)
-            except ValueError as e:
-                raise ValueError(
-                    f"For the embedding column '{column_name}', column cells "
-                    f"should be sequences of the same shape (n,) or `NA`s, but "
-                    f"unaligned sequences received."
-                ) from e
-            if embeddings.ndim != 2 or embeddings.shape[1] == 0:
-                raise ValueError(
-                    f"For the embedding column '{column_name}', column cells "
-                    f"should be sequences of the same shape (n,) or `NA`s, but "
-                    f"sequences of shape {embeddings.shape[1:]} received."
+                column = _lru_get(self._prepared_columns, cache_key)
+            except KeyError:
+                column = self._prepare_column(column_name, dtype, simple)
+                column.values.setflags(write=False)
+                _lru_put(
+                    self._prepared_columns,
+                    cache_key,
+                    column,
+                    PREPARED_COLUMNS_CACHE_SIZE,
+                    self._generation_id,
                 )
+        if indices is None:
+            return column
+        return dataclasses.replace(column, values=column.values[indices])
 
-            values = np.empty(len(column), dtype=object)
+    def _prepare_column(
+        self, column_name: str, dtype: Type[ColumnType], simple: bool = False
+    ) -> Column:
+        column_index = self._parse_column_index(column_name)
+        embeddings = self.get_embeddings(column_name) if dtype is Embedding else None
+        return column_from_series(
+            self._df[column_index], column_name, dtype, simple, embeddings
+        )
 
-            if simple:
-                values[~na_mask] = "[...]"
-            else:
-                values[np.where(~na_mask)[0]] = list(embeddings)
+    def get_embeddings(self, column_name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get an embedding column as a contiguous `float32` matrix of shape
+        `(num_rows, embedding_length)` along with the column's `NA` mask. `NA`
+        rows of the matrix are filled with `NaN`s.
 
-            embedding_length = embeddings.shape[1]
+        The matrix is built once and cached, both returned arrays are read-only.
+        """
+        with self._lock:
+            cache_key = (column_name, self._generation_id)
+            try:
+                return _lru_get(self._embeddings, cache_key)
+            except KeyError:
+                ...
 
-        elif dtype is Sequence1D:
-            na_mask = column.isna()
-            values = np.empty(len(column), dtype=object)
-            values[~na_mask] = "[...]"
-        elif dtype is np.ndarray:
-            na_mask = column.isna()
-            values = np.empty(len(column), dtype=object)
-            values[~na_mask] = "[...]"
-        elif is_file_based_column_type(dtype):
-            # Strings are paths or URLs, let them inplace. Replace
-            # non-strings with "<in-memory>".
-            na_mask = column.isna()
-            column = column.mask(~(column.map(type) == str), "<in-memory>")
-            values = column.to_numpy(dtype=object)
-            values[na_mask] = None
-        else:
-            raise NotADType()
-
-        return Column(
-            type=dtype,
-            order=None,
-            hidden=column_name.startswith("_"),
-            optional=True,
-            description=None,
-            tags=[],
-            editable=dtype in (bool, int, float, str, Category, Window),
-            categories=categories,
-            x_label=None,
-            y_label=None,
-            embedding_length=embedding_length,
-            name=column_name,
-            values=values,
-        )
+            column_index = self._parse_column_index(column_name)
+            embeddings, na_mask = embeddings_from_series(
+                self._df[column_index], column_name
+            )
+            embeddings.setflags(write=False)
+            na_mask.setflags(write=False)
+            _lru_put(
+                self._embeddings,
+                cache_key,
+                (embeddings, na_mask),
+                EMBEDDINGS_CACHE_SIZE,
+                self._generation_id,
+            )
+            return embeddings, na_mask
+
+    def _get_column_matrix(
+        self,
+        column_name: str,
+        column_type: Type[ColumnType],
+        indices: Optional[List[int]],
+        dtype: DTypeLike,
+    ) -> np.ndarray:
+        if column_type is not Embedding:
+            # Other columns are sliced from the cached prepared columns.
+            return super()._get_column_matrix(column_name, column_type, indices, dtype)
+        embeddings, _ = self.get_embeddings(column_name)
+        if indices is not None:
+            embeddings = embeddings[indices]
+        return embeddings.astype(dtype, copy=False)
 
     def get_cell_data(
         self, column_name: str, row_index: int, dtype: Type[ColumnType]
@@ -265,73 +335,7 @@ class PandasDataSource(DataSource):
                 return -1
             categories = self._get_column_categories(column_index, as_string=True)
             return categories.get(raw_value, -1)
-        if dtype is datetime:
-            value = pd.to_datetime(raw_value).to_numpy("datetime64[us]").tolist()
-            # `tolist()` returns `None` for all `NaT`s, `datetime` otherwise.
-            if value is None:
-                return ""
-            return value.isoformat()
-        if dtype is str:
-            if pd.isna(raw_value):
-                return ""
-            return str(raw_value)
-        if is_scalar_column_type(dtype):
-            # `dtype` is `bool`, `int` or `float`.
-            dtype = cast(Type[Union[bool, int, float]], dtype)
-            try:
-                return dtype(raw_value)
-            except (TypeError, ValueError) as e:
-                raise ConversionFailed(dtype, raw_value) from e
-        if dtype is np.ndarray:
-            if isinstance(raw_value, str):
-                raw_value = try_literal_eval(raw_value)
-            if is_empty(raw_value):
-                return None
-            return np.asarray(raw_value)
-        if dtype is Window:
-            if isinstance(raw_value, str):
-                raw_value = try_literal_eval(raw_value)
-            if is_empty(raw_value):
-                return np.full(2, np.nan)
-            try:
-                value = np.asarray(raw_value, dtype=float)
-            except (TypeError, ValueError) as e:
-                raise ConversionFailed(dtype, raw_value) from e
-            if value.ndim != 1 or len(value) != 2:
-                raise ValueError(
-                    f"Window column cells should be sequences of shape (2,), "
-                    f"but a sequence of shape {value.shape} received for the "
-                    f"column '{column_name}'."
-                )
-        if is_empty(raw_value):
-            return None
-        if isinstance(raw_value, str):
-            raw_value = try_literal_eval(raw_value)
-        if is_file_based_column_type(dtype) and isinstance(raw_value, dict):
-            raw_value = prepare_hugging_face_dict(raw_value)
-        if isinstance(raw_value, trimesh.Trimesh) and dtype is Mesh:
-            value = Mesh.from_trimesh(raw_value)
-            return value.encode()
-        if isinstance(raw_value, str) and is_file_based_column_type(dtype):
-            try:
-                return read_external_value(str(raw_value), dtype)
-            except Exception as e:
-                raise ConversionFailed(dtype, raw_value) from e
-        if isinstance(raw_value, bytes) and dtype in (Audio, Image, Video):
-            try:
-                value = dtype.from_bytes(raw_value)  # type: ignore
-            except Exception as e:
-                raise ConversionFailed(dtype, raw_value) from e
-            return value.encode()
-        if not isinstance(raw_value, dtype) and is_array_based_column_type(dtype):
-            try:
-                value = dtype(raw_value)
-            except (InvalidFile, TypeError, ValueError) as e:
-                raise ConversionFailed(dtype, raw_value) from e
-            return value.encode()
-        if isinstance(raw_value, dtype):
-            return raw_value.encode()
-        raise ConversionFailed(dtype, raw_value)
+        return decode_cell_value(raw_value, column_name, dtype)
 
     def _get_default_value(self, dtype: Type[ColumnType]) -> Any:
         if dtype is int:
@@ -361,3 +365,228 @@ class PandasDataSource(DataSource):
         column = self._df[column_index]
         column = to_categorical(column, str_categories=as_string)
         return {category: i for i, category in enumerate(column.cat.categories)}
+
+
+def column_from_series(
+    column: pd.Series,
+    column_name: str,
+    dtype: Type[ColumnType],
+    simple: bool = False,
+    embeddings: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> Column:
+    """
+    Convert a raw `pandas` column into a Spotlight column of the given dtype.
+
+    For embedding columns, already stacked embeddings and their `NA` mask (see
+    `embeddings_from_series`) can be given.
+    """
+    # pylint: disable=too-many-branches, too-many-statements
+    if dtype is not Embedding:
+        column = prepare_column(column, dtype)
+
+    categories = None
+    embedding_length = None
+
+    if dtype is Category:
+        # `NaN` category is listed neither in `pandas`, not in our format.
+        categories = {category: i for i, category in enumerate(column.cat.categories)}
+        column = column.cat.codes
+        values = column.to_numpy()
+    elif dtype is datetime:
+        # We expect datetimes as ISO strings; empty strings instead of `NaT`s.
+        column = column.dt.strftime("%Y-%m-%dT%H:%M:%S.%f%z")
+        column = column.mask(column.isna(), "")
+        values = column.to_numpy()
+    elif dtype is str:
+        # Replace `NA`s with empty strings.
+        column = column.mask(column.isna(), "")
+        values = column.to_numpy()
+        if simple:
+            values = np.array(
+                [value[:47] + "..." if len(value) > 50 else value for value in values]
+            )
+    elif is_scalar_column_type(dtype):
+        values = column.to_numpy()
+    elif dtype is Window:
+        # Replace all `NA` values with `[NaN, NaN]`.
+        na_mask = column.isna()
+        column.iloc[na_mask] = pd.Series([[float("nan"), float("nan")]] * na_mask.sum())
+        # This will fail, if arrays in column cells aren't aligned.
+        try:
+            values = np.asarray(column.to_list(), dtype=float)
+        except ValueError as e:
+            raise ValueError(
+                f"For the window column '{column_name}', column cells "
+                f"should be sequences of shape (2,) or `NA`s, but "
+                f"unaligned sequences received."
+            ) from e
+        if values.ndim != 2 or values.shape[1] != 2:
+            raise ValueError(
+                f"For the window column '{column_name}', column cells "
+                f"should be sequences of shape (2,) or `NA`s, but "
+                f"sequences of shape {values.shape[1:]} received."
+            )
+    elif dtype is Embedding:
+        if embeddings is None:
+            embeddings = embeddings_from_series(column, column_name)
+        embedding_matrix, na_mask = embeddings
+        values = np.empty(len(column), dtype=object)
+        if simple:
+            values[~na_mask] = "[...]"
+        else:
+            # Row views, boolean indexing would copy the whole matrix.
+            for i in np.flatnonzero(~na_mask):
+                values[i] = embedding_matrix[i]
+        embedding_length = embedding_matrix.shape[1]
+    elif dtype is Sequence1D:
+        na_mask = column.isna()
+        values = np.empty(len(column), dtype=object)
+        values[~na_mask] = "[...]"
+    elif dtype is np.ndarray:
+        na_mask = column.isna()
+        values = np.empty(len(column), dtype=object)
+        values[~na_mask] = "[...]"
+    elif is_file_based_column_type(dtype):
+        # Strings are paths or URLs, let them inplace. Replace
+        # non-strings with "<in-memory>".
+        na_mask = column.isna()
+        column = column.mask(~(column.map(type) == str), "<in-memory>")
+        values = column.to_numpy(dtype=object)
+        values[na_mask] = None
+    else:
+        raise NotADType()
+
+    return Column(
+        type=dtype,
+        order=None,
+        hidden=column_name.startswith("_"),
+        optional=True,
+        description=None,
+        tags=[],
+        editable=dtype in (bool, int, float, str, Category, Window),
+        categories=categories,
+        x_label=None,
+        y_label=None,
+        embedding_length=embedding_length,
+        name=column_name,
+        values=values,
+    )
+
+
+def embeddings_from_series(
+    column: pd.Series, column_name: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stack a raw `pandas` embedding column into a contiguous `float32` matrix of
+    shape `(num_rows, embedding_length)`, `NA` rows are filled with `NaN`s.
+
+    Returns:
+        The embedding matrix and the column's `NA` mask.
+    """
+    column = prepare_column(column, Embedding)
+    na_mask = column.isna().to_numpy()
+    # This will fail, if arrays in column cells aren't aligned.
+    try:
+        valid_embeddings = np.asarray(column[~na_mask].to_list(), dtype=np.float32)
+    except ValueError as e:
+        raise ValueError(
+            f"For the embedding column '{column_name}', column cells "
+            f"should be sequences of the same shape (n,) or `NA`s, but "
+            f"unaligned sequences received."
+        ) from e
+    if valid_embeddings.ndim != 2 or valid_embeddings.shape[1] == 0:
+        raise ValueError(
+            f"For the embedding column '{column_name}', column cells "
+            f"should be sequences of the same shape (n,) or `NA`s, but "
+            f"sequences of shape {valid_embeddings.shape[1:]} received."
+        )
+    embeddings = np.full(
+        (len(column), valid_embeddings.shape[1]), np.nan, dtype=np.float32
+    )
+    embeddings[~na_mask] = valid_embeddings
+    return embeddings, na_mask
+
+
+def decode_cell_value(
+    raw_value: Any,
+    column_name: str,
+    dtype: Type[ColumnType],
+    workdir: PathType = ".",
+) -> Any:
+    """
+    Convert a raw non-categorical cell value as stored in a `pandas` column
+    into the value expected by the frontend.
+    """
+    # pylint: disable=too-many-return-statements, too-many-branches
+    # pylint: disable=too-many-statements
+    if dtype is datetime:
+        value = pd.to_datetime(raw_value)
+        if pd.isna(value):
+            return ""
+        # Timezone-aware datetimes are sent in UTC without timezone.
+        if value.tzinfo is not None:
+            value = value.tz_convert(None)
+        return value.to_pydatetime().isoformat()
+    if dtype is str:
+        if pd.isna(raw_value):
+            return ""
+        return str(raw_value)
+    if is_scalar_column_type(dtype):
+        # `dtype` is `bool`, `int` or `float`.
+        dtype = cast(Type[Union[bool, int, float]], dtype)
+        try:
+            return dtype(raw_value)
+        except (TypeError, ValueError) as e:
+            raise ConversionFailed(dtype, raw_value) from e
+    if dtype is np.ndarray:
+        if isinstance(raw_value, str):
+            raw_value = try_literal_eval(raw_value)
+        if is_empty(raw_value):
+            return None
+        return np.asarray(raw_value)
+    if dtype is Window:
+        if isinstance(raw_value, str):
+            raw_value = parse_number_list(raw_value)
+        if is_empty(raw_value):
+            return np.full(2, np.nan)
+        try:
+            value = np.asarray(raw_value, dtype=float)
+        except (TypeError, ValueError) as e:
+            raise ConversionFailed(dtype, raw_value) from e
+        if value.ndim != 1 or len(value) != 2:
+            raise ValueError(
+                f"Window column cells should be sequences of shape (2,), "
+                f"but a sequence of shape {value.shape} received for the "
+                f"column '{column_name}'."
+            )
+    if is_empty(raw_value):
+        return None
+    if isinstance(raw_value, str):
+        if dtype is Embedding:
+            raw_value = parse_number_list(raw_value)
+        else:
+            raw_value = try_literal_eval(raw_value)
+    if is_file_based_column_type(dtype) and isinstance(raw_value, dict):
+        raw_value = prepare_hugging_face_dict(raw_value)
+    if isinstance(raw_value, trimesh.Trimesh) and dtype is Mesh:
+        value = Mesh.from_trimesh(raw_value)
+        return value.encode()
+    if isinstance(raw_value, str) and is_file_based_column_type(dtype):
+        try:
+            return read_external_value(str(raw_value), dtype, workdir=workdir)
+        except Exception as e:
+            raise ConversionFailed(dtype, raw_value) from e
+    if isinstance(raw_value, bytes) and dtype in (Audio, Image, Video):
+        try:
+            return read_in_memory_value(raw_value, dtype)  # type: ignore
+        except Exception as e:
+            raise ConversionFailed(dtype, raw_value) from e
+    if not isinstance(raw_value, dtype) and is_array_based_column_type(dtype):
+        try:
+            value = dtype(raw_value)
+        except (InvalidFile, TypeError, ValueError) as e:
+            raise ConversionFailed(dtype, raw_value) from e
+        return value.encode()
+    if isinstance(raw_value, dtype):
+        return raw_value.encode()
+    raise ConversionFailed(dtype, raw_value)
@@ -0,0 +1,55 @@
+"""
+access Polars DataFrame table data
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence, Union
+
+import polars as pl
+import pyarrow as pa
+
+from renumics.spotlight.backend import datasource
+from .arrow_data_source import ArrowDataSource
+
+
+@datasource(pl.DataFrame)
+@datasource(pl.LazyFrame)
+class PolarsDataSource(ArrowDataSource):
+    """
+    access Polars DataFrame table data
+
+    Columns are handed over as Arrow arrays without copying and converted to
+    Spotlight columns one at a time. A `LazyFrame` is collected once.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    _df: pl.DataFrame
+    _uid: str
+
+    def __init__(self, source: Union[pl.DataFrame, pl.LazyFrame]):
+        self._uid = str(id(source))
+        if isinstance(source, pl.LazyFrame):
+            source = source.collect()
+        self._df = source
+        self._schema = source.head(0).to_arrow().schema
+        self._column_names = list(source.columns)
+        self._length = source.height
+        self._generation_id = 0
+        self._prepared_columns = OrderedDict()
+        self._categories = {}
+        self._lock = threading.RLock()
+
+    def get_uid(self) -> str:
+        return self._uid
+
+    def get_name(self) -> str:
+        return "pl.DataFrame"
+
+    def _read_column(
+        self, column_name: str, indices: Optional[Sequence[int]] = None
+    ) -> pa.ChunkedArray:
+        series = self._df.get_column(column_name)
+        if indices is not None:
+            series = series.gather(list(indices))
+        return pa.chunked_array([series.to_arrow()])
@@ -0,0 +1,280 @@
+"""
+access SQLite and DuckDB table data
+"""
+from hashlib import sha1
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pyarrow as pa
+
+from renumics.spotlight.io.sql import (
+    DatabaseError,
+    SqlTable,
+    is_duckdb_file,
+    iter_results,
+    list_tables,
+    quote_identifier,
+)
+from renumics.spotlight.typing import PathType
+from renumics.spotlight.backend import datasource
+from renumics.spotlight.backend.exceptions import (
+    CouldNotOpenTableFile,
+    NoTableFileFound,
+    NoUniqueTable,
+)
+from .arrow_data_source import ArrowFileDataSource
+from .pandas_data_source import INFERENCE_SAMPLE_SIZE
+
+# Above this share of a table's rows, a whole column is read at once instead
+# of selecting the requested rows in SQL.
+SELECTION_RATIO = 0.25
+# Maximum number of row IDs selected by a single query.
+SELECTION_CHUNK_SIZE = 50000
+# Number of SQLite rows converted to Arrow at once.
+FETCH_BATCH_SIZE = 10000
+
+
+def _to_arrow_array(values: List[Any], data_type: Optional[pa.DataType]) -> pa.Array:
+    """
+    Convert values read from SQLite, whose columns can hold values of any type,
+    to an Arrow array, falling back to strings for mixed types.
+    """
+    for candidate_type in (data_type, None):
+        try:
+            return pa.array(values, type=candidate_type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            ...
+    return pa.array([None if x is None else str(x) for x in values], pa.string())
+
+
+def _concat_arrays(arrays: List[pa.Array]) -> pa.ChunkedArray:
+    """
+    Concatenate arrays converted from batches of SQLite rows, falling back to
+    converting all values at once if the batches' types differ.
+    """
+    data_types = {array.type for array in arrays if not pa.types.is_null(array.type)}
+    if len(data_types) > 1:
+        values = [value for array in arrays for value in array.to_pylist()]
+        return pa.chunked_array([_to_arrow_array(values, None)])
+    data_type = data_types.pop() if data_types else pa.null()
+    return pa.chunked_array([array.cast(data_type) for array in arrays], data_type)
+
+
+def _sql_integers(values: np.ndarray) -> str:
+    return ", ".join(str(value) for value in values.tolist())
+
+
+@datasource(SqlTable)
+@datasource(".duckdb")
+@datasource(".sqlite")
+@datasource(".sqlite3")
+@datasource(".db")
+class SqlDataSource(ArrowFileDataSource):
+    """
+    access SQLite and DuckDB table data
+
+    Each column is read by its own query, requested rows are selected by their
+    row IDs or, for views and queries, by their positions. Row and `NA` counts
+    are computed by the database engine. The database is only opened for
+    queries, so that other processes can write to it in between.
+    """
+
+    _table: Optional[str]
+    _query: Optional[str]
+    _has_row_ids: bool
+    _first_row_id: int
+    # Row IDs of all rows if they are not contiguous.
+    _row_ids: Optional[np.ndarray]
+
+    def __init__(self, source: Union[PathType, SqlTable]):
+        if isinstance(source, SqlTable):
+            path, table, query = Path(source.path), source.table, source.query
+        else:
+            path, table, query = Path(source), None, None
+        if not path.is_file():
+            raise NoTableFileFound(path)
+        if table is None and query is None:
+            try:
+                tables = list_tables(path)
+            except DatabaseError as e:
+                raise CouldNotOpenTableFile(path) from e
+            if len(tables) != 1:
+                raise NoUniqueTable(path)
+            table = tables[0]
+        self._table = table
+        self._query = query
+        super().__init__(path)
+
+    def get_uid(self) -> str:
+        source = f"{self._table_file.absolute()}:{self._table}:{self._query}"
+        return sha1(source.encode("utf-8")).hexdigest()
+
+    def get_name(self) -> str:
+        if self._query is None and self._table is not None:
+            return self._table
+        return str(self._table_file.name)
+
+    def _get_file_signature(self) -> Tuple[int, ...]:
+        signature = super()._get_file_signature()
+        # Recent changes can be in the write-ahead log only.
+        if is_duckdb_file(self._table_file):
+            wal_file = self._table_file.with_name(self._table_file.name + ".wal")
+        else:
+            wal_file = self._table_file.with_name(self._table_file.name + "-wal")
+        try:
+            stat = wal_file.stat()
+        except FileNotFoundError:
+            return signature
+        return signature + (stat.st_mtime_ns, stat.st_size)
+
+    def _get_relation(self) -> str:
+        if self._query is not None:
+            return f"({self._query}) AS spotlight_query"
+        return quote_identifier(str(self._table))
+
+    def _fetch(self, sql: str, schema: Optional[pa.Schema] = None) -> pa.Table:
+        types: Dict[str, pa.DataType] = (
+            {} if schema is None else dict(zip(schema.names, schema.types))
+        )
+        column_names: List[str] = []
+        chunks: Dict[str, List[pa.Array]] = {}
+        for column_names, result in iter_results(
+            self._table_file, sql, FETCH_BATCH_SIZE
+        ):
+            if isinstance(result, pa.Table):
+                return result
+            columns = list(zip(*result)) if result else [()] * len(column_names)
+            for name, values in zip(column_names, columns):
+                array = _to_arrow_array(list(values), types.get(name))
+                if not pa.types.is_null(array.type):
+                    types.setdefault(name, array.type)
+                chunks.setdefault(name, []).append(array)
+        return pa.Table.from_arrays(
+            [_concat_arrays(chunks[name]) for name in column_names],
+            names=column_names,
+        )
+
+    def _read_schema(self) -> Tuple[pa.Schema, int]:
+        relation = self._get_relation()
+        try:
+            length = self._read_row_ids()
+            schema = self._fetch(
+                f"SELECT * FROM {relation} LIMIT {INFERENCE_SAMPLE_SIZE}"
+            ).schema
+            for i, field in enumerate(schema):
+                if not pa.types.is_null(field.type):
+                    continue
+                # SQLite has no column types, so look for a value further down.
+                column = quote_identifier(field.name)
+                values = self._fetch(
+                    f"SELECT {column} FROM {relation} "
+                    f"WHERE {column} IS NOT NULL LIMIT 1"
+                ).column(0)
+                schema = schema.set(i, field.with_type(values.type))
+        except DatabaseError as e:
+            raise CouldNotOpenTableFile(self._table_file) from e
+        return schema, length
+
+    def _read_row_ids(self) -> int:
+        """
+        Check whether the rows can be selected by row ID and read the row IDs
+        if they are not contiguous.
+
+        Returns:
+            The number of rows.
+        """
+        self._row_ids = None
+        self._first_row_id = 0
+        relation = self._get_relation()
+        row_id_range = None
+        if self._query is None:
+            try:
+                row_id_range = self._fetch(
+                    f"SELECT min(rowid) AS first, max(rowid) AS last, "
+                    f"count(*) AS length FROM {relation}"
+                ).to_pylist()[0]
+            except DatabaseError:
+                # Views and tables without row IDs.
+                ...
+        if row_id_range is None or (
+            row_id_range["length"] > 0 and row_id_range["first"] is None
+        ):
+            # SQLite views have `NULL` row IDs.
+            self._has_row_ids = False
+            return self._fetch(f"SELECT count(*) FROM {relation}").column(0)[0].as_py()
+        self._has_row_ids = True
+        length = row_id_range["length"]
+        if length > 0:
+            self._first_row_id = row_id_range["first"]
+            if row_id_range["last"] - self._first_row_id + 1 != length:
+                self._row_ids = (
+                    self._fetch(f"SELECT rowid FROM {relation} ORDER BY rowid")
+                    .column(0)
+                    .to_numpy()
+                )
+        return length
+
+    def _count_nulls(self, column_name: str) -> int:
+        column = quote_identifier(column_name)
+        try:
+            table = self._fetch(
+                f"SELECT count(*) - count({column}) FROM {self._get_relation()}"
+            )
+        except DatabaseError as e:
+            raise CouldNotOpenTableFile(self._table_file) from e
+        return table.column(0)[0].as_py()
+
+    def _read_column(
+        self, column_name: str, indices: Optional[Sequence[int]] = None
+    ) -> pa.ChunkedArray:
+        try:
+            return self._select_rows(column_name, indices)
+        except DatabaseError as e:
+            raise CouldNotOpenTableFile(self._table_file) from e
+
+    def _select_rows(
+        self, column_name: str, indices: Optional[Sequence[int]] = None
+    ) -> pa.ChunkedArray:
+        column = quote_identifier(column_name)
+        relation = self._get_relation()
+        order = " ORDER BY rowid" if self._has_row_ids else ""
+        if indices is None:
+            sql = f"SELECT {column} FROM {relation}{order}"
+            return self._fetch(sql, self._schema).column(0)
+        # Negative indices count from the end for both ways of reading.
+        rows = np.asarray(indices, dtype=np.int64)
+        rows = np.where(rows < 0, rows + self._length, rows)
+        if len(rows) == 0:
+            sql = f"SELECT {column} FROM {relation} LIMIT 0"
+            return self._fetch(sql, self._schema).column(0)
+        if len(rows) > SELECTION_RATIO * self._length:
+            sql = f"SELECT {column} FROM {relation}{order}"
+            values = self._fetch(sql, self._schema).column(0)
+            return values.take(pa.array(rows))
+
+        if self._has_row_ids:
+            if self._row_ids is None:
+                row_ids = rows + self._first_row_id
+            else:
+                row_ids = self._row_ids[rows]
+            read_row_ids = np.unique(row_ids)
+            parts = []
+            for start in range(0, len(read_row_ids), SELECTION_CHUNK_SIZE):
+                chunk = read_row_ids[start : start + SELECTION_CHUNK_SIZE]
+                sql = (
+                    f"SELECT {column} FROM {relation} "
+                    f"WHERE rowid IN ({_sql_integers(chunk)}){order}"
+                )
+                parts.append(self._fetch(sql, self._schema).column(0))
+            values = pa.chunked_array(
+                [chunk for part in parts for chunk in part.chunks], type=parts[0].type
+            )
+            positions = np.searchsorted(read_row_ids, row_ids)
+        else:
+            start = int(rows.min())
+            stop = int(rows.max()) + 1
+            sql = f"SELECT {column} FROM {relation} LIMIT {stop - start} OFFSET {start}"
+            values = self._fetch(sql, self._schema).column(0)
+            positions = rows - start
+        return values.take(pa.array(positions))
@@ -0,0 +1,210 @@
+"""
+access WebDataset tar shards as table data
+"""
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha1
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Type, cast
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from renumics.spotlight.dtypes import Audio, Image, Video
+from renumics.spotlight.dtypes.typing import (
+    ColumnType,
+    ColumnTypeMapping,
+    FileBasedColumnType,
+)
+from renumics.spotlight.io.folder import get_media_type
+from renumics.spotlight.io.webdataset import (
+    MemberEntry,
+    expand_shards,
+    load_shard_index,
+    read_member,
+    read_members,
+    split_member_name,
+)
+from renumics.spotlight.typing import PathType
+from renumics.spotlight.backend import datasource
+from renumics.spotlight.backend.data_source import read_in_memory_value
+from renumics.spotlight.backend.exceptions import NoTableFileFound
+from .pandas_data_source import PandasDataSource, decode_cell_value, file_fingerprint
+
+# Sidecar extensions holding integers, e.g. class labels.
+INT_EXTENSIONS = ("cls", "cls2", "index", "inx", "id")
+# Sidecar extensions holding text.
+TEXT_EXTENSIONS = ("txt", "text")
+
+
+def _decode_int(data: bytes) -> Any:
+    text = data.decode("utf-8").strip()
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def _get_media_type(extension: str) -> Optional[Type[FileBasedColumnType]]:
+    # Guess by a full file name, a bare ".png" would count as a hidden file.
+    return get_media_type(f"sample.{extension}")
+
+
+def _collect_members(
+    indices: List[List[MemberEntry]],
+) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """
+    Group the members of all shards by sample key and extension.
+
+    Returns:
+        The sample keys in order of appearance and, per extension, positions
+        of the members as rows of (shard index, data offset, data size), -1
+        for missing members.
+    """
+    keys: Dict[str, int] = {}
+    positions: Dict[str, Dict[int, List[int]]] = {}
+    for shard_index, index in enumerate(indices):
+        for name, offset, size in index:
+            key, extension = split_member_name(name)
+            if not extension:
+                continue
+            row = keys.setdefault(key, len(keys))
+            positions.setdefault(extension, {})[row] = [shard_index, offset, size]
+    members = {}
+    for extension, extension_positions in positions.items():
+        members[extension] = np.full((len(keys), 3), -1, dtype=np.int64)
+        members[extension][list(extension_positions)] = list(
+            extension_positions.values()
+        )
+    return list(keys), members
+
+
+@datasource(".tar")
+class WebDatasetDataSource(PandasDataSource):
+    """
+    access WebDataset tar shards as table data
+
+    Shards are indexed once, the index is stored next to each shard. Samples
+    form the table's rows, their files' extensions the columns. Integer, text
+    and JSON sidecars are read into the table at once, media and `.npy` files
+    are only read per cell straight from the shards.
+    """
+
+    _shards: List[Path]
+    _source_name: str
+    # Positions of lazily read files per column as rows of
+    # (shard index, data offset, data size), -1 for missing files.
+    _members: Dict[str, np.ndarray]
+
+    def __init__(self, source: PathType):
+        self._source_name = Path(source).name
+        self._shards = [Path(shard) for shard in expand_shards(str(source))]
+        for shard in self._shards:
+            if not shard.is_file():
+                raise NoTableFileFound(shard)
+        with ThreadPoolExecutor() as executor:
+            indices = list(executor.map(load_shard_index, self._shards))
+        keys, positions = _collect_members(indices)
+
+        df = pd.DataFrame({"key": keys})
+        self._members = {}
+        for extension, members in positions.items():
+            if extension == "json":
+                df = df.join(self._read_json_column(members, extension))
+            elif extension in INT_EXTENSIONS + TEXT_EXTENSIONS:
+                df[extension] = self._read_sidecar_column(members, extension)
+            elif extension == "npy" or _get_media_type(extension) is not None:
+                self._members[extension] = members
+                df[extension] = self._read_member_names(members, extension, keys)
+            else:
+                logger.info(f"Skipping files with unknown extension '{extension}'.")
+        super().__init__(df)
+        self._uid = sha1(
+            ":".join(str(shard.absolute()) for shard in self._shards).encode("utf-8")
+        ).hexdigest()
+
+    def guess_dtypes(self) -> ColumnTypeMapping:
+        dtypes = super().guess_dtypes()
+        for extension in self._members:
+            if extension == "npy":
+                dtypes[extension] = np.ndarray
+            else:
+                media_type = _get_media_type(extension)
+                if media_type is not None:
+                    dtypes[extension] = media_type
+        return dtypes
+
+    def get_name(self) -> str:
+        return self._source_name
+
+    def get_fingerprint(self) -> str:
+        if self._generation_id != 0:
+            return super().get_fingerprint()
+        fingerprints = ":".join(file_fingerprint(shard) for shard in self._shards)
+        return sha1(fingerprints.encode("utf-8")).hexdigest()
+
+    def get_cell_data(
+        self, column_name: str, row_index: int, dtype: Type[ColumnType]
+    ) -> Any:
+        """
+        Return the value of a single cell, warn if not possible.
+        """
+        if column_name not in self._members:
+            return super().get_cell_data(column_name, row_index, dtype)
+        self._assert_index_exists(row_index)
+        shard_index, offset, size = self._members[column_name][row_index]
+        if shard_index < 0:
+            return None
+        with open(self._shards[shard_index], "rb") as file:
+            data = read_member(file, int(offset), int(size))
+        if column_name == "npy":
+            return decode_cell_value(np.load(io.BytesIO(data)), column_name, dtype)
+        if dtype in (Audio, Image, Video):
+            return read_in_memory_value(data, cast(Type[FileBasedColumnType], dtype))
+        return decode_cell_value(data, column_name, dtype)
+
+    def _read_member_names(
+        self, members: np.ndarray, extension: str, keys: List[str]
+    ) -> np.ndarray:
+        names = np.array([f"{key}.{extension}" for key in keys], dtype=object)
+        names[members[:, 0] < 0] = None
+        return names
+
+    def _read_column_data(self, members: np.ndarray) -> List[Optional[bytes]]:
+        """
+        Read all files of a column, shard by shard.
+        """
+        data: List[Optional[bytes]] = [None] * len(members)
+        for shard_index, shard in enumerate(self._shards):
+            rows = np.nonzero(members[:, 0] == shard_index)[0]
+            if len(rows) == 0:
+                continue
+            positions = [(int(offset), int(size)) for _, offset, size in members[rows]]
+            for row, row_data in zip(rows, read_members(shard, positions)):
+                data[row] = row_data
+        return data
+
+    def _read_sidecar_column(self, members: np.ndarray, extension: str) -> pd.Series:
+        data = self._read_column_data(members)
+        if extension in INT_EXTENSIONS:
+            values = [None if x is None else _decode_int(x) for x in data]
+            if all(value is None or isinstance(value, int) for value in values):
+                # Integers, or floats if some are missing.
+                return pd.Series(values, dtype=float if None in values else int)
+            return pd.Series(values, dtype=object)
+        return pd.Series([None if x is None else x.decode("utf-8") for x in data])
+
+    def _read_json_column(self, members: np.ndarray, extension: str) -> pd.DataFrame:
+        """
+        Read JSON sidecars, expand top-level fields of objects into columns.
+        """
+        values = [
+            None if x is None else json.loads(x)
+            for x in self._read_column_data(members)
+        ]
+        if all(value is None or isinstance(value, dict) for value in values):
+            df = pd.DataFrame.from_records([value or {} for value in values])
+            return df.add_prefix(f"{extension}.")
+        return pd.DataFrame({extension: pd.Series(values, dtype=object)})
@@ -17,9 +17,15 @@ export const pcaNormalizations = ['none', 'standardize', 'robust standardize'] a
 
 export type PCANormalization = typeof pcaNormalizations[number];
 
+// Rows above which reductions are fitted on a sample or approximated.
+export const REDUCTION_SAMPLE_SIZE = 100000;
+
+export type ReductionMode = 'full' | 'sample' | 'randomized';
+
 interface ReductionResult {
     points: [number, number][];
     indices: IndexArray;
+    mode: ReductionMode;
 }
 
 const MAX_QUEUED_MESSAGES = 16;
@@ -106,7 +112,9 @@ export class DataService {
         indices: IndexArray,
         n_neighbors: number,
         metric: UmapMetric,
-        min_dist: number
+        min_dist: number,
+        onProgress?: (result: ReductionResult) => void,
+        sampleSize: number = REDUCTION_SAMPLE_SIZE
     ): Promise<ReductionResult> {
         const messageId = uuidv4();
 
@@ -116,7 +124,13 @@ export class DataService {
                 const result = {
                     points: message.data.points,
                     indices: message.data.indices,
+                    mode: message.data.mode,
                 };
+                if (message.type === 'umap_progress') {
+                    onProgress?.(result);
+                    return;
+                }
+                this.dispatchTable.delete(messageId);
                 resolve(result);
             });
         });
@@ -132,6 +146,7 @@ export class DataService {
                 n_neighbors: n_neighbors,
                 metric: metric,
                 min_dist: min_dist,
+                sample_size: sampleSize,
             },
         });
 
@@ -142,7 +157,8 @@ export class DataService {
         widgetId: string,
         columnNames: string[],
         indices: IndexArray,
-        pcaNormalization: PCANormalization
+        pcaNormalization: PCANormalization,
+        sampleSize: number = REDUCTION_SAMPLE_SIZE
     ): Promise<ReductionResult> {
         const messageId = uuidv4();
 
@@ -152,6 +168,7 @@ export class DataService {
                 const result = {
                     points: message.data.points,
                     indices: message.data.indices,
+                    mode: message.data.mode,
                 };
                 resolve(result);
             });
@@ -166,6 +183,7 @@ export class DataService {
                 indices: Array.from(indices),
                 columns: columnNames,
                 normalization: pcaNormalization,
+                sample_size: sampleSize,
             },
         });
 
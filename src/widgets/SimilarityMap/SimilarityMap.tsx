@@ -318,6 +318,7 @@ const SimilarityMap: Widget = () => {
 
         setIsComputing(true);
 
+        let cancelled = false;
         const reductionPromise =
             reductionMethod === 'umap'
                 ? dataService.computeUmap(
@@ -326,7 +327,13 @@ const SimilarityMap: Widget = () => {
                       indices,
                       umapNNeighbors,
                       umapMetric ?? 'euclidean',
-                      umapMinDist
+                      umapMinDist,
+                      ({ points, indices }) => {
+                          // Show intermediate layouts while U-Map is computed.
+                          if (cancelled) return;
+                          setVisibleIndices(indices);
+                          setPositions(points);
+                      }
                   )
                 : dataService.computePCA(
                       widgetId,
@@ -335,7 +342,6 @@ const SimilarityMap: Widget = () => {
                       pcaNormalization ?? 'none'
                   );
 
-        let cancelled = false;
         reductionPromise.then(({ points, indices }) => {
             if (cancelled) return;
             setVisibleIndices(indices);
@@ -2,6 +2,7 @@
 Helper methods for tests
 """
 import tempfile
+from pathlib import Path
 from typing import Iterator, Tuple
 from urllib.parse import urljoin
 
@@ -10,7 +11,12 @@ from fastapi.testclient import TestClient
 import pandas as pd
 
 from renumics import spotlight
+from renumics.spotlight import appdirs
 from renumics.spotlight.backend import create_datasource
+from renumics.spotlight.backend import data_source
+from renumics.spotlight.backend.tasks import reduction
+from renumics.spotlight.cache import Cache
+from renumics.spotlight_plugins.core import pandas_data_source
 
 
 BASE_URL = "https://spotlightpublic.blob.core.windows.net/internal-test-data/"
@@ -130,3 +136,16 @@ def testclient() -> TestClient:
     app = SpotlightApp()
     app._data_source = create_datasource("build/datasets/tallymarks_dataset.h5")
     return TestClient(app)
+
+
+@pytest.fixture()
+def cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """point the backend caches to a temporary directory"""
+    path = tmp_path / "cache"
+    monkeypatch.setattr(appdirs, "cache_dir", path)
+    for module in (data_source, reduction, pandas_data_source):
+        for name, value in list(vars(module).items()):
+            if isinstance(value, Cache):
+                # pylint: disable=protected-access
+                monkeypatch.setattr(module, name, Cache(value._dir.name))
+    return path
@@ -0,0 +1,131 @@
+"""
+Tests for the Parquet and Feather data sources
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import pytest
+
+from renumics.spotlight.dtypes import Category, Embedding, Window
+from renumics.spotlight.backend import create_datasource
+from renumics.spotlight_plugins.core import arrow_data_source
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_read_columns(tmp_path: Path, suffix: str) -> None:
+    """
+    Dtypes are guessed from the schema and partially read columns match the
+    full ones.
+    """
+    df = pd.DataFrame(
+        {
+            "int": np.arange(100),
+            "float": np.arange(100) / 2,
+            "str": [f"row {i}" for i in range(100)],
+            "category": pd.Categorical(["a", "b", None, "b"] * 25),
+        }
+    )
+    table = pa.Table.from_pandas(df)
+    embeddings = np.random.rand(100, 4).astype(np.float32)
+    table = table.append_column(
+        "embedding", pa.array(list(embeddings), type=pa.list_(pa.float32(), 4))
+    )
+    table = table.append_column(
+        "window", pa.array([[i, i + 1] for i in range(100)], pa.list_(pa.int64(), 2))
+    )
+    table_path = tmp_path / f"table{suffix}"
+    if suffix == ".parquet":
+        pq.write_table(table, table_path, row_group_size=30)
+    else:
+        feather.write_feather(table, table_path)
+
+    data_source = create_datasource(table_path)
+    assert len(data_source) == 100
+    dtypes = data_source.guess_dtypes()
+    assert dtypes == {
+        "int": int,
+        "float": float,
+        "str": str,
+        "category": Category,
+        "embedding": Embedding,
+        "window": Window,
+    }
+
+    indices = [95, 3, 31, 3, 0]
+    for column_name, dtype in dtypes.items():
+        column = data_source.get_column(column_name, dtype)
+        partial_column = data_source.get_column(column_name, dtype, indices)
+        assert np.array_equal(
+            np.stack(partial_column.values)
+            if dtype is Embedding
+            else partial_column.values,
+            np.stack(column.values[indices])
+            if dtype is Embedding
+            else column.values[indices],
+        )
+    assert data_source.get_column("category", Category).categories == {"a": 0, "b": 1}
+    assert np.array_equal(
+        np.stack(data_source.get_column("embedding", Embedding).values), embeddings
+    )
+    assert data_source.get_cell_data("str", -1, str) == "row 99"
+    assert data_source.get_cell_data("category", 2, Category) == -1
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_read_rows_across_chunks(tmp_path: Path, suffix: str) -> None:
+    """
+    Rows are read from the right row groups or record batches, also for
+    negative indices and for subsets with `NA`s only.
+    """
+    embeddings = [None if i % 3 == 0 else [i, i + 1.0, i + 2.0] for i in range(100)]
+    table = pa.table(
+        {
+            "int": pa.array([None if i == 77 else i for i in range(100)]),
+            "embedding": pa.array(embeddings, type=pa.list_(pa.float64())),
+        }
+    )
+    table_path = tmp_path / f"table{suffix}"
+    if suffix == ".parquet":
+        pq.write_table(table, table_path, row_group_size=30)
+    else:
+        feather.write_feather(table, table_path, chunksize=30)
+
+    data_source = create_datasource(table_path)
+    dtypes = data_source.guess_dtypes()
+    assert dtypes == {"int": float, "embedding": Embedding}
+
+    column = data_source.get_column("int", float, [-1, -30, 29, 30, -100])
+    assert column.values.tolist() == [99.0, 70.0, 29.0, 30.0, 0.0]
+    assert data_source.get_cell_data("int", -71, float) == 29.0
+
+    column = data_source.get_column("embedding", Embedding, [0, 3, -1])
+    assert column.values.tolist() == [None, None, None]
+    column = data_source.get_column("embedding", Embedding, [-2, 0])
+    assert np.array_equal(column.values[0], [98.0, 99.0, 100.0])
+    assert column.values[1] is None
+
+
+def test_prepared_columns_cache(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Prepared columns are bounded like those of the pandas data source, row
+    counts of Feather files are read from the file's metadata.
+    """
+    monkeypatch.setattr(arrow_data_source, "PREPARED_COLUMNS_CACHE_SIZE", 2)
+    table = pa.table({name: list(range(100)) for name in "abc"})
+    table_path = tmp_path / "table.feather"
+    feather.write_feather(table, table_path, chunksize=30)
+    assert arrow_data_source.read_ipc_batch_lengths(table_path) == [30, 30, 30, 10]
+
+    data_source = create_datasource(table_path)
+    assert len(data_source) == 100
+    for column_name in "abca":
+        data_source.get_column(column_name, int)
+    # pylint: disable=protected-access
+    assert [key[0] for key in data_source._prepared_columns] == ["c", "a"]
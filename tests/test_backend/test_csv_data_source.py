@@ -0,0 +1,53 @@
+"""
+Tests for the cached CSV data source
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from renumics.spotlight import backend
+from renumics.spotlight.backend import create_datasource
+from renumics.spotlight_plugins.core import csv_data_source
+from renumics.spotlight_plugins.core.pandas_data_source import PandasDataSource
+
+
+def test_csv_cache_is_opt_in() -> None:
+    """
+    CSV files are read with `pandas` unless the Arrow cache is enabled.
+    """
+    assert backend.data_sources[".csv"] is PandasDataSource
+
+
+def test_read_csv_through_cache(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    CSV files are converted once in blocks, columns widened as needed, and
+    converted again after changes.
+    """
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setitem(backend.data_sources, ".csv", csv_data_source.CsvDataSource)
+    monkeypatch.setattr(csv_data_source, "CACHE_DIR", cache_dir)
+    monkeypatch.setattr(csv_data_source, "CSV_BLOCK_SIZE", 64)
+    csv_file = tmp_path / "table.csv"
+    lines = [f"{i},name-{i},{i % 2}" for i in range(50)] + ["0.5,last,x"]
+    csv_file.write_text("\n".join(["number,name,flag"] + lines) + "\n")
+
+    data_source = create_datasource(csv_file)
+    assert isinstance(data_source, csv_data_source.CsvDataSource)
+    assert len(data_source) == 51
+    assert data_source.guess_dtypes() == {"number": float, "name": str, "flag": str}
+    numbers = data_source.get_column("number", float, indices=[1, 50]).values
+    assert np.array_equal(numbers, [1.0, 0.5])
+    (cache_file,) = cache_dir.glob("*.arrow")
+
+    create_datasource(csv_file)
+    assert list(cache_dir.glob("*.arrow")) == [cache_file]
+
+    generation_id = data_source.get_generation_id()
+    csv_file.write_text("number,name\n1,a\n2,b\n")
+    assert data_source.get_generation_id() != generation_id
+    assert data_source.get_column("number", int).values.tolist() == [1, 2]
+    assert cache_file not in list(cache_dir.glob("*.arrow"))
@@ -0,0 +1,90 @@
+"""
+Tests for attaching embedding files to data sources
+"""
+
+import pickle
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from renumics import spotlight
+from renumics.spotlight.backend import create_datasource
+from renumics.spotlight.backend.exceptions import InvalidEmbeddingFile
+from renumics.spotlight_plugins.core.embeddings_data_source import (
+    EmbeddingsDataSource,
+)
+
+
+def test_attach_embedding_file(tmp_path: Path) -> None:
+    """
+    Embedding files are shown as embedding columns without copying them into
+    the table.
+    """
+    embeddings = np.arange(12, dtype=np.float32).reshape(4, 3)
+    embeddings[2] = np.nan
+    np.save(tmp_path / "clip.npy", embeddings)
+    df = pd.DataFrame({"label": ["a", "b", "c", "d"]})
+
+    data_source = EmbeddingsDataSource(
+        create_datasource(df), {"clip": tmp_path / "clip.npy"}
+    )
+    assert data_source.column_names == ["label", "clip"]
+    assert data_source.guess_dtypes()["clip"] is spotlight.Embedding
+    column = data_source.get_column("clip", spotlight.Embedding, indices=[3, 2])
+    assert column.embedding_length == 3
+    assert np.array_equal(column.values[0], embeddings[3])
+    assert column.values[1] is None
+    assert data_source.get_cell_data("clip", 2, spotlight.Embedding) is None
+    assert data_source.get_column("label", str).values.tolist() == list("abcd")
+
+    unpickled_data_source = pickle.loads(pickle.dumps(data_source))
+    assert np.array_equal(
+        unpickled_data_source.get_column("clip", spotlight.Embedding).values[1],
+        embeddings[1],
+    )
+
+    np.save(tmp_path / "short.npy", embeddings[:3])
+    with pytest.raises(InvalidEmbeddingFile):
+        EmbeddingsDataSource(create_datasource(df), {"clip": tmp_path / "short.npy"})
+
+
+def test_embedding_rows_are_memory_mapped(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    The `NA` mask is computed once per embedding file, rows are views into the
+    memory-mapped file.
+    """
+    embeddings = np.arange(12, dtype=np.float32).reshape(4, 3)
+    embeddings[2] = np.nan
+    np.save(tmp_path / "clip.npy", embeddings)
+    data_source = EmbeddingsDataSource(
+        create_datasource(pd.DataFrame({"label": list("abcd")})),
+        {"clip": tmp_path / "clip.npy"},
+    )
+
+    isnan_calls = []
+    isnan = np.isnan
+
+    def counting_isnan(*args: Any, **kwargs: Any) -> Any:
+        isnan_calls.append(args)
+        return isnan(*args, **kwargs)
+
+    monkeypatch.setattr(np, "isnan", counting_isnan)
+    for _ in range(3):
+        column = data_source.get_column("clip", spotlight.Embedding, indices=[-1, 2])
+    assert len(isnan_calls) == 1
+    assert np.array_equal(column.values[0], embeddings[3])
+    assert isinstance(column.values[0].base, np.memmap)
+    assert column.values[1] is None
+
+    # A changed file is analyzed anew.
+    np.save(tmp_path / "clip.npy", np.zeros((4, 5), dtype=np.float32))
+    data_source.get_generation_id()
+    column = data_source.get_column("clip", spotlight.Embedding)
+    assert len(isnan_calls) == 2
+    assert column.embedding_length == 5
+    assert all(value is not None for value in column.values)
@@ -0,0 +1,58 @@
+"""
+Tests for the H5 data source
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from renumics import spotlight
+from renumics.spotlight.dtypes import Category, Embedding
+from renumics.spotlight.backend import create_datasource
+
+
+def test_generation_id_follows_file_changes(tmp_path: Path) -> None:
+    """
+    The cached generation ID is revalidated once the dataset file changes.
+    """
+    dataset_path = tmp_path / "dataset.h5"
+    with spotlight.Dataset(dataset_path, "w") as dataset:
+        dataset.append_int_column("int", [1, 2, 3])
+
+    data_source = create_datasource(dataset_path)
+    generation_id = data_source.get_generation_id()
+    assert data_source.get_generation_id() == generation_id
+
+    with spotlight.Dataset(dataset_path, "a") as dataset:
+        dataset.append_float_column("float", [1.0, 2.0, 3.0])
+
+    assert data_source.get_generation_id() != generation_id
+    data_source.check_generation_id(data_source.get_generation_id())
+
+
+def test_get_matrix(tmp_path: Path) -> None:
+    """
+    Numeric, embedding and category columns are fetched as one matrix, rows
+    with missing values are masked.
+    """
+    dataset_path = tmp_path / "dataset.h5"
+    with spotlight.Dataset(dataset_path, "w") as dataset:
+        dataset.append_float_column("float", [1.0, 2.0, np.nan, 4.0])
+        dataset.append_embedding_column(
+            "embedding", [[1, 2], None, [5, 6], [7, 8]], optional=True
+        )
+        dataset.append_categorical_column(
+            "category", ["a", "b", "a", None], optional=True
+        )
+
+    data_source = create_datasource(dataset_path)
+    columns = {"float": float, "embedding": Embedding, "category": Category}
+    matrix, mask = data_source.get_matrix(columns)
+    assert matrix.dtype == np.float32
+    assert matrix.shape == (4, 5)
+    assert mask.tolist() == [True, False, False, False]
+    assert matrix[0, :3].tolist() == [1, 1, 2]
+    assert sorted(matrix[0, 3:].tolist()) == [0, 1]
+    matrix, mask = data_source.get_matrix({"embedding": Embedding}, [2, 3])
+    assert matrix.tolist() == [[5, 6], [7, 8]]
+    assert mask.all()
@@ -0,0 +1,64 @@
+"""
+Tests for the Hugging Face data source
+"""
+
+import datasets
+import numpy as np
+
+from renumics.spotlight.dtypes import Category, Embedding, Image
+from renumics.spotlight.backend import create_datasource
+
+
+def test_read_columns() -> None:
+    """
+    Dtypes follow the dataset's features, images are only decoded per cell.
+    """
+    with open("data/images/nature-360p.png", "rb") as file:
+        image_bytes = file.read()
+    features = datasets.Features(
+        {
+            "int": datasets.Value("int32"),
+            "image": datasets.Image(),
+            "label": datasets.ClassLabel(names=["cat", "dog"]),
+            "embedding": datasets.Sequence(datasets.Value("float32"), length=3),
+        }
+    )
+    dataset = datasets.Dataset.from_dict(
+        {
+            "int": [0, 1, 2],
+            "image": [
+                "data/images/nature-360p.jpg",
+                {"bytes": image_bytes, "path": None},
+                None,
+            ],
+            "label": [1, -1, 0],
+            "embedding": [[0.0, 1.0, 2.0]] * 3,
+        },
+        features=features,
+    ).select([2, 0, 1])
+
+    data_source = create_datasource(dataset)
+    dtypes = data_source.guess_dtypes()
+    assert dtypes == {
+        "int": int,
+        "image": Image,
+        "label": Category,
+        "embedding": Embedding,
+    }
+    assert data_source.get_column("int", int).values.tolist() == [2, 0, 1]
+    assert data_source.get_column("image", Image).values.tolist() == [
+        None,
+        "data/images/nature-360p.jpg",
+        "<in-memory>",
+    ]
+    label_column = data_source.get_column("label", Category, [0, 2])
+    assert label_column.categories == {"cat": 0, "dog": 1}
+    assert label_column.values.tolist() == [0, -1]
+    assert data_source.get_column("embedding", Embedding).embedding_length == 3
+
+    assert data_source.get_cell_data("image", 0, Image) is None
+    assert data_source.get_cell_data("image", 2, Image).tolist() == image_bytes
+    assert data_source.get_cell_data("label", 1, Category) == 1
+    assert np.array_equal(
+        data_source.get_cell_data("embedding", 0, Embedding), [0.0, 1.0, 2.0]
+    )
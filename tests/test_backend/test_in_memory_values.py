@@ -0,0 +1,96 @@
+"""
+Tests for preparing in-memory media values for browsers
+"""
+
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+
+from renumics import spotlight
+from renumics.spotlight.backend.data_source import (
+    is_browser_compatible_audio,
+    is_browser_compatible_image,
+    read_in_memory_value,
+)
+from renumics.spotlight.cache import Cache
+
+
+@pytest.mark.parametrize(
+    "filename, compatible",
+    [
+        ("nature-360p.png", True),
+        ("nature-360p.jpg", True),
+        ("nature-360p.webp", True),
+        ("nature-360p.tif", False),
+    ],
+)
+def test_is_browser_compatible_image(filename: str, compatible: bool) -> None:
+    """
+    Images are recognized by their content.
+    """
+    blob = Path("data/images", filename).read_bytes()
+    assert is_browser_compatible_image(blob) is compatible
+
+
+def test_is_browser_compatible_audio() -> None:
+    """
+    Audio is compatible by its format or codec.
+    """
+    assert is_browser_compatible_audio("wav", "pcm_s16le")
+    assert is_browser_compatible_audio("ogg", "vorbis")
+    assert not is_browser_compatible_audio("aiff", "pcm_s16be")
+
+
+@pytest.mark.usefixtures("cache_dir")
+def test_browser_compatible_values_pass_through(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Browser-compatible images and audio are neither converted nor cached.
+    """
+    monkeypatch.setattr(Cache, "__setitem__", _fail_on_call)
+    monkeypatch.setattr(spotlight.Image, "from_bytes", _fail_on_call)
+    monkeypatch.setattr(spotlight.Audio, "from_bytes", _fail_on_call)
+
+    image_blob = Path("data/images/nature-360p.png").read_bytes()
+    assert read_in_memory_value(image_blob, spotlight.Image).tobytes() == image_blob
+    audio_blob = Path("data/audio/1.wav").read_bytes()
+    assert read_in_memory_value(audio_blob, spotlight.Audio).tobytes() == audio_blob
+
+
+@pytest.mark.usefixtures("cache_dir")
+@pytest.mark.parametrize(
+    "path, column_type",
+    [
+        ("data/images/nature-360p.tif", spotlight.Image),
+        ("data/audio/mono/gs-16b-1c-44100hz.aiff", spotlight.Audio),
+    ],
+)
+def test_other_values_are_converted_once(
+    path: str, column_type: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Other media is converted and cached by its content, a second read hits
+    the cache.
+    """
+    conversions: List[bytes] = []
+    from_bytes = column_type.from_bytes
+
+    def counting_from_bytes(blob: bytes) -> Any:
+        conversions.append(blob)
+        return from_bytes(blob)
+
+    monkeypatch.setattr(column_type, "from_bytes", counting_from_bytes)
+
+    blob = Path(path).read_bytes()
+    value = read_in_memory_value(blob, column_type)
+    assert value.tobytes() != blob
+    assert read_in_memory_value(blob, column_type).tobytes() == value.tobytes()
+    # The same content is cached regardless of where it comes from.
+    assert read_in_memory_value(bytes(blob), column_type) == value
+    assert len(conversions) == 1
+
+
+def _fail_on_call(*_args: Any, **_kwargs: Any) -> Any:
+    raise AssertionError("Browser-compatible values should be passed as is.")
@@ -0,0 +1,94 @@
+"""
+Tests for the media folder data source
+"""
+
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import pytest
+
+from renumics import spotlight
+from renumics.spotlight.backend import create_datasource
+from renumics.spotlight_plugins.core import media_folder_data_source
+
+
+def test_read_media_folder(tmp_path: Path) -> None:
+    """
+    Files are found recursively, media is served as is and metadata is read
+    in the background.
+    """
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    shutil.copy("data/images/nature-360p.png", tmp_path / "a" / "1.png")
+    shutil.copy("data/images/nature-360p.jpg", tmp_path / "a" / "b" / "2.jpg")
+    shutil.copy("data/audio/1.wav", tmp_path / "3.wav")
+    (tmp_path / "notes.txt").write_text("not a media file")
+
+    data_source = create_datasource(spotlight.MediaFolder(tmp_path))
+    assert data_source.get_column("path", str).values.tolist() == [
+        "3.wav",
+        "a/1.png",
+        "a/b/2.jpg",
+    ]
+    assert data_source.guess_dtypes()["path"] is str
+
+    data_source = create_datasource(spotlight.MediaFolder(tmp_path, "a/*"))
+    dtypes = data_source.guess_dtypes()
+    assert dtypes == {
+        "path": spotlight.Image,
+        "size": int,
+        "mtime": datetime,
+        "width": float,
+        "height": float,
+    }
+    assert data_source.get_column("size", int).values.tolist() == [
+        (tmp_path / "a" / "1.png").stat().st_size,
+        (tmp_path / "a" / "b" / "2.jpg").stat().st_size,
+    ]
+    image = data_source.get_cell_data("path", 0, spotlight.Image)
+    assert image.tolist() == (tmp_path / "a" / "1.png").read_bytes()
+
+    for _ in range(100):
+        if data_source.get_generation_id() > 0:
+            break
+        time.sleep(0.1)
+    assert np.array_equal(data_source.get_column("width", float).values, [640, 640])
+
+
+def test_media_folder_fills_progressively(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Metadata is published chunk by chunk, each chunk changes the generation ID.
+    """
+    for i in range(3):
+        shutil.copy("data/images/nature-360p.png", tmp_path / f"{i}.png")
+    monkeypatch.setattr(media_folder_data_source, "METADATA_CHUNK_SIZE", 1)
+    monkeypatch.setattr(media_folder_data_source, "METADATA_REFRESH_INTERVAL", 0.0)
+    read_file_metadata = media_folder_data_source.read_file_metadata
+    allowed_reads = threading.Semaphore(0)
+
+    def read_file_metadata_when_allowed(path: Path) -> Tuple[float, float, float]:
+        assert allowed_reads.acquire(timeout=10)
+        return read_file_metadata(path)
+
+    monkeypatch.setattr(
+        media_folder_data_source, "read_file_metadata", read_file_metadata_when_allowed
+    )
+
+    data_source = create_datasource(spotlight.MediaFolder(tmp_path))
+    generation_id = data_source.get_generation_id()
+    for filled_rows in range(1, 4):
+        allowed_reads.release()
+        for _ in range(100):
+            if data_source.get_generation_id() > generation_id:
+                break
+            time.sleep(0.01)
+        assert data_source.get_generation_id() > generation_id
+        generation_id = data_source.get_generation_id()
+        widths = data_source.get_column("width", float).values
+        assert np.isnan(widths).sum() == 3 - filled_rows
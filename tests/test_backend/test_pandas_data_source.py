@@ -0,0 +1,111 @@
+"""
+Tests for the pandas data source
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from renumics.spotlight.backend import create_datasource
+from renumics.spotlight_plugins.core import pandas_data_source
+
+
+def test_prepared_columns_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Prepared columns of stale generations and beyond the cache size are
+    dropped, least recently used first.
+    """
+    monkeypatch.setattr(pandas_data_source, "PREPARED_COLUMNS_CACHE_SIZE", 2)
+    data_source = create_datasource(pd.DataFrame({"a": [1], "b": [2], "c": [3]}))
+    assert isinstance(data_source, pandas_data_source.PandasDataSource)
+    data_source.get_column("a", int)
+    data_source.get_column("b", int)
+    data_source.get_column("a", int)
+    data_source.get_column("c", int)
+    # pylint: disable=protected-access
+    assert [key[0] for key in data_source._prepared_columns] == ["a", "c"]
+    data_source._generation_id += 1
+    data_source.get_column("b", int)
+    assert list(data_source._prepared_columns) == [("b", int, False, 1)]
+
+
+def test_source_dataframe_changes() -> None:
+    """
+    Changing the columns of the given `DataFrame` does not change the served
+    table.
+    """
+    df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]})
+    data_source = create_datasource(df)
+    df["a"] = [4, 5, 6]
+    df["c"] = 0.0
+    del df["b"]
+    assert data_source.column_names == ["a", "b"]
+    assert data_source.get_column("a", int).values.tolist() == [1, 2, 3]
+    assert data_source.get_column("b", str).values.tolist() == ["x", "y", "z"]
+
+
+def test_get_embeddings() -> None:
+    """
+    Embeddings are stacked into a contiguous read-only `float32` matrix once
+    per generation, `NA` rows are masked and filled with `NaN`s.
+    """
+    df = pd.DataFrame(
+        {
+            "label": [0, 1, 2],
+            "embedding": [np.array([1.0, 2.0]), None, [3, 4]],
+        }
+    )
+    data_source = create_datasource(df)
+    assert isinstance(data_source, pandas_data_source.PandasDataSource)
+    embeddings, na_mask = data_source.get_embeddings("embedding")
+    assert embeddings.dtype == np.float32
+    assert embeddings.flags.c_contiguous and not embeddings.flags.writeable
+    assert na_mask.tolist() == [False, True, False]
+    assert np.array_equal(embeddings, [[1, 2], [np.nan, np.nan], [3, 4]], True)
+
+    cached_embeddings, cached_na_mask = data_source.get_embeddings("embedding")
+    assert cached_embeddings is embeddings and cached_na_mask is na_mask
+
+    # pylint: disable=protected-access
+    data_source._generation_id += 1
+    new_embeddings, _ = data_source.get_embeddings("embedding")
+    assert new_embeddings is not embeddings
+    assert np.array_equal(new_embeddings, embeddings, True)
+
+    with pytest.raises(ValueError, match="unaligned sequences"):
+        pandas_data_source.embeddings_from_series(
+            pd.Series([[1, 2], [1, 2, 3]]), "embedding"
+        )
+
+
+def test_get_column_from_threads(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Columns and embeddings can be read from several threads at once, while
+    cached values are evicted.
+    """
+    monkeypatch.setattr(pandas_data_source, "PREPARED_COLUMNS_CACHE_SIZE", 2)
+    monkeypatch.setattr(pandas_data_source, "EMBEDDINGS_CACHE_SIZE", 1)
+    df = pd.DataFrame({f"column {i}": np.arange(100) * i for i in range(8)})
+    for i in range(2):
+        df[f"embedding {i}"] = list(np.random.rand(100, 4) + i)
+    data_source = create_datasource(df)
+    assert isinstance(data_source, pandas_data_source.PandasDataSource)
+
+    def read(i: int) -> None:
+        column_name = f"column {i % 8}"
+        column = data_source.get_column(column_name, int, [1, 2])
+        assert column.values.tolist() == [i % 8, 2 * (i % 8)]
+        embeddings, na_mask = data_source.get_embeddings(f"embedding {i % 2}")
+        assert embeddings.shape == (100, 4) and not na_mask.any()
+
+    switch_interval = sys.getswitchinterval()
+    # Switch threads often to provoke races.
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(read, range(2000)))
+    finally:
+        sys.setswitchinterval(switch_interval)
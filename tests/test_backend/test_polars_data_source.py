@@ -0,0 +1,57 @@
+"""
+Tests for the Polars data source
+"""
+
+import numpy as np
+import polars as pl
+import pytest
+
+from renumics.spotlight.dtypes import Category, Embedding, Sequence1D, Window
+from renumics.spotlight.backend import create_datasource
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_read_columns(lazy: bool) -> None:
+    """
+    Dtypes are guessed from the schema and list lengths, partially read columns
+    match the full ones.
+    """
+    df = pl.DataFrame(
+        {
+            "int": list(range(10)),
+            "str": [f"row {i}" for i in range(10)],
+            "category": pl.Series(["a", "b"] * 5, dtype=pl.Categorical),
+            "embedding": pl.Series(
+                [[0.0, 1.0, 2.0]] * 9 + [None], dtype=pl.List(pl.Float32)
+            ),
+            "window": [[i, i + 1] for i in range(10)],
+            "sequence": [[0.0] * (i + 1) for i in range(10)],
+        }
+    )
+    data_source = create_datasource(df.lazy() if lazy else df)
+    assert len(data_source) == 10
+    dtypes = data_source.guess_dtypes()
+    assert dtypes == {
+        "int": int,
+        "str": str,
+        "category": Category,
+        "embedding": Embedding,
+        "window": Window,
+        "sequence": Sequence1D,
+    }
+
+    indices = [9, 3, 3, 0]
+    for column_name in ("int", "str", "category", "window"):
+        column = data_source.get_column(column_name, dtypes[column_name])
+        partial_column = data_source.get_column(
+            column_name, dtypes[column_name], indices
+        )
+        assert np.array_equal(partial_column.values, column.values[indices])
+    assert data_source.get_column("category", Category).categories == {"a": 0, "b": 1}
+
+    embedding_column = data_source.get_column("embedding", Embedding, indices)
+    assert embedding_column.embedding_length == 3
+    assert embedding_column.values[0] is None
+    assert np.array_equal(embedding_column.values[1], [0.0, 1.0, 2.0])
+    assert data_source.get_cell_data("str", -1, str) == "row 9"
+    assert data_source.get_cell_data("category", 1, Category) == 1
@@ -0,0 +1,193 @@
+"""
+Tests for dimensionality reduction tasks
+"""
+
+import collections
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pytest
+from umap import umap_
+
+from renumics.spotlight.dtypes import Embedding
+from renumics.spotlight.backend import create_datasource
+from renumics.spotlight.backend.tasks import reduction
+from renumics.spotlight.backend.tasks.reduction import (
+    compute_pca,
+    compute_umap,
+    get_knn_graph,
+    prepare_data,
+    stratified_sample,
+)
+from renumics.spotlight.backend.tasks.shared_array import SharedArray
+
+pytestmark = pytest.mark.usefixtures("cache_dir")
+
+
+def test_stratified_sample() -> None:
+    """
+    Samples are unique and spread over all rows.
+    """
+    sample = stratified_sample(1000, 10)
+    assert len(np.unique(sample)) == 10
+    assert np.all(sample // 100 == np.arange(10))
+
+
+def test_prepare_data() -> None:
+    """
+    Rows with missing values are skipped, non-embeddable columns give no data.
+    """
+    embeddings = np.random.rand(10, 4)
+    embeddings[3] = np.nan
+    data_source = create_datasource(
+        pd.DataFrame({"embedding": list(embeddings), "text": ["a"] * 10})
+    )
+    dtypes = {"embedding": Embedding, "text": str}
+    data, indices = prepare_data(data_source, dtypes, ["embedding"], [1, 2, 3, 4])
+    assert np.allclose(data, embeddings[[1, 2, 4]])
+    assert indices == [1, 2, 4]
+    data, indices = prepare_data(data_source, dtypes, ["text"], [1, 2, 3, 4])
+    assert data.size == 0
+    assert not indices
+
+
+def test_shared_array() -> None:
+    """
+    Shared arrays hold a copy of the original array.
+    """
+    array = np.random.rand(10, 4)
+    shared_array = SharedArray.create(array)
+    try:
+        with shared_array.open() as shared:
+            assert np.array_equal(shared, array)
+    finally:
+        shared_array.unlink()
+    shared_array.unlink()
+
+
+def test_pca_modes() -> None:
+    """
+    PCA switches to the randomized mode above the sample size.
+    """
+    data = SharedArray.create(np.random.rand(100, 4))
+    try:
+        points, mode = compute_pca(data, "none")
+        assert points.shape == (100, 2)
+        assert mode == "full"
+        assert compute_pca(data, "none", 100)[1] == "full"
+        points, mode = compute_pca(data, "none", 50)
+        assert points.shape == (100, 2)
+        assert mode == "randomized"
+    finally:
+        data.unlink()
+
+
+def test_knn_graph_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    The kNN graph is computed once and sliced for fewer neighbors.
+    """
+    calls = []
+    nearest_neighbors = umap_.nearest_neighbors
+
+    def _nearest_neighbors(
+        data: np.ndarray, n_neighbors: int, *args: Any, **kwargs: Any
+    ) -> Any:
+        calls.append(n_neighbors)
+        return nearest_neighbors(data, n_neighbors, *args, **kwargs)
+
+    monkeypatch.setattr(umap_, "nearest_neighbors", _nearest_neighbors)
+    data = np.random.rand(200, 4).astype(np.float32)
+    knn_indices, knn_dists = get_knn_graph(data, 5, "euclidean")
+    assert knn_indices.shape == knn_dists.shape == (200, 5)
+    assert np.all(knn_indices[:, 0] == np.arange(200))
+    knn_indices, _ = get_knn_graph(data, 10, "euclidean")
+    assert knn_indices.shape == (200, 10)
+    assert len(calls) == 1
+    get_knn_graph(data, 10, "cosine")
+    get_knn_graph(data, 40, "euclidean")
+    assert calls[1:] == [30, 40]
+
+
+@pytest.mark.parametrize("knn_cache_min_rows", [0, 4096])
+def test_umap_appended_rows(
+    monkeypatch: pytest.MonkeyPatch, knn_cache_min_rows: int
+) -> None:
+    """
+    Appended rows are embedded with the fitted reducer up to the threshold,
+    also if it has been fitted on a cached kNN graph.
+    """
+    monkeypatch.setattr(reduction, "KNN_CACHE_MIN_ROWS", knn_cache_min_rows)
+    data = np.random.rand(130, 4).astype(np.float32)
+    reducer_key = f"test:{np.random.rand()}"
+
+    def umap(rows: int) -> np.ndarray:
+        shared_data = SharedArray.create(data[:rows])
+        try:
+            points, _ = compute_umap(
+                shared_data, 15, "euclidean", 0.1, None, reducer_key, 0.2
+            )
+            return points
+        finally:
+            shared_data.unlink()
+
+    points = umap(100)
+    updated_points = umap(110)
+    assert np.array_equal(updated_points[:100], points)
+    updated_points = umap(120)
+    assert np.array_equal(updated_points[:100], points)
+    # Too many appended rows, U-Map is fitted anew.
+    refitted_points = umap(130)
+    assert refitted_points.shape == (130, 2)
+    assert not np.array_equal(refitted_points[:100], points)
+
+
+def test_umap_reducer_storage(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Fitted reducers of large tables are only kept in the worker's memory.
+    """
+    monkeypatch.setattr(reduction, "UMAP_REDUCER_CACHE_MAX_ROWS", 10)
+    monkeypatch.setattr(reduction, "_umap_reducers", collections.OrderedDict())
+    small_entry = (None, None, "hash", np.zeros((10, 2)), 10, "full")
+    large_entry = (None, None, "hash", np.zeros((11, 2)), 11, "full")
+    # pylint: disable=protected-access
+    reduction._store_umap_reducer("small", small_entry)
+    reduction._store_umap_reducer("large", large_entry)
+    assert reduction.umap_reducer_cache["small"][4] == 10
+    with pytest.raises(KeyError):
+        reduction.umap_reducer_cache["large"]  # pylint: disable=pointless-statement
+    assert reduction._load_umap_reducer("large") is large_entry
+
+    reduction._umap_reducers.clear()
+    assert reduction._load_umap_reducer("small")[4] == 10
+    assert reduction._load_umap_reducer("large") is None
+
+
+def test_umap_epochs_watched(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    A running U-Map is cancelled through its progress bar, intermediate layouts
+    are only reported with known U-Map versions.
+    """
+    # pylint: disable=import-outside-toplevel, protected-access
+    import umap
+    from umap import layouts
+    from renumics.spotlight.backend.tasks import worker
+    from renumics.spotlight.backend.tasks.exceptions import TaskCancelled
+
+    monkeypatch.setattr(worker, "_cancel_flag", np.array([True]))
+    data = np.random.default_rng(42).random((50, 4), dtype=np.float32)
+    reducer = umap.UMAP(n_neighbors=5, n_epochs=10, random_state=42)
+    with pytest.raises(TaskCancelled):
+        with reduction._watch_umap_epochs(reducer, None, reduction.FULL_MODE):
+            reducer.fit(data)
+    assert reducer.tqdm_kwds is None
+
+    monkeypatch.setattr(worker, "_progress_queue", collections.deque())
+    monkeypatch.setattr(worker, "_progress_id", "umap")
+    monkeypatch.setattr(reduction, "UMAP_WATCHED_VERSIONS", "<0.1")
+    get_epoch_fn = layouts._get_optimize_layout_euclidean_single_epoch_fn
+    with pytest.warns(UserWarning, match="Intermediate U-Map layouts"):
+        with reduction._watch_umap_epochs(reducer, None, reduction.FULL_MODE):
+            assert layouts._get_optimize_layout_euclidean_single_epoch_fn is (
+                get_epoch_fn
+            )
@@ -0,0 +1,82 @@
+"""
+Tests for the cache keys of dimensionality reduction results
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from renumics.spotlight.dtypes import Embedding
+from renumics.spotlight.backend import create_datasource
+from renumics.spotlight.backend.tasks.reduction import (
+    get_reduction_cache_key,
+    get_umap_reducer_key,
+)
+
+pytestmark = pytest.mark.usefixtures("cache_dir")
+
+
+def test_cache_key(tmp_path: Path) -> None:
+    """
+    Keys only match for the same file content, rows and parameters.
+    """
+    df = pd.DataFrame({"embedding": list(np.random.rand(10, 4))})
+    table_path = tmp_path / "table.parquet"
+    df.to_parquet(table_path)
+    dtypes = {"embedding": Embedding}
+
+    def get_key(table_path: Path, indices: list, n_neighbors: int) -> str:
+        data_source = create_datasource(table_path)
+        return get_reduction_cache_key(
+            "umap",
+            data_source,
+            dtypes,
+            ["embedding"],
+            indices,
+            n_neighbors=n_neighbors,
+            metric="euclidean",
+        )
+
+    key = get_key(table_path, list(range(10)), 15)
+    assert get_key(table_path, list(range(10)), 15) == key
+    assert get_key(table_path, list(range(9)), 15) != key
+    assert get_key(table_path, list(range(10)), 20) != key
+
+    df.iloc[:5].to_parquet(table_path)
+    assert get_key(table_path, list(range(10)), 15) != key
+
+
+def test_in_memory_table_fingerprint() -> None:
+    """
+    In-memory tables get a new fingerprint per instance.
+    """
+    df = pd.DataFrame({"value": range(10)})
+    first_data_source = create_datasource(df)
+    second_data_source = create_datasource(df)
+    assert first_data_source.get_fingerprint() == first_data_source.get_fingerprint()
+    assert first_data_source.get_fingerprint() != second_data_source.get_fingerprint()
+
+
+def test_umap_reducer_key(tmp_path: Path) -> None:
+    """
+    The reducer key tracks the row selection, but a selection of all rows
+    still matches after rows are appended.
+    """
+    table_path = tmp_path / "table.parquet"
+    pd.DataFrame({"value": range(10)}).to_parquet(table_path)
+
+    def get_key(indices: list) -> str:
+        data_source = create_datasource(table_path)
+        return get_umap_reducer_key(
+            data_source, data_source.guess_dtypes(), ["value"], indices, n_neighbors=15
+        )
+
+    key = get_key(list(range(10)))
+    assert get_key(list(range(10))) == key
+    assert get_key(list(range(5))) != key
+    assert get_key(list(range(5))) != get_key([*range(5), 9])
+
+    pd.DataFrame({"value": range(15)}).to_parquet(table_path)
+    assert get_key(list(range(15))) == key
@@ -0,0 +1,124 @@
+"""
+Tests for the SQLite and DuckDB data source
+"""
+
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from renumics import spotlight
+from renumics.spotlight.backend import create_datasource
+from renumics.spotlight.backend.exceptions import CouldNotOpenTableFile, NoUniqueTable
+from renumics.spotlight_plugins.core import sql_data_source
+
+
+@pytest.fixture(name="database")
+def fixture_database(tmp_path: Path) -> Path:
+    """
+    SQLite database with a table with gaps in its row IDs and a view.
+    """
+    path = tmp_path / "samples.sqlite"
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE samples (name TEXT, score REAL, label INTEGER)")
+    connection.executemany(
+        "INSERT INTO samples VALUES (?, ?, ?)",
+        [(f"sample-{i}", i / 2, None if i == 4 else i % 3) for i in range(20)],
+    )
+    connection.execute("DELETE FROM samples WHERE rowid % 5 = 2")
+    connection.commit()
+    connection.close()
+    return path
+
+
+def test_read_sql_table(database: Path) -> None:
+    """
+    Rows are selected by row ID, changes to the database are picked up.
+    """
+    data_source = create_datasource(database)
+    assert len(data_source) == 16
+    assert data_source.guess_dtypes() == {"name": str, "score": float, "label": float}
+    names = data_source.get_column("name", str, indices=[5, 0, -1]).values
+    assert names.tolist() == ["sample-7", "sample-0", "sample-19"]
+    assert data_source.get_cell_data("score", 5, float) == 3.5
+    labels = data_source.get_column("label", float).values
+    assert np.isnan(labels[3]) and labels[4] == 2
+
+    generation_id = data_source.get_generation_id()
+    connection = sqlite3.connect(database)
+    connection.execute("INSERT INTO samples VALUES ('sample-20', 10.0, 2)")
+    connection.commit()
+    connection.close()
+    assert data_source.get_generation_id() != generation_id
+    assert len(data_source) == 17
+
+
+def test_read_sql_rows_in_chunks(
+    database: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    Many requested rows are selected by several queries, failing queries raise
+    a problem.
+    """
+    monkeypatch.setattr(sql_data_source, "SELECTION_CHUNK_SIZE", 2)
+    data_source = create_datasource(database)
+    names = data_source.get_column("name", str, indices=[3, 0, -1, 3]).values
+    assert names.tolist() == ["sample-4", "sample-0", "sample-19", "sample-4"]
+
+    connection = sqlite3.connect(database)
+    connection.execute("DROP TABLE samples")
+    connection.commit()
+    connection.close()
+    with pytest.raises(CouldNotOpenTableFile):
+        data_source.get_column("name", str, indices=[0])
+
+
+def test_read_sql_results_in_batches(
+    database: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    SQLite results are converted in batches, negative indices also work when
+    whole columns are read.
+    """
+    monkeypatch.setattr(sql_data_source, "FETCH_BATCH_SIZE", 3)
+    data_source = create_datasource(database)
+    names = data_source.get_column("name", str, indices=list(range(-1, -9, -1)))
+    assert names.values.tolist() == [
+        f"sample-{i}" for i in (19, 18, 17, 15, 14, 13, 12, 10)
+    ]
+    labels = data_source.get_column("label", float).values
+    assert np.isnan(labels[3]) and labels[4] == 2
+
+    connection = sqlite3.connect(database)
+    connection.execute("UPDATE samples SET label = 'none' WHERE rowid = 20")
+    connection.commit()
+    connection.close()
+    data_source = create_datasource(database)
+    labels = data_source.get_column("label", str).values.tolist()
+    assert labels[0] == "0" and labels[-1] == "none"
+
+
+def test_read_sql_query(database: Path) -> None:
+    """
+    Views and queries are read by row position.
+    """
+    connection = sqlite3.connect(database)
+    connection.execute(
+        "CREATE VIEW high_scores AS SELECT * FROM samples WHERE score > 5"
+    )
+    connection.execute("CREATE TABLE notes (text TEXT)")
+    connection.commit()
+    connection.close()
+    with pytest.raises(NoUniqueTable):
+        create_datasource(database)
+
+    data_source = create_datasource(spotlight.SqlTable(database, table="high_scores"))
+    assert data_source.get_column("name", str, indices=[1]).values.tolist() == [
+        "sample-13"
+    ]
+
+    query = "SELECT label, count(*) AS n FROM samples GROUP BY label ORDER BY label"
+    data_source = create_datasource(spotlight.SqlTable(database, query=query))
+    assert data_source.guess_dtypes() == {"label": float, "n": int}
+    assert data_source.get_column("n", int).values.tolist() == [1, 6, 4, 5]
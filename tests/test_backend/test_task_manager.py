@@ -0,0 +1,191 @@
+"""
+Tests for the task manager
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import time
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+
+import pytest
+
+from renumics.spotlight import app as spotlight_app
+from renumics.spotlight.settings import settings
+from renumics.spotlight.backend.tasks import (
+    PRIORITY_BACKGROUND,
+    TaskCancelled,
+    TaskManager,
+    check_cancelled,
+    report_progress,
+)
+
+
+def count(n: int, received: Optional[Any] = None) -> int:
+    """
+    Report each step as progress, wait until the last one is received.
+    """
+    for i in range(n):
+        report_progress(i)
+    if received is not None:
+        # Reports of finished tasks are dropped.
+        assert received.wait(10)
+    return n
+
+
+def wait(seconds: float, started: Optional[Any] = None) -> float:
+    """
+    Wait until the time is over or the task is cancelled.
+    """
+    if started is not None:
+        started.set()
+    start = time.monotonic()
+    while time.monotonic() - start < seconds:
+        check_cancelled()
+        time.sleep(0.01)
+    return seconds
+
+
+def record_warm_up(path: Path) -> None:
+    """
+    Note the warmed up worker.
+    """
+    with path.open("a") as file:
+        file.write(f"{os.getpid()}\n")
+
+
+def test_progress() -> None:
+    """
+    Progress reports reach the callback in order while the task runs.
+    """
+
+    async def run() -> None:
+        task_manager = TaskManager()
+        progress: List[Any] = []
+        with multiprocessing.Manager() as manager:
+            received = manager.Event()
+
+            def on_progress(value: Any) -> None:
+                progress.append(value)
+                if value == 2:
+                    received.set()
+
+            try:
+                result = await task_manager.run_async(
+                    count, (3, received), name="count", on_progress=on_progress
+                )
+                assert result == 3
+                assert progress == [0, 1, 2]
+                # Reports are dropped if nobody listens.
+                assert await task_manager.run_async(count, (3,), name="count") == 3
+            finally:
+                task_manager.shutdown()
+
+    asyncio.run(run())
+
+
+def test_cancel_running_task() -> None:
+    """
+    Running tasks stop when they are cancelled.
+    """
+
+    async def run() -> None:
+        task_manager = TaskManager()
+        with multiprocessing.Manager() as manager:
+            started = manager.Event()
+            try:
+                task = asyncio.create_task(
+                    task_manager.run_async(wait, (60, started), name="wait")
+                )
+                loop = asyncio.get_running_loop()
+                assert await loop.run_in_executor(None, started.wait, 30)
+                start = time.monotonic()
+                task_manager.cancel(name="wait")
+                with pytest.raises(TaskCancelled):
+                    await task
+                assert time.monotonic() - start < 10
+                assert await task_manager.run_async(wait, (0.1,), name="wait") == 0.1
+            finally:
+                task_manager.shutdown()
+
+    asyncio.run(run())
+
+
+def test_priority() -> None:
+    """
+    Queued interactive tasks run before queued background tasks.
+    """
+
+    async def run() -> None:
+        task_manager = TaskManager(workers=1)
+        try:
+            task_manager.create_task(
+                wait, (0.5,), name="running", priority=PRIORITY_BACKGROUND
+            )
+            background = task_manager.create_task(
+                wait, (2,), name="background", priority=PRIORITY_BACKGROUND
+            )
+            stats = task_manager.stats()
+            assert stats.workers == 1
+            assert stats.running == 1
+            assert stats.queued == {PRIORITY_BACKGROUND: 1}
+            assert await task_manager.run_async(wait, (0.1,), name="interactive") == 0.1
+            assert not background.future.done()
+            assert task_manager.stats().finished["wait"] == 2
+        finally:
+            task_manager.shutdown()
+
+    asyncio.run(run())
+
+
+def test_warm_up_single_worker(tmp_path: Path) -> None:
+    """
+    Only the first worker is warmed up, before it runs tasks.
+    """
+
+    async def run() -> None:
+        path = tmp_path / "warm-up.txt"
+        task_manager = TaskManager(
+            warm_up=functools.partial(record_warm_up, path), workers=2
+        )
+        try:
+            await asyncio.gather(
+                task_manager.run_async(wait, (0.5,), name="first"),
+                task_manager.run_async(wait, (0.5,), name="second"),
+            )
+        finally:
+            task_manager.shutdown()
+        assert len(path.read_text().splitlines()) == 1
+
+    asyncio.run(run())
+
+
+def test_warm_up_setting(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Task workers are not warmed up if disabled in the settings.
+    """
+    warm_ups: List[Optional[Any]] = []
+
+    class RecordingTaskManager:
+        """
+        Record the warm-up function instead of starting workers.
+        """
+
+        # pylint: disable=too-few-public-methods
+
+        def __init__(
+            self,
+            _preload: Sequence[str],
+            warm_up: Optional[Any],
+            _workers: Optional[int],
+        ) -> None:
+            warm_ups.append(warm_up)
+
+    monkeypatch.setattr(spotlight_app, "TaskManager", RecordingTaskManager)
+    monkeypatch.setattr(settings, "warm_up", False)
+    spotlight_app.SpotlightApp()
+    monkeypatch.setattr(settings, "warm_up", True)
+    spotlight_app.SpotlightApp()
+    assert warm_ups[0] is None and warm_ups[1] is not None
@@ -0,0 +1,54 @@
+"""
+Tests for the WebDataset data source
+"""
+
+import io
+import json
+import math
+import tarfile
+from pathlib import Path
+
+from renumics import spotlight
+from renumics.spotlight.backend import create_datasource
+from renumics.spotlight.io.webdataset import INDEX_SUFFIX
+
+
+def _add_member(tar: tarfile.TarFile, name: str, data: bytes) -> None:
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def test_read_webdataset(tmp_path: Path) -> None:
+    """
+    Samples of multiple shards form rows, sidecars are read into the table and
+    media is read per cell through the shard index.
+    """
+    image = Path("data/images/nature-360p.png").read_bytes()
+    for shard in range(2):
+        with tarfile.open(tmp_path / f"shard-{shard}.tar", "w") as tar:
+            for i in range(3):
+                key = f"{shard}/{i}"
+                _add_member(tar, f"{key}.png", image)
+                if i != 1:
+                    _add_member(tar, f"{key}.cls", str(i).encode())
+                _add_member(tar, f"{key}.json", json.dumps({"caption": key}).encode())
+
+    data_source = create_datasource(tmp_path / "shard-{0..1}.tar")
+    assert (tmp_path / f"shard-0.tar{INDEX_SUFFIX}").is_file()
+    assert len(data_source) == 6
+    dtypes = data_source.guess_dtypes()
+    assert dtypes["png"] is spotlight.Image
+    assert dtypes["json.caption"] is str
+    assert data_source.get_column("key", str).values.tolist() == [
+        "0/0",
+        "0/1",
+        "0/2",
+        "1/0",
+        "1/1",
+        "1/2",
+    ]
+    assert data_source.get_column("json.caption", str).values[4] == "1/1"
+    assert data_source.get_cell_data("cls", 3, float) == 0.0
+    assert math.isnan(data_source.get_cell_data("cls", 4, float))
+    assert data_source.get_cell_data("png", 4, spotlight.Image).tolist() == image
@@ -0,0 +1,85 @@
+"""
+Tests for `pandas` import helpers
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from renumics.spotlight.dtypes import Embedding, Sequence1D, Window
+from renumics.spotlight.io import pandas as pandas_io
+from renumics.spotlight.io.pandas import infer_dtype, parse_number_lists
+
+
+@pytest.mark.parametrize("sample_size", [None, 10])
+def test_infer_sequence_dtypes(sample_size: int) -> None:
+    """
+    Windows, embeddings and sequences are inferred with and without sampling.
+    """
+    windows = pd.Series([[0, 1]] * 100 + [None, ""])
+    assert infer_dtype(windows, sample_size) is Window
+
+    embeddings = pd.Series([str(list(np.arange(4.0)))] * 100 + [None])
+    assert infer_dtype(embeddings, sample_size) is Embedding
+
+    sequences = pd.Series([list(range(i % 3 + 3)) for i in range(100)])
+    assert infer_dtype(sequences, sample_size) is Sequence1D
+
+
+def test_infer_dtype_sample_without_values() -> None:
+    """
+    The whole column is scanned, if the sample contains no values.
+    """
+    column = pd.Series([None] * 1000 + [[0, 1]])
+    assert infer_dtype(column, 10) is Window
+    assert infer_dtype(pd.Series([None, ""] * 100), 10) is str
+
+
+def test_infer_dtype_unaligned_outside_sample() -> None:
+    """
+    Sequences are only embeddings if they are aligned in the whole column, also
+    on unsortable indices.
+    """
+    values = [np.arange(4.0)] * 1000 + [np.arange(5.0)]
+    column = pd.Series(values, index=[*range(1000), "last"])
+    assert infer_dtype(column, 10) is Sequence1D
+    assert infer_dtype(column.iloc[:1000], 10) is Embedding
+
+    strings = pd.Series(["[1, 2, 3]"] * 1000 + ["[1, 2, 3, 4]"])
+    assert infer_dtype(strings, 10) is Sequence1D
+    assert infer_dtype(strings.iloc[:1000], 10) is Embedding
+
+
+def test_infer_dtype_without_parsing_column(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Sampled sequences are compared with the rest of the column by their
+    lengths, without parsing the whole column.
+    """
+    parsed_lengths = []
+
+    def _are_aligned_sequences(column: pd.Series) -> bool:
+        parsed_lengths.append(len(column))
+        return are_aligned_sequences(column)
+
+    are_aligned_sequences = pandas_io._are_aligned_sequences
+    monkeypatch.setattr(pandas_io, "_are_aligned_sequences", _are_aligned_sequences)
+    column = pd.Series([np.arange(4.0)] * 1000 + ["[1, 2, 3, 4]"])
+    assert infer_dtype(column, 10) is Embedding
+    assert parsed_lengths == [10]
+
+
+def test_parse_number_lists() -> None:
+    """
+    Number list literals are parsed into arrays, other values are kept.
+    """
+    column = pd.Series(
+        ["[1, 2]", " [3,4.5] ", "[1e3, nan, -inf]", "[[1, 2]]", "[]", "foo", None],
+        index=[0, 0, 1, 2, 3, 4, 5],
+    )
+    parsed = parse_number_lists(column, np.float32)
+    assert parsed.index.equals(column.index)
+    assert parsed.iloc[0].dtype == np.float32
+    assert np.array_equal(parsed.iloc[0], [1, 2])
+    assert np.array_equal(parsed.iloc[1], [3, 4.5])
+    assert np.array_equal(parsed.iloc[2], [1e3, np.nan, -np.inf], equal_nan=True)
+    assert parsed.iloc[3:].to_list() == [[[1, 2]], [], "foo", None]